@@ -0,0 +1,32 @@
+import sys
+import json
+import argparse
+from datetime import datetime
+from utils.journal import KIND_NAMES, readRecords
+
+
+# Prints journal records as JSON lines, optionally only one kind or one alert's trail
+def main():
+    parser = argparse.ArgumentParser(description="Read the EA's journal")
+    parser.add_argument("path", nargs="?", default="journal.bin")
+    parser.add_argument("--kind", choices=sorted(KIND_NAMES.values()))
+    parser.add_argument("--seq", type=int, help="only records of this alert")
+    args = parser.parse_args()
+
+    for record in readRecords(args.path):
+        kind = KIND_NAMES.get(record.kind, str(record.kind))
+        if args.kind is not None and kind != args.kind:
+            continue
+        if args.seq is not None and record.seq != args.seq:
+            continue
+        line = {
+            "time": datetime.fromtimestamp(record.timestamp).isoformat(),
+            "kind": kind,
+            "seq": record.seq,
+            "data": record.data,
+        }
+        sys.stdout.write(json.dumps(line) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+# Symbol specs come from the simulator unless BROKER_BACKEND=mt5 (a terminal's specs)
+os.environ.setdefault("BROKER_BACKEND", "sim")
+
+from utils.broker import mt5
+from utils.symbolCache import symbolSpecs
+from utils.backtest import Backtest, loadAlerts, loadBars
+from utils.logger import log
+
+
+# `EURUSD=bars/eu.csv` or `bars/EURUSD_M1.csv` -> ("EURUSD", path)
+def barsArgument(value: str) -> tuple:
+    symbol, separator, path = value.partition("=")
+    if separator:
+        return symbol, path
+    return re.split(r"[_.]", os.path.basename(value))[0], value
+
+
+# `{"USDJPY": {"point": 0.001, "tickValue": 0.64}}`: symbols (or overrides) added to
+# the simulator, with `MT5Simulator.addSymbol()` keyword arguments
+def addSpecs(path: str):
+    with open(path, encoding="utf-8") as f:
+        specs = json.load(f)
+    for symbol, kwargs in specs.items():
+        # the simulator's price is irrelevant, bars drive the backtest
+        mt5.addSymbol(symbol, 1.0, 1.0, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay an alert log against historical bars"
+    )
+    parser.add_argument("alerts", help="alert log (text/JSON lines) or EA journal")
+    parser.add_argument(
+        "bars", nargs="+", help="CSV/NPY/NPZ bars per symbol: [SYMBOL=]path"
+    )
+    parser.add_argument("--balance", type=float, default=100000.0)
+    parser.add_argument(
+        "--spread", type=float, default=0.0, help="points, if the bars have none"
+    )
+    parser.add_argument("--specs", help="JSON of extra/overridden symbol specs")
+    parser.add_argument("--trades", help="write the closed trades to this CSV")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    log.setLevel("DEBUG" if args.verbose else "WARNING")
+
+    if not mt5.initialize():
+        sys.exit(f"Initializing MT5 failed: {mt5.last_error()}")
+    started = time.perf_counter()
+    barFiles = dict(barsArgument(value) for value in args.bars)
+    if args.specs:
+        addSpecs(args.specs)
+    bars = {}
+    specs = {}
+    for symbol, path in barFiles.items():
+        spec = symbolSpecs.get(symbol)
+        if spec is None:
+            sys.exit(f"No symbol spec for {symbol}; add it with --specs.")
+        specs[symbol] = spec
+        bars[symbol] = loadBars(path, symbol, spec.point, args.spread)
+    alerts = loadAlerts(args.alerts)
+    loaded = time.perf_counter()
+
+    report = Backtest(bars, specs, balance=args.balance).run(alerts)
+    finished = time.perf_counter()
+    if args.trades:
+        report.writeTrades(args.trades)
+
+    summary = report.summary()
+    summary["bars"] = sum(len(symbolBars) for symbolBars in bars.values())
+    summary["loadSeconds"] = loaded - started
+    summary["runSeconds"] = finished - loaded
+    print(json.dumps(summary, indent=2))
+    for timestamp, alert, reason in report.rejected[:20]:
+        print(f"> Not executed at {timestamp:.0f}: {alert} ({reason})")
+    log.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import os
+import io
+import sys
+import json
+import time
+import random
+import itertools
+import argparse
+import platform
+import tracemalloc
+import contextlib
+import numpy as np
+from dataclasses import replace
+
+# The benchmarks always run against the in-memory simulator
+os.environ["BROKER_BACKEND"] = "sim"
+os.environ["LICENSE_ID"] = "bench-license"
+
+from utils.broker import mt5
+from utils.simulator import MT5Simulator
+from utils.handler import handleAlert
+from utils.alerts import Alert, decodeAlert
+from utils.operations import initializeMT5
+from utils.orderBook import orderBook
+from utils.symbolCache import symbolSpecs
+from utils.tickCache import tickCache
+from utils.accountCache import accountCache
+from utils.dispatcher import AlertDispatcher
+from utils.getPositionSize import getPositionSize, getPositionSizes
+from utils.logger import log
+from utils.idempotency import alertDedup
+
+benchmarkDir = os.path.join(os.path.dirname(__file__), "benchmarkData")
+defaultCorpus = os.path.join(benchmarkDir, "alerts.txt")
+defaultBaseline = os.path.join(benchmarkDir, "baseline.json")
+
+
+def loadCorpus(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def resetBroker(latency: float):
+    mt5.use(MT5Simulator.withDefaultSymbols(latency=latency))
+    symbolSpecs.invalidate()
+    tickCache.invalidate()
+    accountCache.invalidate()
+    orderBook.sync()
+    initializeMT5()
+
+
+# Comments must stay unique across repeats of the corpus
+def alertsFor(corpus: list, repeat: int) -> list:
+    return [(line, repetition) for repetition in range(repeat) for line in corpus]
+
+
+def decodeForRepetition(line: str, repetition: int) -> Alert:
+    alert = decodeAlert(line)
+    if repetition and alert.comment is not None:
+        alert = replace(alert, comment=f"{alert.comment}~{repetition}")
+    return alert
+
+
+def percentiles(samples: list) -> dict:
+    values = np.array(samples) * 1000
+    return {
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(values.max()),
+    }
+
+
+# Replays the corpus through handleAlert (or the dispatcher) at `rate` alerts/sec
+# (0 = as fast as possible); latency includes decoding
+def replay(corpus: list, repeat: int, rate: float, latency: float, dispatch: bool):
+    resetBroker(latency)
+    alerts = alertsFor(corpus, repeat)
+    interval = 1 / rate if rate else 0
+    samples = []
+    receivedAt = {}
+
+    def handle(alert: Alert):
+        handleAlert(alert)
+        samples.append(time.perf_counter() - receivedAt.pop(id(alert)))
+
+    dispatcher = None
+    if dispatch:
+        dispatcher = AlertDispatcher(handle, workers=4, queueSize=len(alerts))
+        dispatcher.start()
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for index, (line, repetition) in enumerate(alerts):
+            if interval:
+                delay = start + index * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            received = time.perf_counter()
+            alert = decodeForRepetition(line, repetition)
+            receivedAt[id(alert)] = received
+            if dispatcher is not None:
+                dispatcher.submit(alert)
+            else:
+                handle(alert)
+        if dispatcher is not None:
+            dispatcher.stop()
+    elapsed = time.perf_counter() - start
+    return {
+        "alerts": len(alerts),
+        "seconds": elapsed,
+        "throughput": len(alerts) / elapsed,
+        "latencyMs": percentiles(samples),
+    }
+
+
+# Peak traced memory per alert (bytes), a proxy for allocations on the hot path
+def allocations(corpus: list) -> dict:
+    resetBroker(0)
+    peaks = []
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for line in corpus:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            handleAlert(decodeAlert(line))
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+    return {
+        "meanPeakBytes": float(np.mean(peaks)),
+        "maxPeakBytes": int(np.max(peaks)),
+    }
+
+
+def timePerCall(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+# Microbenchmarks (µs per call) for sizing and comment lookups
+def micro(positions: int, iterations: int) -> dict:
+    resetBroker(0)
+    rng = random.Random(7)
+    for i in range(positions):
+        mt5.order_send(
+            {
+                "action": mt5.TRADE_ACTION_DEAL,
+                "symbol": "EURUSD",
+                "volume": 0.01,
+                "type": mt5.ORDER_TYPE_BUY,
+                "type_filling": mt5.ORDER_FILLING_IOC,
+                "comment": f"p{i}-EUR-A",
+            }
+        )
+    orderBook.sync()
+    comments = itertools.cycle(
+        [f"p{rng.randrange(positions)}-EUR-A" for _ in range(iterations)]
+    )
+
+    # what the operations did before the order book index
+    def linearScan():
+        comment = next(comments)
+        return next((p for p in mt5.positions_get() if p.comment == comment), None)
+
+    symbols = ["EURUSD", "XAUUSD", "BTCUSD", "GBPJPY"] * 250
+    entries = [1.1, 2624.0, 60000.05, 206.5] * 250
+    sls = [1.09, 2617.0, 55123.45, 210.0] * 250
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = {
+            "getPositionSizeUs": timePerCall(
+                lambda: getPositionSize("EURUSD", 1.1, 1.09, 0.15, 100000), iterations
+            ),
+            "getPositionSizesPerTradeUs": timePerCall(
+                lambda: getPositionSizes(symbols, entries, sls, 0.15, 100000),
+                max(1, iterations // 100),
+            )
+            / len(symbols),
+        }
+    results["orderBookFindUs"] = timePerCall(
+        lambda: orderBook.findPosition(next(comments)), iterations
+    )
+    results["linearScanFindUs"] = timePerCall(linearScan, max(1, iterations // 10))
+    return results
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+# Every metric is "lower is better" except throughput
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    current, previous = flatten(results), flatten(baseline)
+    for key, value in current.items():
+        if (
+            key not in previous
+            or previous[key] == 0
+            or key.endswith(("alerts", "seconds"))
+        ):
+            continue
+        change = value / previous[key] - 1
+        worse = -change if key.endswith("throughput") else change
+        if worse > tolerance:
+            regressions.append(
+                f"{key}: {previous[key]:.4g} -> {value:.4g} ({change:+.0%})"
+            )
+    return regressions
+
+
+def main():
+    # keep console output out of the measurements
+    log.console = False
+    # the corpus repeats CANCELALL/CLOSEALL alerts on purpose
+    alertDedup.ttl = 0
+    parser = argparse.ArgumentParser(
+        description="Replay benchmarks against the MT5 simulator"
+    )
+    parser.add_argument("--corpus", default=defaultCorpus)
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="times to replay the corpus"
+    )
+    parser.add_argument("--rate", type=float, default=0, help="alerts/sec (0 = max)")
+    parser.add_argument(
+        "--latency-ms", type=float, default=0, help="simulated order_send latency"
+    )
+    parser.add_argument(
+        "--dispatch", action="store_true", help="replay through the dispatcher"
+    )
+    parser.add_argument(
+        "--positions", type=int, default=500, help="open positions for lookups"
+    )
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument(
+        "--save", nargs="?", const=defaultBaseline, help="write results as baseline"
+    )
+    parser.add_argument(
+        "--compare", nargs="?", const=defaultBaseline, help="compare with a baseline"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="allowed regression (0.25 = 25%%)"
+    )
+    args = parser.parse_args()
+
+    print("🐍 Python benchmark script running...")
+    print("---------- ---------- ---------- ---------- ----------")
+    corpus = loadCorpus(args.corpus)
+    results = {
+        "env": {"python": platform.python_version(), "platform": platform.platform()},
+        "replay": replay(
+            corpus, args.repeat, args.rate, args.latency_ms / 1000, args.dispatch
+        ),
+        "allocations": allocations(corpus),
+        "micro": micro(args.positions, args.iterations),
+    }
+    print(json.dumps(results, indent=2))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"> Saved baseline to '{args.save}'.")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("> ❌ Regressions against baseline:")
+            for regression in regressions:
+                print(f">   {regression}")
+            sys.exit(1)
+        print("> ✅ No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,188 @@
 import os
-from dotenv import load_dotenv
-import websocket
-import threading
-import time
 import json
+from dotenv import load_dotenv
+import atexit
+import signal
 from utils.handler import handleAlert
+from utils.alerts import AlertError, decodeAlert
+from utils.orderBook import orderBook
+from utils.dispatcher import AlertDispatcher
 from utils.forceEncoding import forceEncoding
-
-load_dotenv()
-forceEncoding()
-
-wsURL = os.getenv("WS_URL")
-
-print("🐍 Python script running...")
-print(f"> LICENSE_ID: {os.getenv("LICENSE_ID")}")
-print(f"> WS_URL: {wsURL}")
-print("---------- ---------- ---------- ---------- ----------")
+from utils import metrics
+from utils.logger import log
+from utils.idempotency import alertDedup
+from utils.wsSupervisor import WebSocketSupervisor
+from utils.tickCache import tickCache
+from utils.symbolCache import symbolSpecs
+from utils.fanout import AccountPool
+from utils.journal import journal, openJournal
+from utils.warmup import warmUp, configuredSymbols
+from utils.exposure import exposure
+from utils.scheduler import scheduler
+from utils.tradeEvents import tradeEvents
+from utils.session import session
+from utils.metricsServer import MetricsServer
+from utils.settings import applySettings
+
+dispatcher = None
+supervisor = None
+# one worker process per account when ACCOUNTS_FILE is set (see `main`)
+accountPool = None
+# `id` of the newest alert received, sent on reconnect when WS_RESUME is set
+lastAlertId = None
 
 
 def on_message(ws, message):
-    data = json.loads(message)
-    handleAlert(data)
-
-
-def on_error(ws, error):
-    print(f"> Error: {error}")
-
-
-def on_close(ws, statusCode, closeMessage):
-    print(
-        f"> WebSocket connection closed with code {statusCode}. Reason: {closeMessage}"
+    global lastAlertId
+    with metrics.span("receive"):
+        try:
+            with metrics.span("parse"):
+                alert = decodeAlert(message)
+        except AlertError as e:
+            log.error("Invalid alert '{}': {}", message, e)
+            return
+        if alert.id is not None:
+            lastAlertId = alert.id
+        if accountPool is None:
+            journal.received(alert)
+            if not dispatcher.submit(alert):
+                journal.discard(alert)
+        # workers skip the dedup check, so it happens once here
+        elif alertDedup.isDuplicate(alert):
+            log.warning("Duplicate alert dropped: {}", alert)
+        else:
+            accountPool.submit(alert)
+
+
+# Asks the server to replay the alerts it sent after the newest one we received
+def resumeMessage():
+    if lastAlertId is None:
+        return None
+    return json.dumps({"resume": lastAlertId})
+
+
+def dumpMetrics(*args):
+    print(f"> Latency per stage:\n{metrics.dumpText()}")
+    print(f"> WebSocket: {supervisor.stats()}")
+    print(f"> Tick cache: {tickCache.stats()}")
+    print(f"> Exposure: {exposure.stats()}")
+    print(f"> Outbound requests: {scheduler.stats()}")
+    print(f"> Trade events: {tradeEvents.stats()}")
+    if accountPool is not None:
+        print(f"> Accounts: {accountPool.stats()}")
+
+
+# Gauges and health checks of the /metrics and /health endpoint
+def registerMetrics(server: MetricsServer):
+    server.gauge(
+        "websocketConnected", "Websocket is open", lambda: supervisor.connected
     )
-
-
-def on_open(ws):
-    print("> WebSocket connection established.")
-
-
-def keepAlive(ws):
-    while True:
-        ws.ping()
-        time.sleep(30)
-
-
-if __name__ == "__main__":
-    ws = websocket.WebSocketApp(
-        wsURL, on_message=on_message, on_error=on_error, on_close=on_close
+    server.gauge(
+        "websocketReconnects", "Websocket reconnects", lambda: supervisor.reconnects
     )
+    server.gauge(
+        "websocketPingSeconds", "Last ping round trip", lambda: supervisor.lastRtt
+    )
+    server.gauge("websocketDowntimeSeconds", "Time disconnected", supervisor.downtime)
+    server.check("websocket", lambda: supervisor.connected)
+    if accountPool is not None:
+        server.gauge(
+            "accountAlerts",
+            "Alerts per account and outcome",
+            lambda: {
+                (("account", name), ("state", state)): stats[state]
+                for name, stats in accountPool.stats().items()
+                for state in ["sent", "ok", "failed", "dropped", "pending"]
+            },
+        )
+        return
+    server.gauge("mt5Connected", "MT5 session is connected", lambda: session.connected)
+    server.gauge("dispatcherQueueDepth", "Alerts waiting", dispatcher.depth)
+    server.gauge(
+        "dispatcherDropped",
+        "Alerts dropped by backpressure",
+        lambda: dispatcher.dropped,
+    )
+    server.gauge("openRisk", "Open risk in account currency", lambda: exposure.total)
+    server.check("mt5", lambda: session.connected)
+
+
+# Everything runs from here: spawned account workers re-import this module as
+# `__mp_main__` and must not read the settings or build the dispatcher again
+def main():
+    global dispatcher, supervisor, accountPool
+    load_dotenv()
+    forceEncoding()
+    applySettings()
+    metricsPort = int(os.getenv("METRICS_PORT", "0"))
+    # the endpoint serves the same histograms and counters as the console dump
+    metrics.enable(os.getenv("EA_METRICS") == "1" or metricsPort > 0)
+
+    wsURL = os.getenv("WS_URL")
+
+    print("🐍 Python script running...")
+    print(f"> LICENSE_ID: {os.getenv("LICENSE_ID")}")
+    print(f"> WS_URL: {wsURL}")
+    print("---------- ---------- ---------- ---------- ----------")
+
+    dispatcher = AlertDispatcher(
+        handleAlert,
+        workers=int(os.getenv("DISPATCH_WORKERS", "4")),
+        queueSize=int(os.getenv("DISPATCH_QUEUE_SIZE", "256")),
+        backpressure=os.getenv("DISPATCH_BACKPRESSURE", "block"),
+        timeout=float(os.getenv("DISPATCH_TIMEOUT", "5")),
+    )
+    supervisor = WebSocketSupervisor(
+        wsURL,
+        on_message,
+        pingInterval=float(os.getenv("WS_PING_INTERVAL", "20")),
+        pingTimeout=float(os.getenv("WS_PING_TIMEOUT", "10")),
+        maxBackoff=float(os.getenv("WS_MAX_BACKOFF", "30")),
+        resumeMessage=resumeMessage if os.getenv("WS_RESUME") == "1" else None,
+    )
+    if os.getenv("EA_METRICS") == "1":
+        # Ctrl+Break on Windows, `kill -USR1 <pid>` elsewhere
+        dumpSignal = getattr(signal, "SIGBREAK", None) or getattr(signal, "SIGUSR1")
+        signal.signal(dumpSignal, dumpMetrics)
+        atexit.register(dumpMetrics)
+    if alertDedup.ttl > 0:
+        alertDedup.load(os.getenv("ALERT_DEDUP_FILE", "alertDedup.json"))
+    accountsFile = os.getenv("ACCOUNTS_FILE")
+    if accountsFile:
+        accountPool = AccountPool.fromFile(
+            accountsFile, queueSize=int(os.getenv("DISPATCH_QUEUE_SIZE", "256"))
+        )
+        accountPool.start()
+        print(f"> Fanning out alerts to {len(accountPool.accounts)} accounts.")
+    else:
+        # alerts are only accepted (the websocket opened) once everything is warm
+        warmUp(configuredSymbols(), float(os.getenv("WARMUP_TIMEOUT", "30")))
+        if os.getenv("EA_JOURNAL", "journal.bin"):
+            openJournal(os.getenv("EA_JOURNAL", "journal.bin"), orderBook)
+        tickCache.start()
+        symbolSpecs.start()
+        if tradeEvents.pollInterval:
+            tradeEvents.start()
+        dispatcher.start()
+    if metricsPort:
+        metricsServer = MetricsServer(
+            metricsPort, os.getenv("METRICS_HOST", "127.0.0.1")
+        )
+        registerMetrics(metricsServer)
+        metricsServer.start()
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        supervisor.stop()
+    finally:
+        # Let queued alerts finish before exiting
+        if accountPool is not None:
+            accountPool.stop()
+        else:
+            tradeEvents.stop()
+            dispatcher.stop()
+            journal.close()
 
-    # Assign the on_open callback separately
-    ws.on_open = on_open
-    ws.run_forever()
 
-    keepAliveThread = threading.Thread(target=keepAlive, args=(ws,))
-    keepAliveThread.daemon = True
-    keepAliveThread.start()
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
 from dotenv import load_dotenv
 from utils.forceEncoding import forceEncoding
 from utils.operations import initializeMT5, createOrder
-from utils.getPositionSize import getPositionSize
+from utils.getPositionSize import getPositionSize, getPositionSizes
+from utils.logger import log
 
 load_dotenv()
 forceEncoding()
@@ -106,6 +107,7 @@ def positionSizeTests():
             riskPercent=trade.get("risk"),
             accBalance=testAccBalance
         )
+        log.flush()
         if expected == volume:
             print(
                 f"> ✅ Test {index}: Resulting volume for {trade.get("symbol")} is equal to expected volume.\n"
@@ -116,6 +118,26 @@ def positionSizeTests():
             )
             break
 
+def positionSizesBatchTests():
+    print(f"> Running batch positionSize tests...")
+    volumes = getPositionSizes(
+        symbols=[trade.get("symbol") for trade in testCases],
+        entries=[trade.get("price") for trade in testCases],
+        sls=[trade.get("sl") for trade in testCases],
+        riskPercents=[trade.get("risk") for trade in testCases],
+        accBalance=testAccBalance,
+    )
+    for index, trade in enumerate(testCases):
+        expected = round(float(trade.get("expected")), 2)
+        if expected == volumes[index]:
+            print(f"> ✅ Batch test {index}: {trade['symbol']} matches expected volume.")
+        else:
+            print(
+                f"> ❌ Batch test {index}: {trade['symbol']} is incorrect. Expected: '{expected}'; Received: '{volumes[index]}'"
+            )
+            break
+
+
 def createOrderTests():
     data = {
         "symbol": "BTCUSD",
@@ -142,6 +164,7 @@ def main():
     print("---------- ---------- ---------- ---------- ----------")
     initializeMT5()
     positionSizeTests()
+    positionSizesBatchTests()
     # createOrderTests()
 
 
@@ -0,0 +1,56 @@
+import time
+from dataclasses import dataclass
+from typing import Optional
+from utils.broker import mt5
+
+
+# The parts of `account_info()` used for risk sizing, with when they were fetched
+@dataclass(frozen=True, slots=True)
+class AccountSnapshot:
+    equity: float
+    balance: float
+    margin: float
+    freeMargin: float
+    fetchedAt: float
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetchedAt
+
+
+# Account state cache: `get()` re-reads `account_info()` once the snapshot is older
+# than `refreshInterval` seconds. Our own fills and closes call `invalidate()` so the
+# next sizing sees the new equity/margin right away.
+class AccountCache:
+    def __init__(self, refreshInterval: float = 1.0):
+        self.refreshInterval = refreshInterval
+        self._snapshot = None
+
+    def get(self, forceRefresh: bool = False) -> Optional[AccountSnapshot]:
+        snapshot = self._snapshot
+        if (
+            forceRefresh
+            or snapshot is None
+            or time.monotonic() - snapshot.fetchedAt > self.refreshInterval
+        ):
+            snapshot = self._refresh()
+        return snapshot
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def _refresh(self) -> Optional[AccountSnapshot]:
+        accInfo = mt5.account_info()
+        if accInfo is None:
+            return None
+        self._snapshot = AccountSnapshot(
+            equity=accInfo.equity,
+            balance=accInfo.balance,
+            margin=accInfo.margin,
+            freeMargin=accInfo.margin_free,
+            fetchedAt=time.monotonic(),
+        )
+        return self._snapshot
+
+
+accountCache = AccountCache()
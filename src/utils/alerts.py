@@ -0,0 +1,146 @@
+import json
+import math
+from dataclasses import dataclass, fields
+from typing import Optional, Union
+
+# Valid commands come from the `Command` enum of the Node server
+COMMANDS = frozenset(
+    [
+        "BUY",
+        "BUYLIMIT",
+        "SELL",
+        "SELLLIMIT",
+        "NEWSLTPLONG",
+        "NEWSLTPSHORT",
+        "CANCELLONG",
+        "CANCELSHORT",
+        "CANCELALL",
+        "CLOSELONG",
+        "CLOSESHORT",
+        "CLOSEALL",
+    ]
+)
+# Commands acting on one trade need the trade's comment
+COMMENT_REQUIRED = frozenset(
+    [
+        "NEWSLTPLONG",
+        "NEWSLTPSHORT",
+        "CANCELLONG",
+        "CANCELSHORT",
+        "CLOSELONG",
+        "CLOSESHORT",
+    ]
+)
+NUMERIC_KEYS = frozenset(["risk", "price", "sl", "tp", "perc"])
+
+
+class AlertError(ValueError):
+    pass
+
+
+# Decoded alert with numeric fields already coerced. `get()` mirrors dict access so
+# code written against the raw JSON dict keeps working.
+@dataclass(frozen=True, slots=True)
+class Alert:
+    licenseId: str
+    command: str
+    symbol: str
+    risk: Optional[float] = None
+    price: Optional[float] = None
+    sl: Optional[float] = None
+    tp: Optional[float] = None
+    perc: Optional[float] = None
+    comment: Optional[str] = None
+    # unique id set by the sender, used to drop duplicate deliveries
+    id: Optional[str] = None
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+
+ALERT_KEYS = frozenset(f.name for f in fields(Alert))
+
+
+# Accepts a JSON string, a plain-text alert (`licenseId,command,symbol,key=value,...`)
+# or an already parsed dict. Raises AlertError on unknown keys/commands or bad values.
+def decodeAlert(message: Union[str, bytes, dict]) -> Alert:
+    if isinstance(message, bytes):
+        message = message.decode("utf-8")
+    if isinstance(message, dict):
+        return fromDict(message)
+    message = message.strip()
+    if message.startswith("{"):
+        try:
+            data = json.loads(message)
+        except json.JSONDecodeError as e:
+            raise AlertError(f"Malformed JSON alert: {e}")
+        if not isinstance(data, dict):
+            raise AlertError("JSON alert must be an object.")
+        return fromDict(data)
+    return fromDict(parseText(message))
+
+
+# `123456,BUYLIMIT,BTCUSD,risk=0.15,price=60000.05,comment="p2.3-BTC-A"` -> dict
+def parseText(message: str) -> dict:
+    parts = splitFields(message)
+    if len(parts) < 3:
+        raise AlertError(
+            f"Plain-text alert needs at least 'licenseId,command,symbol': '{message}'"
+        )
+    data = {"licenseId": parts[0], "command": parts[1], "symbol": parts[2]}
+    for part in parts[3:]:
+        key, separator, value = part.partition("=")
+        if not separator:
+            raise AlertError(f"Expected 'key=value' but got '{part}'.")
+        key = key.strip()
+        if key in data:
+            raise AlertError(f"Duplicate key '{key}'.")
+        data[key] = value.strip().strip('"')
+    return data
+
+
+# Splits on commas that aren't inside double quotes
+def splitFields(message: str) -> list:
+    parts = []
+    current = []
+    quoted = False
+    for char in message:
+        if char == '"':
+            quoted = not quoted
+        elif char == "," and not quoted:
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    if quoted:
+        raise AlertError(f"Unbalanced quotes in alert: '{message}'")
+    parts.append("".join(current).strip())
+    return parts
+
+
+def fromDict(data: dict) -> Alert:
+    unknownKeys = data.keys() - ALERT_KEYS
+    if unknownKeys:
+        raise AlertError(f"Unknown alert keys: {sorted(unknownKeys)}")
+    command = data.get("command")
+    if command not in COMMANDS:
+        raise AlertError(f"Invalid command '{command}'.")
+    if not data.get("symbol"):
+        raise AlertError(f"Invalid symbol '{data.get('symbol')}'.")
+    if command in COMMENT_REQUIRED and not data.get("comment"):
+        raise AlertError(f"Command '{command}' needs a comment.")
+    values = {}
+    for key, value in data.items():
+        if value is None or value == "":
+            continue
+        if key in NUMERIC_KEYS:
+            try:
+                values[key] = float(value)
+            except (TypeError, ValueError):
+                raise AlertError(f"Invalid value '{value}' for '{key}'.")
+            if not math.isfinite(values[key]):
+                raise AlertError(f"Invalid value '{value}' for '{key}'.")
+        else:
+            values[key] = str(value)
+    values.setdefault("licenseId", "")
+    return Alert(**values)
@@ -0,0 +1,589 @@
+import os
+import csv
+import json
+import math
+import numpy as np
+from typing import NamedTuple, Optional
+from utils.logger import log
+from utils.alerts import Alert, AlertError, decodeAlert, fromDict
+from utils.getPositionSize import getPositionSize
+from utils.orderBook import isSelector, commentMatcher
+from utils.preTrade import snapVolume, checkVolume, checkStops
+from utils.journal import ALERT, readRecords
+
+# Replays a timestamped alert log against historical bars with the live command
+# semantics (entries sized by getPositionSize() and checked by the pre-trade checks,
+# limit fills, SL/TP updates, partial closes by `perc`, cancels, selectors).
+# Python runs once per alert; fills and SL/TP hits are found with NumPy over the bar
+# arrays: each trade's next event (fill, SL or TP) is searched once, forward from
+# where it was placed or last changed, and only re-searched when its levels change.
+
+ENTRY_COMMANDS = frozenset(["BUY", "BUYLIMIT", "SELL", "SELLLIMIT"])
+# first window (bars) searched for a trade's next event, grown 4x until found
+SCAN_WINDOW = 4096
+
+
+# Bid and ask at one bar's open, shaped like a tick for the pre-trade checks
+class Quote(NamedTuple):
+    bid: float
+    ask: float
+
+
+# Bars of one symbol as parallel arrays. Prices are bids (as in MT5 rates); `spread`
+# is in price units, so ask prices are bid + spread.
+class Bars:
+    __slots__ = ("symbol", "time", "open", "high", "low", "close", "spread")
+
+    def __init__(self, symbol, time, open, high, low, close, spread):
+        order = np.argsort(time, kind="stable")
+        self.symbol = symbol
+        self.time = np.asarray(time, dtype=np.int64)[order]
+        self.open = np.asarray(open, dtype=float)[order]
+        self.high = np.asarray(high, dtype=float)[order]
+        self.low = np.asarray(low, dtype=float)[order]
+        self.close = np.asarray(close, dtype=float)[order]
+        self.spread = np.broadcast_to(np.asarray(spread, dtype=float), self.time.shape)[
+            order
+        ]
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    # Index of the bar an alert at `timestamp` executes on: the first one opening at
+    # or after it (alerts fire on bar close, i.e. the next bar's open)
+    def indexAt(self, timestamp: float) -> int:
+        # an int key: a float one would convert the whole time array on every call
+        key = np.int64(math.ceil(timestamp))
+        return int(np.searchsorted(self.time, key, side="left"))
+
+    def quote(self, index: int) -> Quote:
+        bid = float(self.open[index])
+        return Quote(bid, bid + float(self.spread[index]))
+
+
+# Unix seconds from numbers or ISO 8601 strings (`2024-01-02 10:00`, `2024.01.02`)
+def toEpochSeconds(values) -> np.ndarray:
+    values = np.asarray(values)
+    if values.dtype.kind in "iuf":
+        return values.astype(np.int64)
+    if values.dtype.kind == "M":
+        return values.astype("datetime64[s]").astype(np.int64)
+    try:
+        return values.astype(float).astype(np.int64)
+    except ValueError:
+        pass
+    text = np.char.replace(values.astype(str), ".", "-", count=2)
+    return text.astype("datetime64[s]").astype(np.int64)
+
+
+# Unix seconds from one number or ISO 8601 string
+def parseTime(stamp) -> float:
+    try:
+        return float(stamp)
+    except ValueError:
+        text = str(stamp).replace(".", "-", 2)
+        return float(np.datetime64(text, "s").astype(np.int64))
+
+
+# Loads bars from a CSV with a header (`time,open,high,low,close[,spread]`, or MT5's
+# exported `<DATE>\t<TIME>\t<OPEN>...`), an `.npy` dump of `copy_rates_range()` or an
+# `.npz` holding either such a dump as `rates` or one array per column. Spreads are
+# in points, like MT5's; `defaultSpread` (points) is used when there is no column.
+def loadBars(path: str, symbol: str, point: float, defaultSpread: float = 0.0) -> Bars:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npy":
+        columns = columnsOf(np.load(path))
+    elif extension == ".npz":
+        with np.load(path) as data:
+            if "rates" in data:
+                columns = columnsOf(data["rates"])
+            else:
+                columns = {key.lower(): data[key] for key in data.files}
+    else:
+        columns = readCsvColumns(path)
+    missing = {"time", "open", "high", "low", "close"} - columns.keys()
+    if missing:
+        raise ValueError(f"Bars in '{path}' are missing {sorted(missing)}.")
+    spread = columns.get("spread", defaultSpread)
+    return Bars(
+        symbol,
+        toEpochSeconds(columns["time"]),
+        columns["open"],
+        columns["high"],
+        columns["low"],
+        columns["close"],
+        np.asarray(spread, dtype=float) * point,
+    )
+
+
+# Structured array (MT5 rates) -> {field: column}
+def columnsOf(rates: np.ndarray) -> dict:
+    return {name.lower(): rates[name] for name in rates.dtype.names}
+
+
+def readCsvColumns(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        header = f.readline()
+    delimiter = "\t" if "\t" in header else ","
+    names = [name.strip().strip("<>").lower() for name in header.split(delimiter)]
+    values = np.loadtxt(
+        path, delimiter=delimiter, skiprows=1, dtype=str, ndmin=2, encoding="utf-8"
+    )
+    columns = {name: values[:, i] for i, name in enumerate(names)}
+    if "date" in columns:
+        dates = columns.pop("date")
+        columns["time"] = (
+            np.char.add(np.char.add(dates, " "), columns["time"])
+            if "time" in columns
+            else dates
+        )
+    for name in ["open", "high", "low", "close", "spread"]:
+        if name in columns:
+            columns[name] = columns[name].astype(float)
+    return columns
+
+
+# `(timestamp, Alert)` pairs sorted by time, from the EA's journal (`.bin`) or a text
+# log with one alert per line: `<timestamp> <plain-text alert>` or a JSON alert with
+# a `time` key. Invalid lines are logged and skipped, like invalid live alerts.
+def loadAlerts(path: str) -> list:
+    if path.endswith(".bin") or ".bin." in os.path.basename(path):
+        alerts = [
+            (record.timestamp, fromDict(record.data))
+            for record in readRecords(path)
+            if record.kind == ALERT
+        ]
+    else:
+        alerts = []
+        with open(path, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    alerts.append(parseLogLine(line))
+                except (AlertError, ValueError) as e:
+                    log.error("Invalid alert on line {} of '{}': {}", number, path, e)
+    alerts.sort(key=lambda item: item[0])
+    return alerts
+
+
+def parseLogLine(line: str) -> tuple:
+    if line.startswith("{"):
+        data = json.loads(line)
+        stamp = data.pop("time", None)
+        if stamp is None:
+            raise ValueError("JSON alert has no 'time'.")
+        return parseTime(stamp), decodeAlert(data)
+    stamp, _, message = line.partition(" ")
+    if not message:
+        stamp, _, message = line.partition("\t")
+    return parseTime(stamp), decodeAlert(message)
+
+
+# Index of the first True in `mask`, or -1
+def firstTrue(mask: np.ndarray) -> int:
+    if not mask.size:
+        return -1
+    index = int(np.argmax(mask))
+    return index if mask[index] else -1
+
+
+# An open position (isPosition) or a pending limit order of the backtest
+class SimTrade:
+    __slots__ = (
+        "ticket",
+        "symbol",
+        "comment",
+        "isLong",
+        "isPosition",
+        "volume",
+        "price",
+        "sl",
+        "tp",
+        "openIndex",
+        "eventIndex",
+        "eventKind",
+    )
+
+    def __init__(self, ticket, symbol, comment, isLong, isPosition, volume, price):
+        self.ticket = ticket
+        self.symbol = symbol
+        self.comment = comment
+        self.isLong = isLong
+        self.isPosition = isPosition
+        self.volume = volume
+        self.price = price
+        self.sl = None
+        self.tp = None
+        self.openIndex = 0
+        self.eventIndex = 0
+        self.eventKind = None
+
+
+class ClosedTrade(NamedTuple):
+    ticket: int
+    symbol: str
+    comment: Optional[str]
+    isLong: bool
+    volume: float
+    entryTime: int
+    entryPrice: float
+    exitTime: int
+    exitPrice: float
+    profit: float
+    # "sl", "tp", "close" (an alert) or "end" (still open when the bars ran out)
+    reason: str
+
+
+class Backtest:
+    def __init__(self, bars: dict, specs: dict, balance: float = 100000.0):
+        self.bars = bars
+        self.specs = specs
+        self.initialBalance = balance
+        self.balance = balance
+        self.trades = {}
+        self.closed = []
+        # (timestamp, alert, reason) of alerts the live EA would have refused
+        self.rejected = []
+        self.alertCount = 0
+        self._nextTicket = 1
+
+    def run(self, alerts: list) -> "BacktestReport":
+        for timestamp, alert in alerts:
+            self.alertCount += 1
+            bars = self.bars.get(alert.symbol)
+            if bars is None:
+                self._reject(timestamp, alert, f"no bars for {alert.symbol}")
+                continue
+            index = bars.indexAt(timestamp)
+            if index >= len(bars):
+                self._reject(timestamp, alert, "after the last bar")
+                continue
+            self._advance(timestamp)
+            self._execute(timestamp, alert, bars, index)
+        self._advance(None)
+        for trade in list(self.trades.values()):
+            if trade.isPosition:
+                bars = self.bars[trade.symbol]
+                last = len(bars) - 1
+                price = bars.close[last] + (0 if trade.isLong else bars.spread[last])
+                self._close(trade, trade.volume, last, float(price), "end")
+        self.trades.clear()
+        return BacktestReport(self)
+
+    # Equity at the open of the bars at `timestamp`: balance plus open positions'
+    # floating profit
+    def equity(self, timestamp: float) -> float:
+        equity = self.balance
+        for trade in self.trades.values():
+            if trade.isPosition:
+                bars = self.bars[trade.symbol]
+                quote = bars.quote(min(bars.indexAt(timestamp), len(bars) - 1))
+                price = quote.bid if trade.isLong else quote.ask
+                equity += self._profit(trade, trade.volume, price)
+        return equity
+
+    # Applies every fill and SL/TP hit that happens before `timestamp` (all of them
+    # if None), in time order
+    def _advance(self, timestamp: Optional[float]):
+        stops = {
+            symbol: len(bars) if timestamp is None else bars.indexAt(timestamp)
+            for symbol, bars in self.bars.items()
+        }
+        while True:
+            due = []
+            for trade in self.trades.values():
+                if trade.eventIndex < stops[trade.symbol]:
+                    bars = self.bars[trade.symbol]
+                    due.append((bars.time[trade.eventIndex], trade.ticket, trade))
+            if not due:
+                return
+            # a fill can turn into an SL/TP hit before `timestamp`, so loop again
+            for _, _, trade in sorted(due, key=lambda item: item[:2]):
+                self._applyEvent(trade)
+
+    def _applyEvent(self, trade: SimTrade):
+        bars = self.bars[trade.symbol]
+        index = trade.eventIndex
+        laterBar = index > trade.openIndex
+        if trade.eventKind == "fill":
+            if trade.isLong:
+                ask = bars.open[index] + bars.spread[index]
+                price = min(trade.price, ask) if laterBar else trade.price
+            else:
+                price = max(trade.price, bars.open[index]) if laterBar else trade.price
+            trade.isPosition = True
+            trade.price = float(price)
+            trade.openIndex = index
+            self._scan(trade, index)
+            return
+        level = trade.sl if trade.eventKind == "sl" else trade.tp
+        price = level
+        if laterBar:
+            # the market gapped through the level: filled at the open
+            marketOpen = bars.open[index] + (0 if trade.isLong else bars.spread[index])
+            favorable = (trade.eventKind == "tp") == trade.isLong
+            price = max(level, marketOpen) if favorable else min(level, marketOpen)
+        self._close(trade, trade.volume, index, float(price), trade.eventKind)
+
+    # Finds the trade's next fill / SL / TP at or after bar `start`. SL wins when both
+    # are hit within the same bar (the order inside a bar is unknown).
+    def _scan(self, trade: SimTrade, start: int):
+        bars = self.bars[trade.symbol]
+        window = SCAN_WINDOW
+        while start < len(bars):
+            stop = min(len(bars), start + window)
+            found = self._firstEvent(trade, bars, start, stop)
+            if found is not None:
+                trade.eventIndex = start + found[0]
+                trade.eventKind = found[1]
+                return
+            start = stop
+            window *= 4
+        trade.eventIndex = len(bars)
+        trade.eventKind = None
+
+    @staticmethod
+    def _firstEvent(trade: SimTrade, bars: Bars, start: int, stop: int):
+        high = bars.high[start:stop]
+        low = bars.low[start:stop]
+        spread = bars.spread[start:stop]
+        if not trade.isPosition:
+            if trade.isLong:
+                index = firstTrue(low + spread <= trade.price)
+            else:
+                index = firstTrue(high >= trade.price)
+            return None if index < 0 else (index, "fill")
+        slIndex = tpIndex = -1
+        if trade.isLong:
+            if trade.sl:
+                slIndex = firstTrue(low <= trade.sl)
+            if trade.tp:
+                tpIndex = firstTrue(high >= trade.tp)
+        else:
+            if trade.sl:
+                slIndex = firstTrue(high + spread >= trade.sl)
+            if trade.tp:
+                tpIndex = firstTrue(low + spread <= trade.tp)
+        if slIndex >= 0 and (tpIndex < 0 or slIndex <= tpIndex):
+            return slIndex, "sl"
+        if tpIndex >= 0:
+            return tpIndex, "tp"
+        return None
+
+    def _execute(self, timestamp: float, alert: Alert, bars: Bars, index: int):
+        command = alert.command
+        if command in ENTRY_COMMANDS:
+            self._open(timestamp, alert, bars, index)
+        elif command in ["NEWSLTPLONG", "NEWSLTPSHORT"]:
+            self._updateSLTP(timestamp, alert)
+        elif command in ["CANCELLONG", "CANCELSHORT"]:
+            for trade in self._targets(alert.comment, positions=False):
+                del self.trades[trade.ticket]
+        elif command == "CANCELALL":
+            for trade in self._bySymbol(alert.symbol, positions=False):
+                del self.trades[trade.ticket]
+        elif command in ["CLOSELONG", "CLOSESHORT"]:
+            perc = alert.perc if alert.perc is not None else 100.0
+            if perc <= 0 or perc > 100:
+                self._reject(timestamp, alert, f"invalid percent {perc}")
+                return
+            for trade in self._targets(alert.comment, orders=False):
+                self._closeAtMarket(timestamp, alert, trade, perc)
+        elif command == "CLOSEALL":
+            for trade in self._bySymbol(alert.symbol, orders=False):
+                self._closeAtMarket(timestamp, alert, trade, 100.0)
+
+    # Same rules as createOrder(): market entries at the ask/bid, sized from the risk
+    # and SL against the current equity, volume snapped to the step, then checked
+    def _open(self, timestamp: float, alert: Alert, bars: Bars, index: int):
+        spec = self.specs[alert.symbol]
+        quote = bars.quote(index)
+        isLong = alert.command in ["BUY", "BUYLIMIT"]
+        isLimit = alert.command.endswith("LIMIT")
+        if isLimit and alert.price is None:
+            self._reject(timestamp, alert, "limit order without a price")
+            return
+        entry = alert.price if isLimit else (quote.ask if isLong else quote.bid)
+        volume = None
+        if alert.risk is not None and 0 < alert.risk < 100 and alert.sl is not None:
+            volume = getPositionSize(
+                alert.symbol,
+                entry,
+                alert.sl,
+                alert.risk,
+                accBalance=self.equity(timestamp),
+            )
+        if volume is not None:
+            volume = snapVolume(volume, spec)
+        reason = checkVolume(volume, spec) or checkStops(
+            spec, quote, isLong, alert.sl, alert.tp, entry if isLimit else None
+        )
+        if reason:
+            self._reject(timestamp, alert, reason)
+            return
+        trade = SimTrade(
+            self._nextTicket,
+            alert.symbol,
+            alert.comment or ("Long entry" if isLong else "Short entry"),
+            isLong,
+            not isLimit,
+            volume,
+            entry,
+        )
+        self._nextTicket += 1
+        trade.sl = alert.sl
+        trade.tp = alert.tp
+        trade.openIndex = index
+        self.trades[trade.ticket] = trade
+        self._scan(trade, index)
+
+    def _updateSLTP(self, timestamp: float, alert: Alert):
+        if alert.sl is None and alert.tp is None:
+            return
+        trades = self._find(alert.comment)
+        if not isSelector(alert.comment):
+            # like findTrade(): the position if there is one, else the order
+            trades = sorted(trades, key=lambda trade: not trade.isPosition)[:1]
+        for trade in trades:
+            bars = self.bars[trade.symbol]
+            # a selector can reach a symbol whose bars ended before the alert
+            index = min(bars.indexAt(timestamp), len(bars) - 1)
+            quote = bars.quote(index)
+            sl = alert.sl if alert.sl is not None else trade.sl
+            tp = alert.tp if alert.tp is not None else trade.tp
+            reason = checkStops(
+                self.specs[trade.symbol],
+                quote,
+                trade.isLong,
+                sl,
+                tp,
+                None if trade.isPosition else trade.price,
+            )
+            if reason:
+                self._reject(timestamp, alert, reason)
+                continue
+            trade.sl = sl
+            trade.tp = tp
+            # bars before this one were already checked against the old levels
+            self._scan(trade, max(trade.openIndex, index))
+
+    def _closeAtMarket(self, timestamp: float, alert: Alert, trade, perc: float):
+        spec = self.specs[trade.symbol]
+        volume = snapVolume(trade.volume * perc / 100, spec)
+        reason = checkVolume(volume, spec)
+        if reason:
+            self._reject(timestamp, alert, reason)
+            return
+        bars = self.bars[trade.symbol]
+        index = min(bars.indexAt(timestamp), len(bars) - 1)
+        quote = bars.quote(index)
+        self._close(trade, volume, index, quote.bid if trade.isLong else quote.ask)
+
+    def _close(
+        self, trade: SimTrade, volume: float, index: int, price: float, reason="close"
+    ):
+        profit = self._profit(trade, volume, price)
+        self.balance += profit
+        bars = self.bars[trade.symbol]
+        self.closed.append(
+            ClosedTrade(
+                trade.ticket,
+                trade.symbol,
+                trade.comment,
+                trade.isLong,
+                volume,
+                int(bars.time[trade.openIndex]),
+                trade.price,
+                int(bars.time[index]),
+                price,
+                profit,
+                reason,
+            )
+        )
+        trade.volume = round(trade.volume - volume, 8)
+        if trade.volume <= 1e-9:
+            self.trades.pop(trade.ticket, None)
+
+    def _profit(self, trade: SimTrade, volume: float, price: float) -> float:
+        spec = self.specs[trade.symbol]
+        move = (price - trade.price) if trade.isLong else (trade.price - price)
+        return move / spec.tickSize * spec.tickValue * volume
+
+    def _find(self, comment: str, positions=True, orders=True) -> list:
+        match = (
+            commentMatcher(comment)
+            if isSelector(comment)
+            else (lambda other: other == comment)
+        )
+        return [
+            trade
+            for trade in list(self.trades.values())
+            if (positions if trade.isPosition else orders)
+            and trade.comment is not None
+            and match(trade.comment)
+        ]
+
+    # like findOrder()/findPosition(): only the first trade with a plain comment,
+    # every match of a selector
+    def _targets(self, comment: str, positions=True, orders=True) -> list:
+        trades = self._find(comment, positions, orders)
+        return trades if isSelector(comment) else trades[:1]
+
+    def _bySymbol(self, symbol: str, positions=True, orders=True) -> list:
+        return [
+            trade
+            for trade in list(self.trades.values())
+            if (positions if trade.isPosition else orders) and trade.symbol == symbol
+        ]
+
+    def _reject(self, timestamp: float, alert: Alert, reason: str):
+        self.rejected.append((timestamp, alert, reason))
+        log.debug("Backtest: alert {} not executed: {}", alert, reason)
+
+
+# Closed trades and the stats the CLI prints
+class BacktestReport:
+    def __init__(self, backtest: Backtest):
+        self.initialBalance = backtest.initialBalance
+        self.finalBalance = backtest.balance
+        self.trades = sorted(backtest.closed, key=lambda trade: trade.exitTime)
+        self.rejected = backtest.rejected
+        self.alertCount = backtest.alertCount
+
+    def equityCurve(self) -> np.ndarray:
+        profits = np.array([trade.profit for trade in self.trades], dtype=float)
+        return self.initialBalance + np.cumsum(profits)
+
+    def summary(self) -> dict:
+        profits = np.array([trade.profit for trade in self.trades], dtype=float)
+        equity = np.concatenate([[self.initialBalance], self.equityCurve()])
+        drawdown = np.maximum.accumulate(equity) - equity
+        grossProfit = float(profits[profits > 0].sum())
+        grossLoss = float(-profits[profits < 0].sum())
+        reasons = {}
+        for trade in self.trades:
+            reasons[trade.reason] = reasons.get(trade.reason, 0) + 1
+        return {
+            "alerts": self.alertCount,
+            "rejected": len(self.rejected),
+            "closedTrades": len(self.trades),
+            "exits": reasons,
+            "winRate": float((profits > 0).mean()) if profits.size else 0.0,
+            "netProfit": float(profits.sum()),
+            "grossProfit": grossProfit,
+            "grossLoss": grossLoss,
+            "profitFactor": grossProfit / grossLoss if grossLoss else None,
+            "maxDrawdown": float(drawdown.max()),
+            "maxDrawdownPct": float((drawdown / np.maximum.accumulate(equity)).max())
+            * 100,
+            "initialBalance": self.initialBalance,
+            "finalBalance": self.finalBalance,
+        }
+
+    def writeTrades(self, path: str):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(ClosedTrade._fields)
+            writer.writerows(self.trades)
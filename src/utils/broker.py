@@ -0,0 +1,64 @@
+import os
+import importlib
+from typing import Protocol
+
+
+# Subset of the `MetaTrader5` module API the EA relies on. Any backend (the real MT5
+# binding or `utils.simulator.MT5Simulator`) exposes these plus the MT5 constants
+# (ORDER_TYPE_*, TRADE_ACTION_*, TRADE_RETCODE_*, ...).
+class Broker(Protocol):
+    def initialize(self, *args, **kwargs) -> bool: ...
+    def login(self, login: int, password: str, server: str) -> bool: ...
+    def shutdown(self): ...
+    def last_error(self) -> tuple: ...
+    def terminal_info(self): ...
+    def account_info(self): ...
+    def symbol_info(self, symbol: str): ...
+    def symbol_info_tick(self, symbol: str): ...
+    def symbol_select(self, symbol: str, enable: bool) -> bool: ...
+    def positions_get(self, **kwargs): ...
+    def positions_total(self) -> int: ...
+    def orders_get(self, **kwargs): ...
+    def orders_total(self) -> int: ...
+    def order_send(self, request: dict): ...
+    def history_deals_get(self, *args, **kwargs): ...
+    def history_orders_get(self, *args, **kwargs): ...
+
+
+# Stand-in for `import MetaTrader5 as mt5`: forwards attribute access to the selected
+# backend. Looked-up attributes are cached on the proxy, so after the first call
+# `mt5.order_send` costs a plain attribute lookup.
+class BrokerProxy:
+    def __init__(self):
+        object.__setattr__(self, "_backend", None)
+
+    # Selects the backend; `BROKER_BACKEND` (`mt5` or `sim`) picks it when never set
+    def use(self, backend: Broker):
+        self.__dict__.clear()
+        object.__setattr__(self, "_backend", backend)
+
+    @property
+    def backend(self) -> Broker:
+        if self._backend is None:
+            self.use(loadBackend(os.getenv("BROKER_BACKEND", "mt5")))
+        return self._backend
+
+    def __getattr__(self, name: str):
+        value = getattr(self.backend, name)
+        object.__setattr__(self, name, value)
+        return value
+
+
+def loadBackend(name: str) -> Broker:
+    if name == "mt5":
+        return importlib.import_module("MetaTrader5")
+    if name == "sim":
+        from utils.simulator import MT5Simulator
+
+        return MT5Simulator.withDefaultSymbols(
+            latency=float(os.getenv("SIM_LATENCY_MS", "0")) / 1000
+        )
+    raise ValueError(f"Unknown broker backend '{name}'. Use 'mt5' or 'sim'.")
+
+
+mt5 = BrokerProxy()
@@ -0,0 +1,111 @@
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+from utils.broker import mt5
+
+
+# Outcome of a single ticket within a bulk operation
+@dataclass(slots=True)
+class TicketResult:
+    ticket: int
+    symbol: str
+    comment: str
+    retcode: Optional[int] = None
+    attempts: int = 0
+    error: Optional[tuple] = None
+
+    # a partial fill is final too: retrying the full request would trade too much
+    @property
+    def ok(self) -> bool:
+        return self.retcode in [
+            mt5.TRADE_RETCODE_DONE,
+            mt5.TRADE_RETCODE_PLACED,
+            mt5.TRADE_RETCODE_DONE_PARTIAL,
+        ]
+
+    # Failed in a way another attempt may fix: the price moved or the terminal/link
+    # didn't answer. Invalid stops/volume or an already closed position would just
+    # fail again.
+    @property
+    def retryable(self) -> bool:
+        return self.retcode is None or self.retcode in [
+            mt5.TRADE_RETCODE_REQUOTE,
+            mt5.TRADE_RETCODE_PRICE_CHANGED,
+            mt5.TRADE_RETCODE_PRICE_OFF,
+            mt5.TRADE_RETCODE_TIMEOUT,
+            mt5.TRADE_RETCODE_CONNECTION,
+        ]
+
+
+@dataclass(slots=True)
+class BulkReport:
+    results: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def succeeded(self) -> list:
+        return [r for r in self.results if r.ok]
+
+    @property
+    def failed(self) -> list:
+        return [r for r in self.results if not r.ok]
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.succeeded)}/{len(self.results)} succeeded, "
+            f"{len(self.failed)} failed in {self.elapsed * 1000:.1f}ms"
+        )
+
+
+# Sends `(trade, request)` pairs concurrently over a bounded thread pool and retries
+# tickets that failed transiently up to `retries` more times. `send` is the function doing `order_send`;
+# `rebuild(trade)` (optional) builds a fresh request for retries, e.g. with a new price.
+def runBulk(
+    items: list,
+    send: Callable,
+    maxWorkers: int = 8,
+    retries: int = 1,
+    rebuild: Optional[Callable] = None,
+) -> BulkReport:
+    start = time.monotonic()
+    results = {
+        trade.ticket: TicketResult(trade.ticket, trade.symbol, trade.comment)
+        for trade, _ in items
+    }
+
+    def execute(item):
+        trade, request = item
+        ticketResult = results[trade.ticket]
+        ticketResult.attempts += 1
+        result = send(request)
+        if result is None:
+            ticketResult.retcode = None
+            ticketResult.error = mt5.last_error()
+        else:
+            ticketResult.retcode = result.retcode
+            ticketResult.error = None
+        return item
+
+    pending = list(items)
+    if not pending:
+        return BulkReport([], 0.0)
+    # run sends in the caller's context (e.g. the journal's current alert)
+    context = contextvars.copy_context()
+
+    def executeInContext(item):
+        return context.copy().run(execute, item)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(maxWorkers, len(items)))) as pool:
+        for attempt in range(retries + 1):
+            if not pending:
+                break
+            if attempt and rebuild is not None:
+                pending = [(trade, rebuild(trade)) for trade, _ in pending]
+            pending = [
+                item
+                for item in pool.map(executeInContext, pending)
+                if results[item[0].ticket].retryable
+            ]
+    return BulkReport(list(results.values()), time.monotonic() - start)
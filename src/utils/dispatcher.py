@@ -0,0 +1,143 @@
+import time
+import queue
+import threading
+from typing import Callable
+from utils import metrics
+from utils.logger import log
+from utils.orderBook import isSelector
+
+
+# Runs alerts off the websocket thread on a pool of workers. Alerts are sharded by
+# symbol (or comment) so each key always lands on the same worker and keeps its order
+# (a BUY lands before its NEWSLTPLONG) while unrelated symbols run concurrently.
+# Alerts with a `glob:` selector comment can touch trades of any symbol, so they go
+# through a serial lane instead: queued on every worker, handled once all workers
+# reached it, with every worker paused meanwhile. They run after every alert
+# submitted before them and before every alert submitted after them.
+# `submit` expects a single producer thread (the websocket's or an account's inbox).
+class AlertDispatcher:
+    def __init__(
+        self,
+        handler: Callable,
+        workers: int = 4,
+        queueSize: int = 256,
+        backpressure: str = "block",
+        timeout: float = 5.0,
+    ):
+        if backpressure not in ["block", "drop"]:
+            raise ValueError(f"Invalid backpressure policy '{backpressure}'.")
+        self.handler = handler
+        self.backpressure = backpressure
+        self.timeout = timeout
+        self._queues = [queue.Queue(maxsize=queueSize) for _ in range(workers)]
+        self._threads = []
+        self._statsLock = threading.Lock()
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+        self.lastLag = 0.0
+        self.maxLag = 0.0
+
+    def start(self):
+        if self._threads:
+            return
+        for workerQueue in self._queues:
+            thread = threading.Thread(
+                target=self._worker, args=(workerQueue,), daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    # Waits for queued alerts to finish and stops the workers
+    def stop(self):
+        for workerQueue in self._queues:
+            workerQueue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    # Queues an alert; returns False if it was dropped because of backpressure
+    def submit(self, data) -> bool:
+        if isSelector(data.get("comment") or ""):
+            return self._submitSerial(data)
+        key = self.keyOf(data)
+        workerQueue = self._queues[hash(key) % len(self._queues)]
+        item = (time.monotonic(), data, None)
+        try:
+            if self.backpressure == "drop":
+                workerQueue.put_nowait(item)
+            else:
+                workerQueue.put(item, timeout=self.timeout)
+        except queue.Full:
+            return self._drop(key, data)
+        with self._statsLock:
+            self.submitted += 1
+        return True
+
+    # The serial lane: one item on every queue, so it either goes on all or on none
+    # (with a single producer, free slots can only grow while we wait for them)
+    def _submitSerial(self, data) -> bool:
+        deadline = time.monotonic() + (
+            0.0 if self.backpressure == "drop" else self.timeout
+        )
+        while any(workerQueue.full() for workerQueue in self._queues):
+            if time.monotonic() >= deadline:
+                return self._drop("serial", data)
+            time.sleep(0.001)
+        queuedAt = time.monotonic()
+        barrier = threading.Barrier(
+            len(self._queues), action=lambda: self._handle(queuedAt, data)
+        )
+        for workerQueue in self._queues:
+            workerQueue.put_nowait((queuedAt, data, barrier))
+        with self._statsLock:
+            self.submitted += 1
+        return True
+
+    def _drop(self, key: str, data) -> bool:
+        with self._statsLock:
+            self.dropped += 1
+        log.warning("⚠️ Alert queue for '{}' is full. Dropping alert: {}", key, data)
+        return False
+
+    @staticmethod
+    def keyOf(data) -> str:
+        return data.get("symbol") or data.get("comment") or ""
+
+    def depth(self) -> int:
+        return sum(workerQueue.qsize() for workerQueue in self._queues)
+
+    def stats(self) -> dict:
+        with self._statsLock:
+            return {
+                "depth": self.depth(),
+                "submitted": self.submitted,
+                "processed": self.processed,
+                "dropped": self.dropped,
+                "lastLag": self.lastLag,
+                "maxLag": self.maxLag,
+            }
+
+    def _worker(self, workerQueue: queue.Queue):
+        while True:
+            item = workerQueue.get()
+            if item is None:
+                return
+            queuedAt, data, barrier = item
+            if barrier is None:
+                self._handle(queuedAt, data)
+            else:
+                # the last worker to arrive runs the alert, the others wait for it
+                barrier.wait()
+
+    def _handle(self, queuedAt: float, data):
+        lag = time.monotonic() - queuedAt
+        metrics.record("queue", lag, data.get("command"), data.get("symbol"))
+        try:
+            self.handler(data)
+        except Exception as e:
+            log.error("Error while handling alert {}: {}", data, e)
+        with self._statsLock:
+            self.processed += 1
+            self.lastLag = lag
+            self.maxLag = max(self.maxLag, lag)
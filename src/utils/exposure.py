@@ -0,0 +1,248 @@
+import os
+import itertools
+import threading
+from typing import Optional
+from utils.symbolCache import SymbolSpec, symbolSpecs
+from utils.accountCache import accountCache
+from utils.orderBook import orderBook
+from utils.preTrade import isLongTrade
+
+
+# Money lost if the trade is stopped out: distance to SL x tick value x volume. Zero
+# once the SL locks in profit, None without an SL (the risk can't be bounded).
+def riskOf(
+    spec: SymbolSpec, isLong: bool, price: float, sl: Optional[float], volume: float
+) -> Optional[float]:
+    if not sl:
+        return None
+    distance = price - sl if isLong else sl - price
+    if distance <= 0 or not spec.tickSize:
+        return 0.0
+    return distance / spec.tickSize * spec.tickValue * volume
+
+
+# "p0.1-EUR-A" -> "p0.1"
+def strategyOf(comment: Optional[str], separator: str) -> str:
+    return (comment or "").split(separator, 1)[0]
+
+
+# Open risk of every position and pending order, totalled per symbol, per currency
+# (base and profit currency of the symbol), per strategy (comment prefix) and overall.
+# Kept up to date from the order book's add/remove events instead of rescanning
+# `positions_get()`, so `reserve()` checks the caps in O(1) before an order is sent.
+# Caps are % of equity; 0 disables one. A trade without an SL has no bounded risk: it's
+# charged `noSLRisk`% of equity against every cap, and with `noSLRisk = 0` entries
+# without an SL are rejected while any cap is set.
+class ExposureBook:
+    def __init__(self):
+        self.maxSymbolRisk = 0.0
+        self.maxCurrencyRisk = 0.0
+        self.maxStrategyRisk = 0.0
+        self.maxTotalRisk = 0.0
+        self.noSLRisk = 0.0
+        self.strategySeparator = "-"
+        self.total = 0.0
+        self.bySymbol = {}
+        self.byCurrency = {}
+        self.byStrategy = {}
+        # ticket -> (risk, symbol, currencies, strategy); risk is None without an SL
+        self._entries = {}
+        # trades without an SL, counted like the totals: "total", ("symbol", symbol),
+        # ("currency", currency) or ("strategy", strategy) -> count
+        self._unprotected = {}
+        # ticket -> (trade, isPosition) of trades whose symbol spec wasn't cached yet
+        self._unresolved = {}
+        # in-flight orders, keyed by negative numbers so they never clash with tickets
+        self._reservations = itertools.count(-1, -1)
+        self._lock = threading.Lock()
+
+    # Caps from EXPOSURE_MAX_* (% of equity), the charge for trades without an SL and
+    # the strategy prefix separator
+    def configure(self):
+        self.maxSymbolRisk = float(os.getenv("EXPOSURE_MAX_SYMBOL", "0"))
+        self.maxCurrencyRisk = float(os.getenv("EXPOSURE_MAX_CURRENCY", "0"))
+        self.maxStrategyRisk = float(os.getenv("EXPOSURE_MAX_STRATEGY", "0"))
+        self.maxTotalRisk = float(os.getenv("EXPOSURE_MAX_TOTAL", "0"))
+        self.noSLRisk = float(os.getenv("EXPOSURE_NO_SL_RISK", "0"))
+        self.strategySeparator = os.getenv("EXPOSURE_STRATEGY_SEPARATOR", "-")
+
+    @property
+    def enabled(self) -> bool:
+        return bool(
+            self.maxSymbolRisk
+            or self.maxCurrencyRisk
+            or self.maxStrategyRisk
+            or self.maxTotalRisk
+        )
+
+    # Checks that adding `risk` (None without an SL) on `spec.symbol` for `comment`'s
+    # strategy stays within every cap and, if so, counts it right away so concurrent
+    # orders see it. Returns `(reason, None)` if the order must not be sent, else
+    # `(None, reservation)` to `release()` once it was sent (its fill is in the book
+    # by then).
+    def reserve(self, spec: SymbolSpec, comment: Optional[str], risk: Optional[float]):
+        if not self.enabled:
+            return None, None
+        if risk is None and not self.noSLRisk:
+            return "no SL, so its risk can't be counted against the caps", None
+        snapshot = accountCache.get()
+        if snapshot is None:
+            return "account equity is not available", None
+        self.resolve()
+        entry = self._entryFor(spec, comment, risk)
+        with self._lock:
+            reason = self._exceeded(entry, snapshot.equity)
+            if reason:
+                return reason, None
+            key = next(self._reservations)
+            self._add(key, entry)
+        return None, key
+
+    def release(self, reservation: Optional[int]):
+        if reservation is not None:
+            with self._lock:
+                self._remove(reservation)
+
+    # Loads the specs the order book's events couldn't, outside of any lock
+    def resolve(self):
+        if not self._unresolved:
+            return
+        with self._lock:
+            pending = list(self._unresolved.items())
+        for ticket, (trade, isPosition) in pending:
+            spec = symbolSpecs.get(trade.symbol)
+            if spec is None:
+                continue
+            with self._lock:
+                # skip it if it was removed or replaced meanwhile
+                if self._unresolved.get(ticket) == (trade, isPosition):
+                    del self._unresolved[ticket]
+                    self._add(ticket, self._tradeEntry(spec, trade, isPosition))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "total": round(self.total, 2),
+                "bySymbol": {k: round(v, 2) for k, v in self.bySymbol.items()},
+                "byCurrency": {k: round(v, 2) for k, v in self.byCurrency.items()},
+                "byStrategy": {k: round(v, 2) for k, v in self.byStrategy.items()},
+                "unprotected": int(self._unprotected.get("total", 0)),
+                "unresolved": len(self._unresolved),
+            }
+
+    # -- order book listener --
+
+    # Called under the order book's lock, so it never reaches the terminal: a trade
+    # whose symbol spec isn't cached yet is counted by the next `resolve()`
+    def onAdd(self, trade, isPosition: bool):
+        spec = symbolSpecs.peek(trade.symbol)
+        with self._lock:
+            self._remove(trade.ticket)
+            self._unresolved.pop(trade.ticket, None)
+            if spec is None:
+                self._unresolved[trade.ticket] = (trade, isPosition)
+            else:
+                self._add(trade.ticket, self._tradeEntry(spec, trade, isPosition))
+
+    def onRemove(self, trade, isPosition: bool):
+        with self._lock:
+            self._remove(trade.ticket)
+            self._unresolved.pop(trade.ticket, None)
+
+    def onReset(self):
+        with self._lock:
+            for ticket in [ticket for ticket in self._entries if ticket > 0]:
+                self._remove(ticket)
+            self._unresolved.clear()
+
+    def _tradeEntry(self, spec: SymbolSpec, trade, isPosition: bool):
+        volume = trade.volume if isPosition else trade.volume_current
+        risk = riskOf(
+            spec, isLongTrade(trade, isPosition), trade.price_open, trade.sl, volume
+        )
+        return self._entryFor(spec, trade.comment, risk)
+
+    def _entryFor(self, spec: SymbolSpec, comment: Optional[str], risk):
+        currencies = tuple(dict.fromkeys([spec.currencyBase, spec.currencyProfit]))
+        return (
+            risk,
+            spec.symbol,
+            currencies,
+            strategyOf(comment, self.strategySeparator),
+        )
+
+    def _exceeded(self, entry: tuple, equity: float) -> Optional[str]:
+        risk, symbol, currencies, strategy = entry
+        charge = equity * self.noSLRisk / 100
+        if risk is None:
+            risk = charge
+        # (cap %, risk counted so far, key of its trades without an SL, label)
+        checks = [
+            (self.maxTotalRisk, self.total, "total", "total"),
+            (
+                self.maxSymbolRisk,
+                self.bySymbol.get(symbol, 0.0),
+                ("symbol", symbol),
+                f"symbol {symbol}",
+            ),
+            (
+                self.maxStrategyRisk,
+                self.byStrategy.get(strategy, 0.0),
+                ("strategy", strategy),
+                f"strategy '{strategy}'",
+            ),
+        ] + [
+            (
+                self.maxCurrencyRisk,
+                self.byCurrency.get(currency, 0.0),
+                ("currency", currency),
+                currency,
+            )
+            for currency in currencies
+        ]
+        for capPercent, current, unprotectedKey, label in checks:
+            current += self._unprotected.get(unprotectedKey, 0) * charge
+            cap = equity * capPercent / 100
+            if capPercent and current + risk > cap + 1e-9:
+                return (
+                    f"open risk on {label} would be {current + risk:.2f} "
+                    f"(cap {capPercent}% of equity = {cap:.2f})"
+                )
+        return None
+
+    def _add(self, key: int, entry: tuple):
+        self._entries[key] = entry
+        self._apply(entry, 1)
+
+    def _remove(self, key: int):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._apply(entry, -1)
+
+    def _apply(self, entry: tuple, sign: int):
+        risk, symbol, currencies, strategy = entry
+        if risk is None:
+            for key in ["total", ("symbol", symbol), ("strategy", strategy)] + [
+                ("currency", currency) for currency in currencies
+            ]:
+                self._bump(self._unprotected, key, sign)
+            return
+        # reset when empty so float error doesn't accumulate over a long session
+        self.total = self.total + sign * risk if self._entries else 0.0
+        self._bump(self.bySymbol, symbol, sign * risk)
+        self._bump(self.byStrategy, strategy, sign * risk)
+        for currency in currencies:
+            self._bump(self.byCurrency, currency, sign * risk)
+
+    @staticmethod
+    def _bump(totals: dict, key, amount: float):
+        value = totals.get(key, 0.0) + amount
+        # drop keys that are back to (about) nothing, so sums don't drift forever
+        if abs(value) < 1e-9:
+            totals.pop(key, None)
+        else:
+            totals[key] = value
+
+
+exposure = ExposureBook()
+orderBook.subscribe(exposure)
@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import queue
+import threading
+import multiprocessing
+from utils import metrics
+from utils.logger import log
+from utils.alerts import Alert
+
+# Account settings copied into each worker's environment before it connects
+ACCOUNT_ENV = {
+    "login": "MT5_LOGIN",
+    "password": "MT5_PASSWORD",
+    "server": "MT5_SERVER",
+    "path": "MT5_PATH",
+}
+
+
+# Entry point of one account's worker process: binds to that account's terminal and
+# runs alerts through its own dispatcher, so sizing uses that account's equity.
+# Reports `(account, command, symbol, seconds, error)` per alert on `results`, `error`
+# being None only for alerts the handler reports as executed.
+def runAccount(account: dict, inbox, results):
+    for key, envName in ACCOUNT_ENV.items():
+        if account.get(key) is not None:
+            os.environ[envName] = str(account[key])
+    for envName, value in account.get("env", {}).items():
+        os.environ[envName] = str(value)
+    name = account["name"]
+    # one log file per account, unless the account's overrides name its own
+    if os.getenv("EA_LOG_FILE") and "EA_LOG_FILE" not in account.get("env", {}):
+        os.environ["EA_LOG_FILE"] = f"{os.environ['EA_LOG_FILE']}.{name}"
+    # the spawned process already built these singletons when it re-imported main.py
+    # as `__mp_main__`: their settings are (re)read here, from this account's env
+    from utils.settings import applySettings
+    from utils.handler import handleAlert
+    from utils.warmup import warmUp, configuredSymbols
+    from utils.dispatcher import AlertDispatcher
+    from utils.idempotency import alertDedup
+    from utils.session import session
+    from utils.tickCache import tickCache
+    from utils.symbolCache import symbolSpecs
+    from utils.orderBook import orderBook
+    from utils.journal import journal, openJournal
+    from utils.tradeEvents import tradeEvents
+
+    applySettings()
+    # duplicates are dropped once, in the process receiving the alerts
+    alertDedup.ttl = 0
+
+    def handle(alert: Alert):
+        start = time.perf_counter()
+        error = None
+        try:
+            if not handleAlert(alert):
+                error = "not executed"
+        except Exception as e:
+            error = repr(e)
+            log.error("[{}] Alert {} failed: {}", name, alert, e)
+        results.put(
+            (name, alert.command, alert.symbol, time.perf_counter() - start, error)
+        )
+
+    warmUp(configuredSymbols(), float(os.getenv("WARMUP_TIMEOUT", "30")))
+    if os.getenv("EA_JOURNAL", "journal.bin"):
+        # one journal per account, reconciled against that account's book
+        openJournal(f"{os.getenv('EA_JOURNAL', 'journal.bin')}.{name}", orderBook)
+    tickCache.start()
+    symbolSpecs.start()
+    if tradeEvents.pollInterval:
+        tradeEvents.start()
+    dispatcher = AlertDispatcher(
+        handle,
+        workers=int(os.getenv("DISPATCH_WORKERS", "4")),
+        queueSize=int(os.getenv("DISPATCH_QUEUE_SIZE", "256")),
+        backpressure=os.getenv("DISPATCH_BACKPRESSURE", "block"),
+        timeout=float(os.getenv("DISPATCH_TIMEOUT", "5")),
+    )
+    dispatcher.start()
+    while (alert := inbox.get()) is not None:
+        journal.received(alert)
+        if not dispatcher.submit(alert):
+            journal.discard(alert)
+    tradeEvents.stop()
+    dispatcher.stop()
+    journal.close()
+    session.stop()
+    log.flush()
+
+
+# Per-account outcome counters and latency, aggregated in the receiving process
+class AccountStats:
+    __slots__ = ("sent", "ok", "failed", "dropped", "latency")
+
+    def __init__(self):
+        self.sent = 0
+        self.ok = 0
+        self.failed = 0
+        self.dropped = 0
+        self.latency = metrics.Histogram()
+
+    def summary(self) -> dict:
+        latency = self.latency.summary()
+        return {
+            "sent": self.sent,
+            "ok": self.ok,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "pending": self.sent - self.ok - self.failed,
+            "p50": latency["p50"],
+            "p95": latency["p95"],
+            "max": latency["max"],
+        }
+
+
+# Copies every alert to one worker process per account (the MT5 binding attaches to
+# a single terminal per process). Each account has its own bounded inbox, so a slow
+# or stuck account only backs up (and eventually drops) its own alerts.
+class AccountPool:
+    def __init__(self, accounts: list, queueSize: int = 256):
+        names = [account.get("name") for account in accounts]
+        if not accounts or None in names or len(set(names)) != len(names):
+            raise ValueError("Every account needs a unique 'name'.")
+        self.accounts = accounts
+        self._context = multiprocessing.get_context("spawn")
+        self._inboxes = {name: self._context.Queue(queueSize) for name in names}
+        self._results = self._context.Queue()
+        self._processes = []
+        self._collector = None
+        self._stats = {name: AccountStats() for name in names}
+
+    # `[{"name": "ftmo-1", "login": 123, "password": "...", "server": "...",
+    #    "path": "C:/.../terminal64.exe", "env": {"BULK_WORKERS": "4"}}, ...]`
+    @classmethod
+    def fromFile(cls, path: str, **kwargs) -> "AccountPool":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), **kwargs)
+
+    def start(self):
+        if self._processes:
+            return
+        for account in self.accounts:
+            process = self._context.Process(
+                target=runAccount,
+                args=(account, self._inboxes[account["name"]], self._results),
+                name=f"account-{account['name']}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    # Queues the alert for every account; returns how many accounts accepted it
+    def submit(self, alert: Alert) -> int:
+        accepted = 0
+        for name, inbox in self._inboxes.items():
+            try:
+                inbox.put_nowait(alert)
+            except queue.Full:
+                self._stats[name].dropped += 1
+                log.warning(
+                    "⚠️ Inbox of account '{}' is full. Dropping: {}", name, alert
+                )
+                continue
+            self._stats[name].sent += 1
+            accepted += 1
+        return accepted
+
+    # Lets every account finish its queued alerts, then stops the workers
+    def stop(self, timeout: float = 30.0):
+        for inbox in self._inboxes.values():
+            inbox.put(None)
+        deadline = time.monotonic() + timeout
+        for process in self._processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                log.warning("Account worker '{}' did not stop in time.", process.name)
+                process.terminate()
+        self._processes = []
+        self._results.put(None)
+        if self._collector is not None:
+            self._collector.join(timeout=1)
+
+    def stats(self) -> dict:
+        return {name: stats.summary() for name, stats in self._stats.items()}
+
+    def _collect(self):
+        while (result := self._results.get()) is not None:
+            name, command, symbol, seconds, error = result
+            stats = self._stats[name]
+            if error is None:
+                stats.ok += 1
+            else:
+                stats.failed += 1
+            stats.latency.record(seconds)
+            metrics.record(f"account:{name}", seconds, command, symbol)
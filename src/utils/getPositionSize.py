@@ -1,65 +1,156 @@
-import MetaTrader5 as mt5
+from utils.broker import mt5
+import numpy as np
 from typing import Optional
-
-
-# getDecimalCount(0.0001) => 4
-# getDecimalCount(1e-05) => 5
-def getDecimalCount(number):
-    numberStr = f"{number:.10f}"
-    decimalCount = len(numberStr.split(".")[1]) if "." in numberStr else 0
-    return decimalCount
+from utils.symbolCache import symbolSpecs
+from utils.accountCache import accountCache
+from utils.logger import log
 
 
 # Calculates qty (Volume) based on account equity and a given risk (%)
 # riskPercent should be from 0 to 100. Example: 1.245 means 1.245% of the equity
+# Equity comes from the account cache unless `accBalance` is given; `freshEquity`
+# re-reads it from MT5 first.
 def getPositionSize(
     symbol: str,
     entry,
     sl,
     riskPercent: float = 1.0,
     accBalance: Optional[float] = None,
+    freshEquity: bool = False,
 ):
-    symInfo = mt5.symbol_info(symbol)
-    if symInfo is None:
-        print(f"> Symbol {symbol} not found.")
+    spec = symbolSpecs.get(symbol)
+    if spec is None:
+        log.error("Symbol {} not found.", symbol)
         return None
-    if not symInfo.visible:
-        mt5.symbol_select(symbol, True)
 
     if float(riskPercent) < 0 or float(riskPercent) > 100:
-        print(f"> Risk amount of '{riskPercent}%' is invalid. (Use 0-100)")
+        log.error("Risk amount of '{}%' is invalid. (Use 0-100)", riskPercent)
         return 0.0
 
-    tickSize = symInfo.trade_tick_size
-    tickValue = symInfo.trade_tick_value
-    volumeStep = symInfo.volume_step
-    roundPoint = getDecimalCount(symInfo.point) + 1
+    tickSize = spec.tickSize
+    tickValue = spec.tickValue
+    volumeStep = spec.volumeStep
+    roundPoint = spec.roundPoint
 
     if tickSize == 0 or tickValue == 0 or volumeStep == 0:
-        print(f"> symInfo: {symInfo}")
-        print(
-            f"> 🧮 getPositionSize(): Volume cannot be calculated; tickSize: {tickSize}, tickValue: {tickValue}, volumeStep: {volumeStep}"
+        log.error(
+            "🧮 getPositionSize(): Volume cannot be calculated; tickSize: {}, tickValue: {}, volumeStep: {}; spec: {}",
+            tickSize,
+            tickValue,
+            volumeStep,
+            spec,
         )
         return None
 
-    accountBalance = accBalance if accBalance is not None else mt5.account_info().equity
+    if accBalance is not None:
+        accountBalance = accBalance
+        equityAge = "given"
+    else:
+        snapshot = accountCache.get(forceRefresh=freshEquity)
+        if snapshot is None:
+            log.error("Account info is not available. Error: {}", mt5.last_error())
+            return None
+        accountBalance = snapshot.equity
+        equityAge = f"{snapshot.age * 1000:.0f}ms old"
     riskAmount = accountBalance * (riskPercent / 100)
     distanceToSL = round(abs(entry - sl), roundPoint)
     volumeStepAmount = (distanceToSL / tickSize) * tickValue * volumeStep
 
     if volumeStepAmount == 0:
-        print(f"> symInfo: {symInfo}")
-        print(
-            f"> 🧮 getPositionSize(): Volume cannot be calculated; distanceToSL: {distanceToSL}, roundPoint: {roundPoint}, volumeStepAmount: {volumeStepAmount}, tickSize: {tickSize}, tickValue: {tickValue}, volumeStep: {volumeStep}"
+        log.error(
+            "🧮 getPositionSize(): Volume cannot be calculated; distanceToSL: {}, roundPoint: {}, volumeStepAmount: {}; spec: {}",
+            distanceToSL,
+            roundPoint,
+            volumeStepAmount,
+            spec,
         )
         return None
 
     qty = riskAmount / volumeStepAmount * volumeStep
     volume = round(qty, 2)
-    print(
-        f"> 🧮 getPositionSize(): accountBalance: {accountBalance}, riskAmount: {riskAmount}, distanceToSL: {distanceToSL}, volumeStepAmount: {volumeStepAmount}, qty: {qty}"
+    log.debug(
+        "🧮 getPositionSize(): accountBalance: {}, riskAmount: {}, distanceToSL: {}, volumeStepAmount: {}, qty: {}",
+        accountBalance,
+        riskAmount,
+        distanceToSL,
+        volumeStepAmount,
+        qty,
     )
-    print(
-        f"> 🧮 Calculated volume: '{volume}' for symbol: {symbol} with entry: {entry}, sl: {sl}, and riskPercent: {riskPercent}%"
+    log.info(
+        "🧮 Calculated volume: '{}' for symbol: {} with entry: {}, sl: {}, and riskPercent: {}% of equity {} ({})",
+        volume,
+        symbol,
+        entry,
+        sl,
+        riskPercent,
+        accountBalance,
+        equityAge,
     )
     return volume
+
+
+# Same as the built-in round(), vectorized. np.round scales by 10**digits first, which
+# can push values sitting right on a half across the boundary, so those few are
+# recomputed with round() to keep results identical to the scalar function.
+def roundLikePython(values: np.ndarray, digits) -> np.ndarray:
+    digits = np.broadcast_to(digits, values.shape)
+    scale = np.power(10.0, digits)
+    scaled = values * scale
+    rounded = np.rint(scaled) / scale
+    nearHalf = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) <= (
+        np.abs(scaled) * 1e-12 + 1e-12
+    )
+    for i in np.flatnonzero(nearHalf):
+        rounded[i] = round(float(values[i]), int(digits[i]))
+    return rounded
+
+
+# Vectorized getPositionSize() for many trades at once (baskets, what-if dashboards).
+# Results match the scalar function element by element: NaN where it returns None
+# (unknown symbol, zero tick size/value/volume step, zero distance to SL) and 0.0
+# where the risk percent is invalid.
+def getPositionSizes(
+    symbols,
+    entries,
+    sls,
+    riskPercents,
+    accBalance: Optional[float] = None,
+    freshEquity: bool = False,
+) -> np.ndarray:
+    uniqueSymbols, symbolIndex = np.unique(np.asarray(symbols), return_inverse=True)
+    entries = np.asarray(entries, dtype=float)
+    sls = np.asarray(sls, dtype=float)
+    riskPercents = np.broadcast_to(np.asarray(riskPercents, dtype=float), entries.shape)
+
+    specs = [symbolSpecs.get(str(symbol)) for symbol in uniqueSymbols]
+
+    # spec attribute per trade (0 where the symbol wasn't found)
+    def column(attr: str) -> np.ndarray:
+        values = [getattr(spec, attr) if spec else 0 for spec in specs]
+        return np.array(values)[symbolIndex]
+
+    found = np.array([spec is not None for spec in specs])[symbolIndex]
+    tickSize = column("tickSize")
+    tickValue = column("tickValue")
+    volumeStep = column("volumeStep")
+    roundPoint = column("roundPoint")
+
+    if accBalance is not None:
+        accountBalance = accBalance
+    else:
+        snapshot = accountCache.get(forceRefresh=freshEquity)
+        accountBalance = snapshot.equity if snapshot is not None else np.nan
+    validRisk = (riskPercents >= 0) & (riskPercents <= 100)
+    validSpec = (tickSize != 0) & (tickValue != 0) & (volumeStep != 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        riskAmount = accountBalance * (riskPercents / 100)
+        distanceToSL = roundLikePython(np.abs(entries - sls), roundPoint)
+        volumeStepAmount = (distanceToSL / tickSize) * tickValue * volumeStep
+        qty = riskAmount / volumeStepAmount * volumeStep
+        volumes = roundLikePython(qty, 2)
+
+    volumes[~(validSpec & (volumeStepAmount != 0))] = np.nan
+    volumes[~validRisk] = 0.0
+    volumes[~found] = np.nan
+    return volumes
@@ -1,7 +1,14 @@
 import os
-import MetaTrader5 as mt5
+from functools import partial
+from utils import metrics
+from utils.logger import log
+from utils.session import session
+from utils.idempotency import alertDedup
+from utils.journal import journal
+from utils.alerts import Alert, AlertError, COMMANDS, decodeAlert
+from utils.broker import mt5
+from utils.bulk import BulkReport
 from utils.operations import (
-    initializeMT5,
     createOrder,
     updateSLTP,
     cancelPendingOrder,
@@ -11,46 +18,108 @@ from utils.operations import (
 )
 
 
-def handleAlert(data):
-    initializeMT5()
-    print(f"> Received data: {data}")
-
-    if data.get("licenseId") != os.getenv("LICENSE_ID"):
-        print(f"> License '{data.get('licenseId')}' is invalid. Can not continue.")
-        mt5.shutdown()
-        return
-    if data.get("command") is None:
-        print(f"> Invalid command '{data.get('command')}'. Can not continue.")
-        mt5.shutdown()
-        return
-    if data.get("symbol") is None:
-        print(f"> Invalid symbol '{data.get('symbol')}'. Can not continue.")
-        mt5.shutdown()
-        return
-
-    # create order / open position
-    if data.get("command") in ["BUY", "SELL", "BUYLIMIT", "SELLLIMIT"]:
-        order = createOrder(
-            symbol=data.get("symbol"),
-            risk=data.get("risk"),
-            isLong=data.get("command") in ["BUY", "BUYLIMIT"],
-            entry=data.get("price"),
-            sl=data.get("sl"),
-            tp=data.get("tp"),
-            isLimit=data.get("command") in ["BUYLIMIT", "SELLLIMIT"],
-            comment=data.get("comment"),
-        )
-        print(f"> Created order: {order}" )
+# create order / open position
+def openTrade(alert: Alert, isLong: bool, isLimit: bool):
+    order = createOrder(
+        symbol=alert.symbol,
+        risk=alert.risk,
+        isLong=isLong,
+        entry=alert.price,
+        sl=alert.sl,
+        tp=alert.tp,
+        isLimit=isLimit,
+        comment=alert.comment,
+    )
+    log.info("Created order: {}", order)
+    return order
+
+
+# command -> operation, built once instead of re-evaluating an if/elif chain per alert
+commandTable = {
+    "BUY": partial(openTrade, isLong=True, isLimit=False),
+    "BUYLIMIT": partial(openTrade, isLong=True, isLimit=True),
+    "SELL": partial(openTrade, isLong=False, isLimit=False),
+    "SELLLIMIT": partial(openTrade, isLong=False, isLimit=True),
     # update sl/tp
-    elif data.get("command") in ["NEWSLTPLONG", "NEWSLTPSHORT"]:
-        updateSLTP(data.get("comment"), data.get("sl"), data.get("tp"))
+    "NEWSLTPLONG": lambda alert: updateSLTP(alert.comment, alert.sl, alert.tp),
+    "NEWSLTPSHORT": lambda alert: updateSLTP(alert.comment, alert.sl, alert.tp),
     # cancel pending order(s)
-    elif data.get("command") in ["CANCELLONG", "CANCELSHORT"]:
-        cancelPendingOrder(data.get('comment'))
-    elif data.get("command") in ["CANCELALL"]:
-        cancelAll(data.get('symbol'))
+    "CANCELLONG": lambda alert: cancelPendingOrder(alert.comment),
+    "CANCELSHORT": lambda alert: cancelPendingOrder(alert.comment),
+    "CANCELALL": lambda alert: cancelAll(alert.symbol),
     # close open position(s)
-    elif data.get("command") in ["CLOSELONG", "CLOSESHORT"]:
-        closePosition(data.get("comment"), data.get("perc"))
-    elif data.get("command") in ["CLOSEALL"]:
-        closeAllPositions(data.get("symbol"))
+    "CLOSELONG": lambda alert: closePosition(alert.comment, alert.perc),
+    "CLOSESHORT": lambda alert: closePosition(alert.comment, alert.perc),
+    "CLOSEALL": lambda alert: closeAllPositions(alert.symbol),
+}
+assert commandTable.keys() == COMMANDS
+
+
+# Whether what a command returned means it did what the alert asked: an order result
+# with a success retcode, or a batch where no ticket failed. None means the command was
+# rejected before sending or found nothing to act on.
+def succeeded(outcome) -> bool:
+    if outcome is None:
+        return False
+    if isinstance(outcome, BulkReport):
+        return not outcome.failed
+    return outcome.retcode in [
+        mt5.TRADE_RETCODE_DONE,
+        mt5.TRADE_RETCODE_PLACED,
+        mt5.TRADE_RETCODE_DONE_PARTIAL,
+    ]
+
+
+# Accepts a decoded Alert, or a raw dict/JSON/plain-text alert which is decoded first.
+# Returns True if the alert was executed successfully.
+def handleAlert(data) -> bool:
+    if not isinstance(data, Alert):
+        try:
+            with metrics.span("parse"):
+                data = decodeAlert(data)
+        except AlertError as e:
+            log.error("Invalid alert {}: {} Can not continue.", data, e)
+            metrics.count("alertsRejected", command="-", reason="invalid")
+            return False
+    metrics.count("alertsReceived", command=data.command)
+    metrics.setContext(data.command, data.symbol)
+    seq = journal.begin(data)
+    ok = False
+    try:
+        with metrics.span("total"):
+            ok = executeAlert(data)
+        return ok
+    finally:
+        journal.end(seq, executed=ok)
+
+
+def executeAlert(alert: Alert) -> bool:
+    log.info("Received data: {}", alert)
+
+    with metrics.span("validate"):
+        if alert.licenseId != os.getenv("LICENSE_ID"):
+            log.error("License '{}' is invalid. Can not continue.", alert.licenseId)
+            metrics.count("alertsRejected", command=alert.command, reason="license")
+            return False
+    with metrics.span("session"):
+        if not session.connected:
+            log.error("MT5 session is not connected. Can not continue.")
+            metrics.count("alertsRejected", command=alert.command, reason="session")
+            return False
+    with metrics.span("dedup"):
+        if alertDedup.isDuplicate(alert):
+            log.warning("Duplicate alert dropped: {}", alert)
+            metrics.count("alertsRejected", command=alert.command, reason="duplicate")
+            return False
+
+    ok = False
+    try:
+        ok = succeeded(commandTable[alert.command](alert))
+    finally:
+        if not ok:
+            metrics.count("alertsFailed", command=alert.command)
+            # not executed: a re-send of the same alert must not be dropped
+            alertDedup.forget(alert)
+    if ok:
+        metrics.count("alertsExecuted", command=alert.command)
+    return ok
@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+from utils.alerts import Alert
+from utils.logger import log
+
+
+# Remembers recently executed alerts so duplicate deliveries (webhook retries, double
+# TradingView fires) are dropped before anything reaches MT5. Entries expire after
+# `ttl` seconds and the oldest are evicted past `maxSize`. With a `path`, the cache
+# is written there (at most every `saveInterval` seconds, off the trading threads)
+# and reloaded on startup, so dedup survives a restart. `ttl=0` disables it. A key is
+# recorded as soon as its alert is accepted, so a delivery arriving while the first one
+# is still running is dropped too, and `forget()` drops it again if the alert wasn't
+# executed.
+class AlertDedupCache:
+    def __init__(
+        self,
+        ttl: float = 60.0,
+        maxSize: int = 10000,
+        path: Optional[str] = None,
+        saveInterval: float = 1.0,
+    ):
+        self.ttl = ttl
+        self.maxSize = maxSize
+        self.path = path
+        self.saveInterval = saveInterval
+        self.duplicates = 0
+        # key -> wall clock time it was first seen (wall clock so it can be persisted)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._thread = None
+
+    # The alert's own `id` if it has one, else a hash of all its fields: two
+    # NEWSLTPLONG for the same comment with different SLs are both legit
+    @staticmethod
+    def keyOf(alert: Alert) -> str:
+        if alert.id:
+            return "id:" + alert.id
+        digest = hashlib.blake2b(repr(alert).encode("utf-8"), digest_size=16)
+        return "h:" + digest.hexdigest()
+
+    # Records the alert and tells whether it was already seen within `ttl`
+    def isDuplicate(self, alert: Alert) -> bool:
+        if self.ttl <= 0:
+            return False
+        key = self.keyOf(alert)
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            if key in self._entries:
+                self.duplicates += 1
+                return True
+            self._entries[key] = now
+            while len(self._entries) > self.maxSize:
+                self._entries.popitem(last=False)
+        if self.path is not None:
+            self._dirty.set()
+        return False
+
+    # Drops the alert's key, e.g. because it wasn't executed after all, so the next
+    # delivery of it goes through
+    def forget(self, alert: Alert):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            removed = self._entries.pop(self.keyOf(alert), None) is not None
+        if removed and self.path is not None:
+            self._dirty.set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Loads entries persisted at `path` and keeps saving there in the background
+    def load(self, path: str):
+        self.path = path
+        now = time.time()
+        try:
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            saved = {}
+        except (OSError, ValueError) as e:
+            log.warning("Could not read alert dedup file '{}': {}", path, e)
+            saved = {}
+        with self._lock:
+            for key, seenAt in sorted(saved.items(), key=lambda item: item[1]):
+                if now - seenAt < self.ttl:
+                    self._entries[key] = seenAt
+            while len(self._entries) > self.maxSize:
+                self._entries.popitem(last=False)
+        log.info("Loaded {} recent alert(s) from '{}'.", len(self._entries), path)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._saveLoop, daemon=True)
+            self._thread.start()
+            atexit.register(self.save)
+
+    # Atomically rewrites the file so a crash mid-write never leaves it truncated
+    def save(self):
+        if self.path is None:
+            return
+        self._dirty.clear()
+        with self._lock:
+            self._expire(time.time())
+            entries = dict(self._entries)
+        temp = self.path + ".tmp"
+        try:
+            with open(temp, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(temp, self.path)
+        except OSError as e:
+            log.error("Could not write alert dedup file '{}': {}", self.path, e)
+
+    def _saveLoop(self):
+        while True:
+            self._dirty.wait()
+            self.save()
+            time.sleep(self.saveInterval)
+
+    # Entries are in insertion order, so expired ones are always at the front
+    def _expire(self, now: float):
+        while self._entries:
+            key, seenAt = next(iter(self._entries.items()))
+            if now - seenAt < self.ttl:
+                break
+            del self._entries[key]
+
+
+alertDedup = AlertDedupCache()
@@ -0,0 +1,362 @@
+import os
+import mmap
+import json
+import time
+import zlib
+import queue
+import struct
+import threading
+import contextvars
+from collections import deque
+from dataclasses import asdict
+from typing import Iterator, NamedTuple, Optional
+from utils.logger import log
+
+# Record kinds
+START = 1
+STOP = 2
+ALERT = 3
+REQUEST = 4
+RESULT = 5
+HANDLED = 6
+KIND_NAMES = {
+    START: "start",
+    STOP: "stop",
+    ALERT: "alert",
+    REQUEST: "request",
+    RESULT: "result",
+    HANDLED: "handled",
+}
+ENTRY_COMMANDS = frozenset(["BUY", "BUYLIMIT", "SELL", "SELLLIMIT"])
+
+# payload length, crc32 of the payload, kind, alert sequence number, unix time
+HEADER = struct.Struct("<IIBQd")
+
+
+class JournalRecord(NamedTuple):
+    kind: int
+    seq: int
+    timestamp: float
+    data: dict
+
+
+def encodePayload(data) -> bytes:
+    return json.dumps(data, separators=(",", ":"), default=encodeDefault).encode()
+
+
+# MT5 results/requests are named tuples
+def encodeDefault(value):
+    if hasattr(value, "_asdict"):
+        return value._asdict()
+    return str(value)
+
+
+# Sequential reads over a memory map, yielding each record with the offset where it
+# ends. Stops at the first torn or corrupt record (the tail of a file that was being
+# written when the process died).
+def iterRecords(path: str) -> Iterator[tuple]:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        offset = 0
+        while offset + HEADER.size <= len(m):
+            length, crc, kind, seq, timestamp = HEADER.unpack_from(m, offset)
+            start = offset + HEADER.size
+            payload = m[start : start + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            offset = start + length
+            yield JournalRecord(kind, seq, timestamp, json.loads(payload)), offset
+
+
+def readRecords(path: str) -> Iterator[JournalRecord]:
+    for record, _ in iterRecords(path):
+        yield record
+
+
+# The journal's rotated files, oldest first, then the journal itself
+def journalFiles(path: str) -> list:
+    backups = []
+    while os.path.exists(f"{path}.{len(backups) + 1}"):
+        backups.append(f"{path}.{len(backups) + 1}")
+    return backups[::-1] + [path]
+
+
+# Size of the valid prefix of the file and the last alert sequence number in it
+def scanJournal(path: str) -> tuple:
+    size = 0
+    lastSeq = 0
+    for record, size in iterRecords(path):
+        lastSeq = max(lastSeq, record.seq)
+    return size, lastSeq
+
+
+# Append-only binary journal of alerts, the requests sent for them and the broker's
+# results. Records are length-prefixed and checksummed; callers only enqueue them and
+# a background thread writes batches, fsyncing at most every `syncInterval` seconds.
+# Once the file reaches `maxBytes` it's rotated to `<path>.1` (`.1` to `.2` and so on,
+# keeping `backups` files). Disabled (every call is a no-op) until `open()`.
+class Journal:
+    def __init__(
+        self, syncInterval: float = 0.05, maxBytes: int = 64 << 20, backups: int = 5
+    ):
+        self.syncInterval = syncInterval
+        self.maxBytes = maxBytes
+        self.backups = backups
+        self.path = None
+        self._file = None
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._seqLock = threading.Lock()
+        self._nextSeq = 1
+        # alert -> seqs of its copies journaled on receipt and not handled yet, oldest
+        # first. Alerts are frozen and compare by value (`id` included), and equal
+        # alerts share a dispatcher worker, so they're handled in that order.
+        self._received = {}
+        # seq -> retcodes of the results sent for it so far
+        self._retcodes = {}
+        # seq of the alert being handled; a context var so bulk sends on pool threads
+        # keep it (see runBulk)
+        self._current = contextvars.ContextVar("journalSeq", default=0)
+
+    @property
+    def enabled(self) -> bool:
+        return self._file is not None
+
+    # Opens (or creates) the journal, dropping a torn tail left by a crash
+    def open(self, path: str):
+        size, lastSeq = scanJournal(path)
+        # seqs keep counting up across rotated files
+        for backup in journalFiles(path)[:-1]:
+            lastSeq = max(lastSeq, scanJournal(backup)[1])
+        with open(path, "ab") as f:
+            if f.tell() != size:
+                log.warning(
+                    "Journal '{}' had a torn tail, truncating {} bytes.",
+                    path,
+                    f.tell() - size,
+                )
+                f.truncate(size)
+        self.path = path
+        self._nextSeq = lastSeq + 1
+        self._file = open(path, "ab")
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+        self._put(START, 0, {"pid": os.getpid()})
+
+    # Writes a clean-shutdown marker; alerts before it need no reconciliation
+    def close(self):
+        if not self.enabled:
+            return
+        self._put(STOP, 0, {})
+        self.flush()
+        self._queue.put(("close", None))
+        self._thread.join(timeout=5)
+
+    # Journals an alert as soon as it's received; returns its sequence number
+    def received(self, alert) -> Optional[int]:
+        if not self.enabled:
+            return None
+        with self._seqLock:
+            seq = self._nextSeq
+            self._nextSeq += 1
+            self._received.setdefault(alert, deque()).append(seq)
+        self._put(ALERT, seq, alert)
+        return seq
+
+    # Marks the start of handling `alert` on this thread (journaling it if it wasn't
+    # on receipt); requests/results sent until `end()` are tagged with its seq
+    def begin(self, alert) -> Optional[int]:
+        if not self.enabled:
+            return None
+        seq = self._pending(alert)
+        if seq is None:
+            seq = self.received(alert)
+            self._pending(alert)
+        self._current.set(seq)
+        return seq
+
+    # Marks the alert handled, with the retcodes of the results sent for it
+    def end(self, seq: Optional[int], **details):
+        if seq is None:
+            return
+        self._current.set(0)
+        with self._seqLock:
+            retcodes = self._retcodes.pop(seq, [])
+        self._put(HANDLED, seq, {"retcodes": retcodes, **details})
+
+    # For received alerts that won't be handled (dropped by backpressure)
+    def discard(self, alert):
+        seq = self._pending(alert)
+        if seq is not None:
+            self._put(HANDLED, seq, {"dropped": True})
+
+    def request(self, request: dict):
+        if self.enabled:
+            self._put(REQUEST, self._current.get(), request)
+
+    def result(self, result):
+        if not self.enabled:
+            return
+        seq = self._current.get()
+        if seq:
+            # None: the request got no answer
+            retcode = None if result is None else result.retcode
+            with self._seqLock:
+                self._retcodes.setdefault(seq, []).append(retcode)
+        self._put(RESULT, seq, result)
+
+    # Waits until everything queued so far is written and fsynced
+    def flush(self, timeout: float = 5.0):
+        if not self.enabled:
+            return
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        done.wait(timeout)
+
+    # Takes the oldest seq journaled on receipt for this alert
+    def _pending(self, alert) -> Optional[int]:
+        with self._seqLock:
+            seqs = self._received.get(alert)
+            if not seqs:
+                return None
+            seq = seqs.popleft()
+            if not seqs:
+                del self._received[alert]
+            return seq
+
+    def _put(self, kind: int, seq: int, data):
+        self._queue.put((kind, seq, time.time(), data))
+
+    def _writer(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            waiting = []
+            closing = False
+            for item in batch:
+                if item[0] == "flush":
+                    waiting.append(item[1])
+                elif item[0] == "close":
+                    closing = True
+                else:
+                    self._write(*item)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            if self.maxBytes and self._file.tell() >= self.maxBytes:
+                self._rotate()
+            for done in waiting:
+                done.set()
+            if closing:
+                self._file.close()
+                self._file = None
+                return
+            time.sleep(self.syncInterval)
+
+    # Runs on the writer thread, between two batches
+    def _rotate(self):
+        self._file.close()
+        for n in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{n}"):
+                os.replace(f"{self.path}.{n}", f"{self.path}.{n + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "ab")
+        log.info("Journal '{}' rotated.", self.path)
+
+    def _write(self, kind: int, seq: int, timestamp: float, data):
+        if kind == ALERT:
+            data = {
+                key: value for key, value in asdict(data).items() if value is not None
+            }
+        elif kind == RESULT and hasattr(data, "_asdict"):
+            # the request is journaled on its own
+            data = {
+                key: value for key, value in data._asdict().items() if key != "request"
+            }
+        try:
+            payload = encodePayload(data)
+        except (TypeError, ValueError) as e:
+            payload = encodePayload({"error": f"unencodable record: {e}"})
+        self._file.write(
+            HEADER.pack(len(payload), zlib.crc32(payload), kind, seq, timestamp)
+            + payload
+        )
+
+
+# Alerts journaled since the last clean shutdown that were never marked handled,
+# each checked against the live book: `(seq, alert, executed)` where `executed` is
+# True if the book shows the alert's effect, False if it doesn't, None if it can't
+# tell (e.g. an entry whose position was closed since).
+def reconcile(path: str, book) -> list:
+    pending = {}
+    for record in (
+        record for file in journalFiles(path) for record in readRecords(file)
+    ):
+        if record.kind == STOP:
+            pending.clear()
+        elif record.kind == ALERT:
+            pending[record.seq] = record.data
+        elif record.kind == HANDLED:
+            pending.pop(record.seq, None)
+    if not pending:
+        return []
+    book.sync()
+    return [(seq, alert, wasExecuted(alert, book)) for seq, alert in pending.items()]
+
+
+# Opens the journal after reporting alerts the previous run received but may not
+# have executed; they're marked handled so they're only reported once
+def openJournal(path: str, book):
+    unhandled = reconcile(path, book)
+    for seq, alert, executed in unhandled:
+        if executed:
+            log.info("Alert {} from the previous run was executed: {}", seq, alert)
+        elif executed is None:
+            log.warning(
+                "⚠️ Can't tell if alert {} from the previous run was executed: {}",
+                seq,
+                alert,
+            )
+        else:
+            log.error(
+                "❌ Alert {} from the previous run was NOT executed: {}", seq, alert
+            )
+    journal.open(path)
+    for seq, _, executed in unhandled:
+        journal.end(seq, reconciled=executed)
+
+
+def wasExecuted(alert: dict, book) -> Optional[bool]:
+    command = alert.get("command")
+    comment = alert.get("comment")
+    if command in ENTRY_COMMANDS:
+        if not comment:
+            return None
+        return book.findTrade(comment)[0] is not None
+    if command in ["CLOSELONG", "CLOSESHORT"]:
+        return None if alert.get("perc") else book.findPosition(comment) is None
+    if command in ["CANCELLONG", "CANCELSHORT"]:
+        return book.findOrder(comment) is None
+    if command == "CLOSEALL":
+        return not book.positions(alert.get("symbol"))
+    if command == "CANCELALL":
+        return not book.orders(alert.get("symbol"))
+    if command in ["NEWSLTPLONG", "NEWSLTPSHORT"]:
+        trade = book.findTrade(comment)[0]
+        if trade is None:
+            return None
+        return all(
+            alert.get(key) is None or alert.get(key) == getattr(trade, key)
+            for key in ["sl", "tp"]
+        )
+    return None
+
+
+journal = Journal()
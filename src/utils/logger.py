@@ -0,0 +1,155 @@
+import sys
+import json
+import time
+import queue
+import atexit
+import threading
+from typing import Optional
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR}
+LEVEL_NAMES = {value: name for name, value in LEVELS.items()}
+# argument types the caller may change after logging them
+MUTABLE = frozenset([dict, list, set])
+
+
+# A shallow copy of mutable containers (a request dict, a list of trades) so the writer
+# formats them as they were at the call; MT5 records are immutable named tuples and
+# pass through as they are
+def snapshot(value):
+    return value.copy() if type(value) in MUTABLE else value
+
+
+# Structured logger that keeps formatting and I/O off the trading threads. Callers
+# only filter by level, copy mutable arguments and put
+# `(level, time, message, args, fields)` on a SimpleQueue; a background thread does
+# the `str.format`, the console write and the optional JSON-lines file write.
+class Logger:
+    def __init__(self, level: int = INFO, dumpInterval: float = 10.0):
+        self.level = level
+        self.dumpInterval = dumpInterval
+        self.console = True
+        self._queue = queue.SimpleQueue()
+        self._file = None
+        self._lastDumps = {}
+        self._suppressedDumps = {}
+        self._dumpLock = threading.Lock()
+        self._thread = None
+        self._startLock = threading.Lock()
+
+    def setLevel(self, level):
+        self.level = LEVELS[level.upper()] if isinstance(level, str) else level
+
+    # Also writes every record as a JSON line to `path`
+    def setFile(self, path: Optional[str]):
+        if self._thread is None:
+            self._start()
+        self._queue.put(("file", path))
+
+    def debug(self, message: str, *args, **fields):
+        if self.level <= DEBUG:
+            self._put(DEBUG, message, args, fields)
+
+    def info(self, message: str, *args, **fields):
+        if self.level <= INFO:
+            self._put(INFO, message, args, fields)
+
+    def warning(self, message: str, *args, **fields):
+        if self.level <= WARNING:
+            self._put(WARNING, message, args, fields)
+
+    def error(self, message: str, *args, **fields):
+        if self.level <= ERROR:
+            self._put(ERROR, message, args, fields)
+
+    # Large dumps (every pending order/open position...) are logged at most once per
+    # `dumpInterval` per key; the items are formatted on the logger thread.
+    def dump(self, key: str, label: str, items, level: int = INFO):
+        if self.level > level:
+            return
+        now = time.monotonic()
+        with self._dumpLock:
+            if now - self._lastDumps.get(key, -self.dumpInterval) < self.dumpInterval:
+                self._suppressedDumps[key] = self._suppressedDumps.get(key, 0) + 1
+                return
+            self._lastDumps[key] = now
+            suppressed = self._suppressedDumps.pop(key, 0)
+        self._put(level, label + ": {}", (items,), {"suppressed": suppressed})
+
+    # Waits until everything queued so far is written
+    def flush(self, timeout: float = 5.0):
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        done.wait(timeout)
+
+    def _put(self, level: int, message: str, args: tuple, fields: dict):
+        if self._thread is None:
+            self._start()
+        self._queue.put(
+            (
+                level,
+                time.time(),
+                message,
+                tuple(map(snapshot, args)) if args else args,
+                (
+                    {name: snapshot(value) for name, value in fields.items()}
+                    if fields
+                    else fields
+                ),
+            )
+        )
+
+    def _start(self):
+        with self._startLock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer, daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _writer(self):
+        while True:
+            record = self._queue.get()
+            if record[0] == "flush":
+                self._flushSinks()
+                record[1].set()
+                continue
+            if record[0] == "file":
+                self._openFile(record[1])
+                continue
+            try:
+                self._write(*record)
+            except Exception as e:
+                sys.stderr.write(f"> Logger failed to write record {record}: {e}\n")
+
+    def _write(self, level: int, timestamp: float, message: str, args: tuple, fields):
+        text = message.format(*args) if args else message
+        if self.console:
+            prefix = "> " if level < WARNING else f"> {LEVEL_NAMES[level]}: "
+            sys.stdout.write(prefix + text + "\n")
+        if self._file is not None:
+            entry = {"ts": timestamp, "level": LEVEL_NAMES[level], "msg": text}
+            entry.update(fields)
+            self._file.write(json.dumps(entry, default=str) + "\n")
+        # batch flushes while records keep coming in
+        if self._queue.empty():
+            self._flushSinks()
+
+    def _flushSinks(self):
+        sys.stdout.flush()
+        if self._file is not None:
+            self._file.flush()
+
+    def _openFile(self, path: Optional[str]):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if path:
+            self._file = open(path, "a", encoding="utf-8")
+
+
+log = Logger()
@@ -0,0 +1,190 @@
+import math
+import time
+import threading
+from typing import Optional
+
+# Per-stage latency histograms and event counters for the alert pipeline. Disabled by
+# default: `span()` then returns a shared no-op context manager and `count()` returns
+# right away, so instrumented code only pays for one global check.
+_enabled = False
+_context = threading.local()
+_histograms = {}
+# (name, ((label, value), ...)) -> count
+_counters = {}
+_lock = threading.Lock()
+
+
+# Log-scale latency histogram: 8 buckets per doubling from 1µs (~9% bucket width), so
+# recording is O(1) and percentiles are approximate; count, sum and max are exact.
+class Histogram:
+    __slots__ = ("buckets", "count", "total", "max", "_lock")
+
+    bucketsPerDoubling = 8
+    bucketCount = 8 * 28  # 1µs .. ~4.5 minutes
+
+    def __init__(self):
+        self.buckets = [0] * self.bucketCount
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        micros = seconds * 1e6
+        index = int(math.log2(micros) * self.bucketsPerDoubling) if micros > 1 else 0
+        with self._lock:
+            self.buckets[min(index, self.bucketCount - 1)] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    # Upper bound of the bucket holding the p-th percentile (p from 0 to 100), in seconds
+    def percentile(self, p: float) -> float:
+        with self._lock:
+            if self.count == 0:
+                return 0.0
+            target = math.ceil(self.count * p / 100)
+            seen = 0
+            for index, bucketCount in enumerate(self.buckets):
+                seen += bucketCount
+                if seen >= max(target, 1):
+                    upper = 2 ** ((index + 1) / self.bucketsPerDoubling) / 1e6
+                    return min(upper, self.max)
+            return self.max
+
+    def merge(self, other: "Histogram"):
+        with self._lock:
+            for index, bucketCount in enumerate(other.buckets):
+                self.buckets[index] += bucketCount
+            self.count += other.count
+            self.total += other.total
+            self.max = max(self.max, other.max)
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class _Span:
+    __slots__ = ("stage", "command", "symbol", "start")
+
+    def __init__(self, stage: str, command: Optional[str], symbol: Optional[str]):
+        self.stage = stage
+        self.command = command
+        self.symbol = symbol
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.stage, time.perf_counter() - self.start, self.command, self.symbol)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_noopSpan = _NoopSpan()
+
+
+def enable(on: bool = True):
+    global _enabled
+    _enabled = on
+
+
+def isEnabled() -> bool:
+    return _enabled
+
+
+# Command/symbol of the alert being handled on this thread; spans default to it
+def setContext(command: Optional[str] = None, symbol: Optional[str] = None):
+    if _enabled:
+        _context.command = command
+        _context.symbol = symbol
+
+
+def record(
+    stage: str,
+    seconds: float,
+    command: Optional[str] = None,
+    symbol: Optional[str] = None,
+):
+    if not _enabled:
+        return
+    if command is None:
+        command = getattr(_context, "command", None)
+    if symbol is None:
+        symbol = getattr(_context, "symbol", None)
+    key = (stage, command or "-", symbol or "-")
+    histogram = _histograms.get(key)
+    if histogram is None:
+        with _lock:
+            histogram = _histograms.setdefault(key, Histogram())
+    histogram.record(seconds)
+
+
+# Times the enclosed block as `stage`: `with metrics.span("broker"): ...`
+def span(stage: str, command: Optional[str] = None, symbol: Optional[str] = None):
+    if not _enabled:
+        return _noopSpan
+    return _Span(stage, command, symbol)
+
+
+# Adds one to the `name` counter for these labels: `count("orderSend", retcode=10009)`
+def count(name: str, **labels):
+    if not _enabled:
+        return
+    key = (name, tuple(labels.items()))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + 1
+
+
+# Snapshot of every counter: `{(name, ((label, value), ...)): count}`
+def counters() -> dict:
+    with _lock:
+        return dict(_counters)
+
+
+# Snapshot of every histogram; `groupBy` picks the key parts to aggregate over
+def dump(groupBy: tuple = ("stage", "command", "symbol")) -> dict:
+    parts = ["stage", "command", "symbol"]
+    grouped = {}
+    with _lock:
+        items = list(_histograms.items())
+    for key, histogram in items:
+        groupKey = tuple(key[parts.index(part)] for part in groupBy)
+        grouped.setdefault(groupKey, Histogram()).merge(histogram)
+    return {key: histogram.summary() for key, histogram in sorted(grouped.items())}
+
+
+def dumpText(groupBy: tuple = ("stage", "command", "symbol")) -> str:
+    lines = [
+        f"{'/'.join(groupBy):<40} {'count':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}"
+    ]
+    for key, s in dump(groupBy).items():
+        lines.append(
+            f"{'/'.join(key):<40} {s['count']:>7} "
+            + " ".join(f"{s[p] * 1000:>7.2f}ms" for p in ["p50", "p95", "p99", "max"])
+        )
+    return "\n".join(lines)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
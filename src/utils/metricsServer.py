@@ -0,0 +1,192 @@
+import os
+import re
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+from utils import metrics
+from utils.logger import log
+
+startedAt = time.monotonic()
+
+
+# "orderSend" -> "ea_order_send"
+def metricName(name: str) -> str:
+    return "ea_" + re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+def labelText(labels) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        f'{key}="{escapeLabel(value)}"' for key, value in dict(labels).items()
+    )
+    return "{" + pairs + "}"
+
+
+def escapeLabel(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Resident memory of this process in bytes, None if the platform doesn't say
+def residentMemory() -> Optional[int]:
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        kernel32 = ctypes.windll.kernel32
+        psapi = ctypes.windll.psapi
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        psapi.GetProcessMemoryInfo.argtypes = [
+            wintypes.HANDLE,
+            ctypes.POINTER(ProcessMemoryCounters),
+            wintypes.DWORD,
+        ]
+        if psapi.GetProcessMemoryInfo(
+            kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb
+        ):
+            return counters.WorkingSetSize
+        return None
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# Localhost HTTP endpoint serving Prometheus text metrics on `/metrics` and a JSON
+# readiness probe on `/health` (200 when every check passes, else 503). Runs on its
+# own daemon threads and only reads state the EA already keeps: counters and
+# histograms from `utils.metrics` plus the registered gauges and checks.
+class MetricsServer:
+    def __init__(self, port: int, host: str = "127.0.0.1"):
+        self.port = port
+        self.host = host
+        # (name, description, fn); fn returns a number or {((label, value), ...): number}
+        self._gauges = []
+        # (name, fn); fn returns True when healthy
+        self._checks = []
+        self._server = None
+        self._thread = None
+
+    def gauge(self, name: str, description: str, fn: Callable):
+        self._gauges.append((name, description, fn))
+
+    def check(self, name: str, fn: Callable[[], bool]):
+        self._checks.append((name, fn))
+
+    def start(self):
+        if self._server is not None:
+            return
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    status = 200
+                    body = server.render().encode()
+                    contentType = "text/plain; version=0.0.4; charset=utf-8"
+                elif self.path == "/health":
+                    healthy, checks = server.health()
+                    status = 200 if healthy else 503
+                    body = json.dumps({"healthy": healthy, "checks": checks}).encode()
+                    contentType = "application/json"
+                else:
+                    status = 404
+                    body = b"Not found\n"
+                    contentType = "text/plain"
+                self.send_response(status)
+                self.send_header("Content-Type", contentType)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            # scrapes would flood the console otherwise
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        log.info("Metrics on http://{}:{}/metrics", self.host, self.port)
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def health(self) -> tuple:
+        checks = {}
+        for name, fn in self._checks:
+            try:
+                checks[name] = bool(fn())
+            except Exception:
+                checks[name] = False
+        return all(checks.values()), checks
+
+    def render(self) -> str:
+        lines = []
+        byName = {}
+        for (name, labels), value in sorted(metrics.counters().items(), key=str):
+            byName.setdefault(name, []).append((labels, value))
+        for name, samples in byName.items():
+            fullName = metricName(name) + "_total"
+            lines.append(f"# TYPE {fullName} counter")
+            for labels, value in samples:
+                lines.append(f"{fullName}{labelText(labels)} {value}")
+
+        lines.append("# TYPE ea_stage_seconds summary")
+        for (stage, command, symbol), summary in metrics.dump().items():
+            labels = {"stage": stage, "command": command, "symbol": symbol}
+            for quantile, key in [("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")]:
+                lines.append(
+                    f"ea_stage_seconds{labelText({**labels, 'quantile': quantile})} "
+                    f"{summary[key]}"
+                )
+            total = summary["mean"] * summary["count"]
+            lines.append(f"ea_stage_seconds_sum{labelText(labels)} {total}")
+            lines.append(
+                f"ea_stage_seconds_count{labelText(labels)} {summary['count']}"
+            )
+
+        for name, description, fn in self._gauges:
+            try:
+                value = fn()
+            except Exception as e:
+                log.warning("Metric '{}' failed: {}", name, e)
+                continue
+            fullName = metricName(name)
+            lines.append(f"# HELP {fullName} {description}")
+            lines.append(f"# TYPE {fullName} gauge")
+            samples = value.items() if isinstance(value, dict) else [((), value)]
+            for labels, sample in samples:
+                if sample is not None:
+                    lines.append(f"{fullName}{labelText(labels)} {float(sample)}")
+
+        memory = residentMemory()
+        if memory is not None:
+            lines.append("# TYPE ea_process_resident_bytes gauge")
+            lines.append(f"ea_process_resident_bytes {memory}")
+        lines.append("# TYPE ea_process_uptime_seconds gauge")
+        lines.append(f"ea_process_uptime_seconds {time.monotonic() - startedAt}")
+        return "\n".join(lines) + "\n"
@@ -1,23 +1,196 @@
 import os
 from typing import Optional
-import MetaTrader5 as mt5
+from utils import metrics
+from utils.logger import log
+from utils.broker import mt5
 from utils.getPositionSize import getPositionSize
+from utils.session import session
+from utils.symbolCache import symbolSpecs
+from utils.orderBook import orderBook, isSelector
+from utils.bulk import runBulk
+from utils.tickCache import tickCache
+from utils.accountCache import accountCache
+from utils.journal import journal
+from utils.exposure import exposure, riskOf
+from utils.scheduler import scheduler, expiredResult
+from utils.preTrade import (
+    fillingModeFor,
+    snapVolume,
+    checkVolume,
+    checkStops,
+    checkFreeze,
+    isLongTrade,
+    isStopOrder,
+)
 
 
-# Initializes and logs in
+# Initializes and logs in (once); later calls reuse the persistent session
 def initializeMT5():
-    login = os.getenv("MT5_LOGIN")
-    password = os.getenv("MT5_PASSWORD")
-    server = os.getenv("MT5_SERVER")
-    if not mt5.initialize():
-        print("> Initializing MT5 connection failed.")
-        quit()
-    print(f"> Connection to MT5 on server '{server}' was successful.")
-    accInfo = mt5.account_info()
-    if accInfo.login == login:
-        print(f"> Already logged-in to account '{login}'.")
-        return
-    mt5.login(login, password, server)
+    if not session.start():
+        log.warning("MT5 session is not connected yet. Retrying in the background.")
+
+
+# Max price slippage (points) accepted on market orders and closes
+def getDeviation() -> int:
+    return int(os.getenv("ORDER_DEVIATION", "20"))
+
+
+# Sends a request to MT5 once the scheduler lets it through and keeps the order book
+# index in sync with the result
+def sendRequest(request: dict):
+    journal.request(request)
+    # "queue" is the dispatcher's lag; this is the wait for the broker's rate limit
+    with metrics.span("outbound"):
+        admitted = scheduler.acquire(request)
+    if not admitted:
+        result = expiredResult(request)
+        journal.result(result)
+        metrics.count("orderSend", retcode=result.retcode)
+        log.warning("Request waited too long to be sent, dropped: {}", request)
+        return result
+    with metrics.span("broker"):
+        result = mt5.order_send(request)
+    journal.result(result)
+    metrics.count("orderSend", retcode=result.retcode if result is not None else "none")
+    with metrics.span("result"):
+        orderBook.applyResult(request, result)
+        # our own fill/close moved balance, equity and margin
+        if (
+            result is not None
+            and request.get("action") == mt5.TRADE_ACTION_DEAL
+            and result.retcode
+            in [mt5.TRADE_RETCODE_DONE, mt5.TRADE_RETCODE_DONE_PARTIAL]
+        ):
+            accountCache.invalidate()
+    return result
+
+
+# Logs and returns True if the freeze level doesn't let us touch the trade right now
+def isFrozen(trade, isPosition: bool) -> bool:
+    spec = symbolSpecs.get(trade.symbol)
+    if spec is None or not spec.freezeLevel:
+        return False
+    reason = checkFreeze(spec, tickCache.get(trade.symbol), trade, isPosition)
+    if reason:
+        log.error("Not sending request for trade {}: {}", trade.ticket, reason)
+        return True
+    return False
+
+
+# Fields of an entry request that only depend on the symbol and order kind, built once
+# per (symbol, isLimit, isLong, filling mode, deviation) and copied for each order
+orderTemplates = {}
+
+
+def orderTemplate(spec, isLimit: bool, isLong: bool) -> dict:
+    deviation = getDeviation()
+    key = (spec.symbol, isLimit, isLong, spec.fillingMode, deviation)
+    template = orderTemplates.get(key)
+    if template is None:
+        if isLimit:
+            orderType = (
+                mt5.ORDER_TYPE_BUY_LIMIT if isLong else mt5.ORDER_TYPE_SELL_LIMIT
+            )
+        else:
+            orderType = mt5.ORDER_TYPE_BUY if isLong else mt5.ORDER_TYPE_SELL
+        template = {
+            "action": mt5.TRADE_ACTION_PENDING if isLimit else mt5.TRADE_ACTION_DEAL,
+            "symbol": spec.symbol,
+            "type": orderType,
+            "deviation": deviation,
+            "magic": 729343,
+            "type_time": mt5.ORDER_TIME_GTC,
+            "type_filling": fillingModeFor(spec),
+        }
+        orderTemplates[key] = template
+    return template
+
+
+# Request removing a pending order
+def buildCancelRequest(order, comment: str) -> dict:
+    return {
+        "action": mt5.TRADE_ACTION_REMOVE,
+        "order": order.ticket,
+        "symbol": order.symbol,
+        "magic": order.magic,
+        "comment": comment,
+    }
+
+
+# Request closing (part of) an open position at the current bid/ask
+def buildCloseRequest(
+    position, tick, volume: Optional[float] = None, comment: Optional[str] = None
+) -> dict:
+    isLong = position.type == mt5.POSITION_TYPE_BUY
+    return {
+        "action": mt5.TRADE_ACTION_DEAL,
+        "symbol": position.symbol,
+        "volume": volume if volume is not None else position.volume,
+        "type": (mt5.ORDER_TYPE_SELL if isLong else mt5.ORDER_TYPE_BUY),
+        "position": position.ticket,
+        "price": tick.bid if isLong else tick.ask,
+        "deviation": getDeviation(),
+        "magic": position.magic,
+        "comment": comment if comment is not None else position.comment,
+        "type_time": mt5.ORDER_TIME_GTC,
+        "type_filling": fillingModeFor(symbolSpecs.get(position.symbol)),
+    }
+
+
+# Request moving SL/TP of an open position (SLTP) or a pending order (MODIFY); a None
+# sl/tp keeps the current one
+def buildSLTPRequest(trade, isPosition: bool, sl=None, tp=None) -> dict:
+    return {
+        "action": mt5.TRADE_ACTION_SLTP if isPosition else mt5.TRADE_ACTION_MODIFY,
+        "symbol": trade.symbol,
+        "magic": trade.magic,
+        "comment": trade.comment,
+        **({"position": trade.ticket} if isPosition else {"order": trade.ticket}),
+        **({"price": trade.price_open} if not isPosition else {}),
+        "sl": float(sl) if sl is not None else trade.sl,
+        "tp": float(tp) if tp is not None else trade.tp,
+    }
+
+
+# Why the trade server would refuse the request's SL/TP, if it would
+def sltpRejection(trade, isPosition: bool, request: dict) -> Optional[str]:
+    return checkStops(
+        symbolSpecs.get(trade.symbol),
+        tickCache.get(trade.symbol),
+        isLongTrade(trade, isPosition),
+        request["sl"],
+        request["tp"],
+        None if isPosition else trade.price_open,
+        isStop=not isPosition and isStopOrder(trade),
+    )
+
+
+# Runs `(trade, request)` pairs as one batch with the BULK_* settings
+def runBatch(items: list, rebuild=None):
+    return runBulk(
+        items,
+        sendRequest,
+        maxWorkers=int(os.getenv("BULK_WORKERS", "8")),
+        retries=int(os.getenv("BULK_RETRIES", "1")),
+        rebuild=rebuild,
+    )
+
+
+# One line per ticket, then the totals
+def logBulkReport(label: str, report):
+    for r in report.results:
+        if r.ok:
+            log.info("{} {} with comment '{}': done.", label, r.ticket, r.comment)
+        else:
+            log.error(
+                "{} {} with comment '{}' failed. Retcode: {}, error: {}",
+                label,
+                r.ticket,
+                r.comment,
+                r.retcode,
+                r.error,
+            )
+    log.info("{}: {}", label, report.summary())
 
 
 # Places a market or limit order
@@ -33,16 +206,17 @@ def createOrder(
     comment: Optional[str] = None,
 ):
     if isLong is None and entry is None:
-        print(
-            "> Missing necessary values. Either pass `isLong` or `entry` to calculate direction."
+        log.error(
+            "Missing necessary values. Either pass `isLong` or `entry` to calculate direction."
         )
         return
+    spec = symbolSpecs.get(symbol)
+    tick = tickCache.get(symbol)
+    if spec is None or tick is None:
+        log.error("Symbol {} not found.", symbol)
+        return
     isBullish = isLong if isLong is not None else entry > sl
     defaultComment = "Long entry" if isBullish else "Short entry"
-    orderTypeLimit = (
-        mt5.ORDER_TYPE_BUY_LIMIT if isBullish else mt5.ORDER_TYPE_SELL_LIMIT
-    )
-    orderTypeMarket = mt5.ORDER_TYPE_BUY if isBullish else mt5.ORDER_TYPE_SELL
     finalQty = qty
     if (
         risk is not None
@@ -51,248 +225,342 @@ def createOrder(
     ):
         localEntryPrice = entry
         if entry is None:
-            localEntryPrice = (
-                mt5.symbol_info_tick(symbol).ask
-                if isBullish
-                else mt5.symbol_info_tick(symbol).bid
+            localEntryPrice = tick.ask if isBullish else tick.bid
+        with metrics.span("sizing"):
+            finalQty = getPositionSize(
+                symbol,
+                localEntryPrice,
+                sl,
+                risk,
+                freshEquity=os.getenv("SIZING_FRESH_EQUITY") == "1",
             )
-        finalQty = getPositionSize(symbol, localEntryPrice, sl, risk)
-    request = {
-        "action": mt5.TRADE_ACTION_PENDING if isLimit else mt5.TRADE_ACTION_DEAL,
-        "symbol": symbol,
-        "volume": finalQty,
-        "type": orderTypeLimit if isLimit else orderTypeMarket,
-        "deviation": 20,
-        **({"price": float(entry)} if isLimit else {}),
-        **({"sl": float(sl)} if sl is not None else {}),
-        **({"tp": float(tp)} if tp is not None else {}),
-        "magic": 729343,
-        "comment": comment if comment is not None else defaultComment,
-        "type_time": mt5.ORDER_TIME_GTC,
-        "type_filling": mt5.ORDER_FILLING_IOC,
-    }
-    print(f"> request: {request}")
-    result = mt5.order_send(request)
+    with metrics.span("preTrade"):
+        if finalQty is not None:
+            finalQty = snapVolume(finalQty, spec)
+        reason = checkVolume(finalQty, spec) or checkStops(
+            spec,
+            tick,
+            isBullish,
+            float(sl) if sl is not None else None,
+            float(tp) if tp is not None else None,
+            float(entry) if isLimit else None,
+        )
+        reservation = None
+        if not reason:
+            openPrice = (
+                float(entry) if isLimit else (tick.ask if isBullish else tick.bid)
+            )
+            risk = riskOf(
+                spec,
+                isBullish,
+                openPrice,
+                float(sl) if sl is not None else None,
+                finalQty,
+            )
+            reason, reservation = exposure.reserve(
+                spec, comment if comment is not None else defaultComment, risk
+            )
+    if reason:
+        log.error("Order for {} rejected before sending: {}", symbol, reason)
+        return
+    with metrics.span("build"):
+        request = {
+            **orderTemplate(spec, bool(isLimit), isBullish),
+            "volume": finalQty,
+            **({"price": float(entry)} if isLimit else {}),
+            **({"sl": float(sl)} if sl is not None else {}),
+            **({"tp": float(tp)} if tp is not None else {}),
+            "comment": comment if comment is not None else defaultComment,
+        }
+    log.info("request: {}", request)
+    try:
+        result = sendRequest(request)
+    finally:
+        # the book (and so the exposure) has the fill by now
+        exposure.release(reservation)
     if result is None:
-        print("> Something went wrong when creating an order.")
-        print(f"> request: {request}")
-        print(mt5.last_error())
+        log.error(
+            "Something went wrong when creating an order. request: {}; error: {}",
+            request,
+            mt5.last_error(),
+        )
     return result
 
 
 # Cancels all pending orders
 def cancelAll(symbol: Optional[str] = None):
-    orders = mt5.orders_get(symbol=symbol) if symbol is not None else mt5.orders_get()
-    if orders is None:
-        print("> No pending orders found.")
+    orderBook.refresh()
+    orders = orderBook.orders(symbol)
+    if not orders:
+        log.info("No pending orders found.")
         return
-    print(orders)
-    for order in orders:
+    log.dump("orders", "Pending orders", orders)
+    items = [
+        (order, buildCancelRequest(order, "Cancel all orders"))
+        for order in orders
         # only pending orders
-        if order.type in [mt5.ORDER_TYPE_BUY_LIMIT, mt5.ORDER_TYPE_SELL_LIMIT]:
-            request = {
-                "action": mt5.TRADE_ACTION_REMOVE,
-                "order": order.ticket,
-                "symbol": order.symbol,
-                "magic": order.magic,
-                "comment": "Cancel all orders",
-            }
-            result = mt5.order_send(request)
-            if result.retcode == mt5.TRADE_RETCODE_DONE:
-                print(
-                    f"> Successfully canceled limit order {order.ticket} with comment '{order.comment}'."
-                )
-            else:
-                print(
-                    f"> Failed to cancel limit order {order.ticket}, retcode: {result.retcode}"
-                )
+        if order.type in [mt5.ORDER_TYPE_BUY_LIMIT, mt5.ORDER_TYPE_SELL_LIMIT]
+        and not isFrozen(order, False)
+    ]
+    report = runBatch(items)
+    for r in report.results:
+        if r.ok:
+            log.info(
+                "Successfully canceled limit order {} with comment '{}'.",
+                r.ticket,
+                r.comment,
+            )
+        else:
+            log.error(
+                "Failed to cancel limit order {}, retcode: {}, error: {}",
+                r.ticket,
+                r.retcode,
+                r.error,
+            )
+    log.info("Cancel all: {}", report.summary())
+    return report
 
 
 # Cancels specific pending order based on position's comment
 def cancelPendingOrder(id: str):
-    orders = mt5.orders_get()
-    if orders is None:
-        print("> No pending orders found.")
-        return
-    order = next(
-        (
-            o
-            for o in orders
-            if o.comment == id
-            and o.type in [mt5.ORDER_TYPE_BUY_LIMIT, mt5.ORDER_TYPE_SELL_LIMIT]
-        ),
-        None,
+    orderBook.refresh()
+    if isSelector(id):
+        return cancelMatchingOrders(id)
+    order = orderBook.findOrder(
+        id, [mt5.ORDER_TYPE_BUY_LIMIT, mt5.ORDER_TYPE_SELL_LIMIT]
     )
     if order:
-        request = {
-            "action": mt5.TRADE_ACTION_REMOVE,
-            "order": order.ticket,
-            "symbol": order.symbol,
-            "magic": order.magic,
-            "comment": "Cancel order",
-        }
-        result = mt5.order_send(request)
+        if isFrozen(order, False):
+            return
+        request = buildCancelRequest(order, "Cancel order")
+        result = sendRequest(request)
         if result is None:
-            print("> Failed to cancel specific order. Error:", mt5.last_error())
+            log.error("Failed to cancel specific order. Error: {}", mt5.last_error())
         elif result.retcode == mt5.TRADE_RETCODE_DONE:
-            print(f"> Successfully canceled order with comment '{id}'.")
+            log.info("Successfully canceled order with comment '{}'.", id)
         else:
-            print(
-                f"> Failed to cancel order with comment '{id}'. Retcode: {result.retcode}"
+            log.error(
+                "Failed to cancel order with comment '{}'. Retcode: {}; order: {}; result: {}",
+                id,
+                result.retcode,
+                order,
+                result,
             )
-            print(f"> order: {order}")
-            print(f"> result: {result}")
+        return result
     else:
-        print(f"> No pending order with comment: '{id}'")
-        print(f"> Current pending orders: {orders}")
+        log.info("No pending order with comment: '{}'", id)
+        log.dump("orders", "Current pending orders", orderBook.orders())
 
 
-# Updates SL and/or TP of an open position or pending order based on its comment
-def updateSLTP(id: str, sl: float = None, tp: float = None):
-    if sl is None and tp is None:
-        print("> Both SL and TP are null. Nothing to update.")
+# Cancels every pending order whose comment matches the selector, as one batch
+def cancelMatchingOrders(selector: str):
+    orders = orderBook.matchOrders(
+        selector, [mt5.ORDER_TYPE_BUY_LIMIT, mt5.ORDER_TYPE_SELL_LIMIT]
+    )
+    if not orders:
+        log.info("No pending orders match '{}'.", selector)
         return
+    report = runBatch(
+        [
+            (order, buildCancelRequest(order, "Cancel order"))
+            for order in orders
+            if not isFrozen(order, False)
+        ]
+    )
+    logBulkReport(f"Cancel '{selector}'", report)
+    return report
 
-    openPositions = mt5.positions_get()
-    pendingOrders = mt5.orders_get()
-    positions = []
 
-    if openPositions is not None:
-        positions.extend(openPositions)
-    if pendingOrders is not None:
-        positions.extend(pendingOrders)
-    if openPositions is None:
-        print("> No active positions found.")
-        return
-    if not positions:
-        print("> No active positions or pending orders found. Nothing to update.")
+# Updates SL and/or TP of an open position or pending order based on its comment
+def updateSLTP(id: str, sl: float = None, tp: float = None):
+    if sl is None and tp is None:
+        log.info("Both SL and TP are null. Nothing to update.")
         return
 
-    trade = next((t for t in positions if t.comment == id), None)
+    if isSelector(id):
+        # one fresh snapshot: the requests keep each trade's other SL/TP as it is now
+        orderBook.sync()
+        return updateMatchingSLTP(id, sl, tp)
+    orderBook.refresh()
+    trade, isOpen = orderBook.findTrade(id)
     if trade:
-        isOpen = hasattr(trade, "position_id") and trade.position_id != 0
-        request = {
-            "action": mt5.TRADE_ACTION_SLTP if isOpen else mt5.TRADE_ACTION_MODIFY,
-            "symbol": trade.symbol,
-            "magic": trade.magic,
-            "comment": trade.comment,
-            **({"position": trade.ticket} if isOpen else {"order": trade.ticket}),
-            **({"price": trade.price_open} if not isOpen else {}),
-            "sl": float(sl) if sl is not None else trade.sl,
-            "tp": float(tp) if tp is not None else trade.tp,
-        }
-        result = mt5.order_send(request)
+        trade = orderBook.current(trade, isOpen)
+    if trade:
+        request = buildSLTPRequest(trade, isOpen, sl, tp)
+        reason = sltpRejection(trade, isOpen, request)
+        if reason:
+            log.error("SL/TP update for '{}' rejected before sending: {}", id, reason)
+            return
+        if isFrozen(trade, isOpen):
+            return
+        result = sendRequest(request)
         if result is None:
-            print("> Order send failed. Error:", mt5.last_error())
+            log.error("Order send failed. Error: {}", mt5.last_error())
         elif result.retcode == mt5.TRADE_RETCODE_DONE:
-            print(f"> Successfully updated SL/TP for trade with comment '{id}'.")
+            log.info("Successfully updated SL/TP for trade with comment '{}'.", id)
         else:
-            print(f"> Failed to update SL/TP. Retcode: {result.retcode}")
-            print(f"> trade: {trade}")
-            print(f"> result: {result}")
+            log.error(
+                "Failed to update SL/TP. Retcode: {}; trade: {}; result: {}",
+                result.retcode,
+                trade,
+                result,
+            )
+        return result
     else:
-        print(f"> No open position or pending order found with the comment: '{id}'")
-        print(f"> Current open positions: {positions}")
+        log.info("No open position or pending order found with the comment: '{}'", id)
+        log.dump("positions", "Current open positions", orderBook.positions())
+        log.dump("orders", "Current pending orders", orderBook.orders())
+
+
+# Updates SL and/or TP of every position and pending order matching the selector
+def updateMatchingSLTP(selector: str, sl: float = None, tp: float = None):
+    trades = orderBook.matchTrades(selector)
+    if not trades:
+        log.info("No open positions or pending orders match '{}'.", selector)
+        return
+    items = []
+    for trade, isPosition in trades:
+        request = buildSLTPRequest(trade, isPosition, sl, tp)
+        reason = sltpRejection(trade, isPosition, request)
+        if reason:
+            log.error("SL/TP update for {} skipped: {}", trade.ticket, reason)
+        elif not isFrozen(trade, isPosition):
+            items.append((trade, request))
+    report = runBatch(items)
+    logBulkReport(f"Update SL/TP '{selector}'", report)
+    return report
 
 
 # Closes an open position based on its comment, optionally closes % of the position
 def closePosition(id: str, percent: Optional[float] = None):
-    positions = mt5.positions_get()
     perc = 100.0
-    if positions is None:
-        print("> No active positions found.")
-        return
     if percent is not None:
         if float(percent) <= 0.0 or float(percent) > 100.0:
-            print(
-                f"> Percent passed '{percent}' is invalid. Acceptable values are between 0 and 100."
+            log.error(
+                "Percent passed '{}' is invalid. Acceptable values are between 0 and 100.",
+                percent,
             )
             return
         perc = float(percent)
 
-    position = next((p for p in positions if p.comment == id), None)
+    if isSelector(id):
+        # one fresh snapshot: close volumes are a % of each position's volume now
+        orderBook.sync()
+        return closeMatchingPositions(id, perc)
+    orderBook.refresh()
+    position = orderBook.findPosition(id)
     if position:
-        volumeToClose = round(position.volume * perc / 100, 2)
-        if volumeToClose < mt5.symbol_info(position.symbol).volume_min:
-            print(
-                f"> Volume to close '{volumeToClose}' is less than the broker's minimum lot size."
-            )
+        position = orderBook.current(position, True)
+    if position:
+        spec = symbolSpecs.get(position.symbol)
+        volumeToClose = snapVolume(position.volume * perc / 100, spec)
+        reason = checkVolume(volumeToClose, spec)
+        if reason:
+            log.error("Can't close {}% of '{}': {}", perc, id, reason)
+            return
+        if isFrozen(position, True):
             return
 
-        request = {
-            "action": mt5.TRADE_ACTION_DEAL,
-            "symbol": position.symbol,
-            "volume": volumeToClose,
-            "type": (
-                mt5.ORDER_TYPE_SELL
-                if position.type == mt5.POSITION_TYPE_BUY
-                else mt5.ORDER_TYPE_BUY
-            ),
-            "position": position.ticket,
-            "price": (
-                mt5.symbol_info_tick(position.symbol).bid
-                if position.type == mt5.POSITION_TYPE_BUY
-                else mt5.symbol_info_tick(position.symbol).ask
-            ),
-            "deviation": 20,
-            "magic": position.magic,
-            "comment": position.comment,
-            "type_time": mt5.ORDER_TIME_GTC,
-            "type_filling": mt5.ORDER_FILLING_IOC,
-        }
-        result = mt5.order_send(request)
+        request = buildCloseRequest(
+            position, tickCache.get(position.symbol), volumeToClose
+        )
+        result = sendRequest(request)
         if result is None:
-            print("> Order send failed. Error:", mt5.last_error())
+            log.error("Order send failed. Error: {}", mt5.last_error())
         elif result.retcode == mt5.TRADE_RETCODE_DONE:
-            print(f"> Successfully closed {perc}% of the position with comment '{id}'.")
+            log.info(
+                "Successfully closed {}% of the position with comment '{}'.", perc, id
+            )
         else:
-            print(f"> Failed to close position. Retcode: {result.retcode}")
-            print(f"> position: {position}")
-            print(f"> result: {result}")
+            log.error(
+                "Failed to close position. Retcode: {}; position: {}; result: {}",
+                result.retcode,
+                position,
+                result,
+            )
+        return result
     else:
-        print(f"> No open position found with the comment: '{id}'")
-        print(f"> Current open positions: {positions}")
+        log.info("No open position found with the comment: '{}'", id)
+        log.dump("positions", "Current open positions", orderBook.positions())
+
+
+# Closes `perc`% of every open position whose comment matches the selector, as one
+# batch
+def closeMatchingPositions(selector: str, perc: float = 100.0):
+    positions = orderBook.matchPositions(selector)
+    if not positions:
+        log.info("No open positions match '{}'.", selector)
+        return
+    volumes = {}
+    for position in positions:
+        spec = symbolSpecs.get(position.symbol)
+        volume = snapVolume(position.volume * perc / 100, spec)
+        reason = checkVolume(volume, spec)
+        if reason:
+            log.error("Can't close {}% of {}: {}", perc, position.ticket, reason)
+        elif not isFrozen(position, True):
+            volumes[position.ticket] = volume
+    items = [
+        (
+            position,
+            buildCloseRequest(
+                position, tickCache.get(position.symbol), volumes[position.ticket]
+            ),
+        )
+        for position in positions
+        if position.ticket in volumes
+    ]
+    report = runBatch(
+        items,
+        # retry with a fresh price
+        rebuild=lambda position: buildCloseRequest(
+            position,
+            tickCache.get(position.symbol, fresh=True),
+            volumes[position.ticket],
+        ),
+    )
+    logBulkReport(f"Close {perc}% of '{selector}'", report)
+    return report
 
 
 # Closes all open positions
 def closeAllPositions(symbol: Optional[str] = None):
-    positions = (
-        mt5.positions_get(symbol=symbol) if symbol is not None else mt5.positions_get()
-    )
-    if positions is None or len(positions) == 0:
-        print("> No active positions found to close.")
+    # closes send each position's full volume, so it has to be the current one
+    orderBook.sync()
+    positions = orderBook.positions(symbol)
+    if not positions:
+        log.info("No active positions found to close.")
         return
 
-    for pos in positions:
-        isLong = pos.type == mt5.POSITION_TYPE_BUY
-        request = {
-            "action": mt5.TRADE_ACTION_DEAL,
-            "symbol": pos.symbol,
-            "volume": pos.volume,
-            "type": (mt5.ORDER_TYPE_SELL if isLong else mt5.ORDER_TYPE_BUY),
-            "position": pos.ticket,
-            "price": (
-                mt5.symbol_info_tick(pos.symbol).bid
-                if isLong
-                else mt5.symbol_info_tick(pos.symbol).ask
-            ),
-            "deviation": 20,
-            "magic": pos.magic,
-            "comment": "Close position",
-            "type_time": mt5.ORDER_TIME_GTC,
-            "type_filling": mt5.ORDER_FILLING_IOC,
-        }
-        result = mt5.order_send(request)
-
-        if result is None:
-            print(
-                f"> Failed to close position '{pos.ticket}'. Error:", mt5.last_error()
-            )
-        elif result.retcode == mt5.TRADE_RETCODE_DONE:
-            print(
-                f"> Successfully closed position '{pos.ticket}' with comment '{pos.comment}' for symbol '{pos.symbol}'."
+    items = [
+        (
+            pos,
+            buildCloseRequest(pos, tickCache.get(pos.symbol), comment="Close position"),
+        )
+        for pos in positions
+        if not isFrozen(pos, True)
+    ]
+    report = runBatch(
+        items,
+        # retry with a fresh price
+        rebuild=lambda pos: buildCloseRequest(
+            pos, tickCache.get(pos.symbol, fresh=True), comment="Close position"
+        ),
+    )
+    for r in report.results:
+        if r.ok:
+            log.info(
+                "Successfully closed position '{}' with comment '{}' for symbol '{}'.",
+                r.ticket,
+                r.comment,
+                r.symbol,
             )
         else:
-            print(f"> Failed to close position {pos.ticket}. Retcode: {result.retcode}")
-            print(f"> position: {pos}")
-            print(f"> result: {result}")
+            log.error(
+                "Failed to close position {}. Retcode: {}, error: {}",
+                r.ticket,
+                r.retcode,
+                r.error,
+            )
+    log.info("Close all: {}", report.summary())
+    return report
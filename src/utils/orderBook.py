@@ -0,0 +1,343 @@
+import re
+import time
+import fnmatch
+import threading
+from functools import lru_cache
+from typing import Callable, Optional
+from utils.broker import mt5
+from utils.logger import log
+
+SELECTOR_PREFIX = "glob:"
+
+
+# Comments starting with `glob:` select every matching trade, e.g. `glob:p2.3-*`.
+# Any other comment is matched literally, even one containing `*`, `?` or `[`.
+def isSelector(comment: str) -> bool:
+    return comment.startswith(SELECTOR_PREFIX)
+
+
+# Glob (with or without its `glob:` prefix) -> predicate; a plain `prefix*` skips
+# the regex
+@lru_cache(maxsize=256)
+def commentMatcher(pattern: str) -> Callable[[str], bool]:
+    pattern = pattern.removeprefix(SELECTOR_PREFIX)
+    prefix = pattern[:-1]
+    if pattern.endswith("*") and not any(char in prefix for char in "*?["):
+        return lambda comment: comment.startswith(prefix)
+    return re.compile(fnmatch.translate(pattern)).match
+
+
+# In-memory index of open positions and pending orders keyed by ticket, comment and
+# symbol. Kept in sync incrementally from our own trade results; a cheap count check
+# (positions_total/orders_total) triggers a full resync when the book changed elsewhere,
+# and a full resync every `resyncInterval` seconds catches changes that keep the counts
+# (SL/TP edits, partial closes, a close plus a fill). Requests that modify or close a
+# trade refetch it first with `current()`.
+class OrderBook:
+    def __init__(self, verifyMode: bool = False, resyncInterval: float = 30.0):
+        self.verifyMode = verifyMode
+        self.resyncInterval = resyncInterval
+        self._lock = threading.RLock()
+        self._positions = {}
+        self._orders = {}
+        # comment/symbol -> {ticket: None} (dict keeps insertion order, unlike set)
+        self._positionsByComment = {}
+        self._ordersByComment = {}
+        self._positionsBySymbol = {}
+        self._ordersBySymbol = {}
+        self._synced = False
+        self._syncedAt = 0.0
+        # bumped by every full resync, so a single-ticket fetch racing one can tell
+        self._generation = 0
+        # notified of every change to the index, under the book's lock
+        self._listeners = []
+
+    # `listener` gets `onAdd(trade, isPosition)`, `onRemove(trade, isPosition)` and
+    # `onReset()` (before a full resync re-adds everything)
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    # Rebuilds the whole index from a full snapshot, fetched under the lock so an
+    # older snapshot can't overwrite a concurrent `refreshTicket()`
+    def sync(self):
+        with self._lock:
+            positions = mt5.positions_get() or ()
+            orders = mt5.orders_get() or ()
+            self._generation += 1
+            self._positions.clear()
+            self._orders.clear()
+            self._positionsByComment.clear()
+            self._ordersByComment.clear()
+            self._positionsBySymbol.clear()
+            self._ordersBySymbol.clear()
+            for listener in self._listeners:
+                listener.onReset()
+            for position in positions:
+                self._addPosition(position)
+            for order in orders:
+                self._addOrder(order)
+            self._synced = True
+            self._syncedAt = time.monotonic()
+
+    # Cheap delta check: only resyncs when the terminal's counts disagree with the index
+    def refresh(self):
+        if not self._synced:
+            self.sync()
+        elif (
+            self.resyncInterval
+            and time.monotonic() - self._syncedAt > self.resyncInterval
+        ):
+            self.sync()
+        elif mt5.positions_total() != len(self._positions) or mt5.orders_total() != len(
+            self._orders
+        ):
+            self.sync()
+        elif self.verifyMode:
+            self.verify()
+
+    def findPosition(self, comment: str):
+        with self._lock:
+            position = self._first(self._positionsByComment, self._positions, comment)
+        if position is None:
+            # a miss may mean the book changed outside of our own requests
+            self.sync()
+            with self._lock:
+                position = self._first(
+                    self._positionsByComment, self._positions, comment
+                )
+        return position
+
+    def findOrder(self, comment: str, types: Optional[list] = None):
+        with self._lock:
+            order = self._firstOfType(comment, types)
+        if order is None:
+            self.sync()
+            with self._lock:
+                order = self._firstOfType(comment, types)
+        return order
+
+    # Open position first, then pending order; returns (trade, isPosition)
+    def findTrade(self, comment: str):
+        for attempt in range(2):
+            if attempt:
+                self.sync()
+            with self._lock:
+                position = self._first(
+                    self._positionsByComment, self._positions, comment
+                )
+                if position is not None:
+                    return position, True
+                order = self._firstOfType(comment, None)
+                if order is not None:
+                    return order, False
+        return None, False
+
+    # Every position whose comment matches the glob, resolved against one consistent
+    # view of the index (comments are matched once, not once per ticket)
+    def matchPositions(self, pattern: str) -> list:
+        return self._matchOnce(
+            lambda: self._match(self._positionsByComment, self._positions, pattern)
+        )
+
+    def matchOrders(self, pattern: str, types: Optional[list] = None) -> list:
+        return self._matchOnce(
+            lambda: [
+                order
+                for order in self._match(self._ordersByComment, self._orders, pattern)
+                if types is None or order.type in types
+            ]
+        )
+
+    # Matching positions, then matching pending orders, as `(trade, isPosition)`
+    def matchTrades(self, pattern: str) -> list:
+        return self._matchOnce(
+            lambda: [
+                (position, True)
+                for position in self._match(
+                    self._positionsByComment, self._positions, pattern
+                )
+            ]
+            + [
+                (order, False)
+                for order in self._match(self._ordersByComment, self._orders, pattern)
+            ]
+        )
+
+    def getPosition(self, ticket: int):
+        return self._positions.get(ticket)
+
+    def getOrder(self, ticket: int):
+        return self._orders.get(ticket)
+
+    def positions(self, symbol: Optional[str] = None) -> list:
+        with self._lock:
+            if symbol is None:
+                return list(self._positions.values())
+            tickets = self._positionsBySymbol.get(symbol, {})
+            return [self._positions[ticket] for ticket in tickets]
+
+    def orders(self, symbol: Optional[str] = None) -> list:
+        with self._lock:
+            if symbol is None:
+                return list(self._orders.values())
+            tickets = self._ordersBySymbol.get(symbol, {})
+            return [self._orders[ticket] for ticket in tickets]
+
+    # Updates only the tickets touched by a successful `order_send`
+    def applyResult(self, request: dict, result):
+        if result is None or result.retcode not in [
+            mt5.TRADE_RETCODE_DONE,
+            mt5.TRADE_RETCODE_PLACED,
+            mt5.TRADE_RETCODE_DONE_PARTIAL,
+        ]:
+            return
+        tickets = {
+            request.get("position"),
+            request.get("order"),
+            result.order or None,
+        }
+        for ticket in tickets:
+            if ticket:
+                self.refreshTicket(ticket)
+        if self.verifyMode:
+            self.verify()
+
+    # Refetches a single ticket (as position and as order) and updates the index
+    def refreshTicket(self, ticket: int):
+        generation = self._generation
+        positions = mt5.positions_get(ticket=ticket)
+        orders = mt5.orders_get(ticket=ticket)
+        with self._lock:
+            if generation != self._generation:
+                # a full resync ran meanwhile and may be newer than what we fetched
+                positions = mt5.positions_get(ticket=ticket)
+                orders = mt5.orders_get(ticket=ticket)
+            self._removePosition(ticket)
+            self._removeOrder(ticket)
+            for position in positions or ():
+                self._addPosition(position)
+            for order in orders or ():
+                self._addOrder(order)
+
+    # The trade as the terminal has it right now (None once it's gone), so a request
+    # built from its volume/SL/TP doesn't undo a change made outside the EA
+    def current(self, trade, isPosition: bool):
+        self.refreshTicket(trade.ticket)
+        return (
+            self.getPosition(trade.ticket)
+            if isPosition
+            else self.getOrder(trade.ticket)
+        )
+
+    # Diffs the index against a full snapshot; returns the differences found
+    def verify(self) -> dict:
+        positions = {p.ticket: p for p in mt5.positions_get() or ()}
+        orders = {o.ticket: o for o in mt5.orders_get() or ()}
+        with self._lock:
+            diff = {
+                "missing": sorted(
+                    (positions.keys() - self._positions.keys())
+                    | (orders.keys() - self._orders.keys())
+                ),
+                "extra": sorted(
+                    (self._positions.keys() - positions.keys())
+                    | (self._orders.keys() - orders.keys())
+                ),
+                "changed": sorted(
+                    self._changed(positions, self._positions)
+                    + self._changed(orders, self._orders)
+                ),
+            }
+        if diff["missing"] or diff["extra"] or diff["changed"]:
+            log.warning("⚠️ Order book out of sync: {}", diff)
+        return diff
+
+    # Tickets whose tracked fields differ (prices/profit move on every tick, so skip them)
+    @staticmethod
+    def _changed(snapshot: dict, indexed: dict) -> list:
+        fields = ["symbol", "type", "volume", "sl", "tp", "comment"]
+        return [
+            ticket
+            for ticket, item in snapshot.items()
+            if ticket in indexed
+            and any(
+                getattr(item, f, None) != getattr(indexed[ticket], f, None)
+                for f in fields
+            )
+        ]
+
+    # Resyncs and retries once if nothing matched, like the exact finders
+    def _matchOnce(self, match: Callable) -> list:
+        with self._lock:
+            matches = match()
+        if not matches:
+            self.sync()
+            with self._lock:
+                matches = match()
+        return matches
+
+    @staticmethod
+    def _match(byComment: dict, items: dict, pattern: str) -> list:
+        matches = commentMatcher(pattern)
+        return [
+            items[ticket]
+            for comment, tickets in byComment.items()
+            if matches(comment)
+            for ticket in tickets
+        ]
+
+    def _firstOfType(self, comment: str, types: Optional[list]):
+        for ticket in self._ordersByComment.get(comment, {}):
+            order = self._orders[ticket]
+            if types is None or order.type in types:
+                return order
+        return None
+
+    @staticmethod
+    def _first(byComment: dict, items: dict, comment: str):
+        for ticket in byComment.get(comment, {}):
+            return items[ticket]
+        return None
+
+    def _addPosition(self, position):
+        self._positions[position.ticket] = position
+        self._positionsByComment.setdefault(position.comment, {})[
+            position.ticket
+        ] = None
+        self._positionsBySymbol.setdefault(position.symbol, {})[position.ticket] = None
+        for listener in self._listeners:
+            listener.onAdd(position, True)
+
+    def _addOrder(self, order):
+        self._orders[order.ticket] = order
+        self._ordersByComment.setdefault(order.comment, {})[order.ticket] = None
+        self._ordersBySymbol.setdefault(order.symbol, {})[order.ticket] = None
+        for listener in self._listeners:
+            listener.onAdd(order, False)
+
+    def _removePosition(self, ticket: int):
+        position = self._positions.pop(ticket, None)
+        if position is not None:
+            self._discard(self._positionsByComment, position.comment, ticket)
+            self._discard(self._positionsBySymbol, position.symbol, ticket)
+            for listener in self._listeners:
+                listener.onRemove(position, True)
+
+    def _removeOrder(self, ticket: int):
+        order = self._orders.pop(ticket, None)
+        if order is not None:
+            self._discard(self._ordersByComment, order.comment, ticket)
+            self._discard(self._ordersBySymbol, order.symbol, ticket)
+            for listener in self._listeners:
+                listener.onRemove(order, False)
+
+    @staticmethod
+    def _discard(index: dict, key, ticket: int):
+        tickets = index.get(key)
+        if tickets is not None:
+            tickets.pop(ticket, None)
+            if not tickets:
+                del index[key]
+
+
+orderBook = OrderBook()
@@ -0,0 +1,118 @@
+import math
+from typing import Optional
+from utils.broker import mt5
+from utils.symbolCache import SymbolSpec, getDecimalCount
+
+# Pre-trade checks run against the cached symbol spec and the latest tick, so requests
+# the trade server would reject (wrong filling mode, volume off the step, SL/TP inside
+# the stops level, trades inside the freeze level) never cost a broker round trip.
+# Checks return None when the request is fine, else the reason it would be rejected.
+
+
+# Positions are BUY or SELL; every buy-side order type (market, limit, stop,
+# stop-limit) becomes a long position
+def isLongTrade(trade, isPosition: bool) -> bool:
+    if isPosition:
+        return trade.type == mt5.POSITION_TYPE_BUY
+    return trade.type in [
+        mt5.ORDER_TYPE_BUY,
+        mt5.ORDER_TYPE_BUY_LIMIT,
+        mt5.ORDER_TYPE_BUY_STOP,
+        mt5.ORDER_TYPE_BUY_STOP_LIMIT,
+    ]
+
+
+def isStopOrder(order) -> bool:
+    return order.type in [
+        mt5.ORDER_TYPE_BUY_STOP,
+        mt5.ORDER_TYPE_SELL_STOP,
+        mt5.ORDER_TYPE_BUY_STOP_LIMIT,
+        mt5.ORDER_TYPE_SELL_STOP_LIMIT,
+    ]
+
+
+# Filling mode the symbol accepts, preferring IOC, then FOK; RETURN otherwise
+def fillingModeFor(spec: SymbolSpec) -> int:
+    if spec.fillingMode & mt5.SYMBOL_FILLING_IOC:
+        return mt5.ORDER_FILLING_IOC
+    if spec.fillingMode & mt5.SYMBOL_FILLING_FOK:
+        return mt5.ORDER_FILLING_FOK
+    return mt5.ORDER_FILLING_RETURN
+
+
+# Rounds the volume down to the volume step (never more risk than asked for) and caps
+# it at the symbol's max volume
+def snapVolume(volume: float, spec: SymbolSpec) -> float:
+    steps = math.floor(volume / spec.volumeStep + 1e-9)
+    snapped = round(steps * spec.volumeStep, getDecimalCount(spec.volumeStep))
+    return min(snapped, spec.volumeMax)
+
+
+def checkVolume(volume: Optional[float], spec: SymbolSpec) -> Optional[str]:
+    if volume is None or volume < spec.volumeMin - 1e-9:
+        return f"Volume {volume} is below the minimum of {spec.volumeMin}."
+    return None
+
+
+# SL/TP must be on the right side of the price, at least `stopsLevel` points away.
+# Market orders are checked against the price they'd close at (bid for longs, ask for
+# shorts), pending orders against their open price, which must itself be far enough
+# from the market.
+def checkStops(
+    spec: SymbolSpec,
+    tick,
+    isLong: bool,
+    sl: Optional[float] = None,
+    tp: Optional[float] = None,
+    price: Optional[float] = None,
+    isStop: bool = False,
+) -> Optional[str]:
+    minDistance = spec.stopsLevel * spec.point
+    if price is not None:
+        distance = tick.ask - price if isLong else price - tick.bid
+        # limits wait for a better price, stops for a worse one
+        if isStop:
+            distance = -distance
+        if distance < minDistance - 1e-12 or distance <= 0:
+            return (
+                f"{'Stop' if isStop else 'Limit'} price {price} must be more than "
+                f"{minDistance} away from the market on the right side "
+                f"(bid: {tick.bid}, ask: {tick.ask})."
+            )
+        reference = price
+    else:
+        reference = tick.bid if isLong else tick.ask
+    direction = 1 if isLong else -1
+    if sl and (reference - sl) * direction < max(minDistance, 1e-12):
+        return (
+            f"SL {sl} must be {'below' if isLong else 'above'} {reference} by at "
+            f"least {minDistance}."
+        )
+    if tp and (tp - reference) * direction < max(minDistance, 1e-12):
+        return (
+            f"TP {tp} must be {'above' if isLong else 'below'} {reference} by at "
+            f"least {minDistance}."
+        )
+    return None
+
+
+# The server refuses to modify, close or cancel a trade while the market is within
+# `freezeLevel` points of its SL/TP (positions) or open price (pending orders)
+def checkFreeze(spec: SymbolSpec, tick, trade, isPosition: bool) -> Optional[str]:
+    if not spec.freezeLevel:
+        return None
+    freezeDistance = spec.freezeLevel * spec.point
+    isLong = isLongTrade(trade, isPosition)
+    if isPosition:
+        price = tick.bid if isLong else tick.ask
+        levels = [level for level in [trade.sl, trade.tp] if level]
+    else:
+        price = tick.ask if isLong else tick.bid
+        levels = [trade.price_open]
+    for level in levels:
+        if abs(price - level) <= freezeDistance:
+            return (
+                f"Trade {trade.ticket} is frozen: {level} is within {freezeDistance} "
+                f"of the market ({price})."
+            )
+    return None
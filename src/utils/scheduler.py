@@ -0,0 +1,161 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+from collections import namedtuple
+from utils import metrics
+from utils.broker import mt5
+
+# Priority classes, most urgent first
+EXIT = 0
+MODIFY = 1
+ENTRY = 2
+CLASS_NAMES = {EXIT: "exit", MODIFY: "modify", ENTRY: "entry"}
+
+# Returned instead of the broker's result when a request's deadline passed in the
+# queue; same fields as MT5's OrderSendResult
+ExpiredResult = namedtuple(
+    "OrderSendResult",
+    "retcode deal order volume price bid ask comment request_id request",
+)
+
+
+# Closes and cancels protect the account, SL/TP changes adjust protection, entries add
+# risk: that's the order they should reach the broker in
+def classOf(request: dict) -> int:
+    action = request.get("action")
+    if action == mt5.TRADE_ACTION_REMOVE or (
+        action == mt5.TRADE_ACTION_DEAL and request.get("position")
+    ):
+        return EXIT
+    if action in [mt5.TRADE_ACTION_SLTP, mt5.TRADE_ACTION_MODIFY]:
+        return MODIFY
+    return ENTRY
+
+
+def expiredResult(request: dict):
+    return ExpiredResult(
+        mt5.TRADE_RETCODE_TIMEOUT,
+        0,
+        0,
+        0.0,
+        0.0,
+        0.0,
+        0.0,
+        "Expired in the outbound queue",
+        0,
+        request,
+    )
+
+
+# Per-class counters and queue wait times
+class ClassStats:
+    __slots__ = ("sent", "expired", "wait")
+
+    def __init__(self):
+        self.sent = 0
+        self.expired = 0
+        self.wait = metrics.Histogram()
+
+    def summary(self) -> dict:
+        wait = self.wait.summary()
+        return {
+            "sent": self.sent,
+            "expired": self.expired,
+            "waitP50": wait["p50"],
+            "waitP95": wait["p95"],
+            "waitMax": wait["max"],
+        }
+
+
+# Admission control for `order_send`: a token bucket (`rate` requests/sec, bursts of
+# up to `burst`) matched to the broker's limits, handing tokens to waiting requests by
+# class (exits, then modifications, then entries; FIFO within a class). The calling
+# thread waits for its turn and sends itself, so results stay synchronous. A request
+# still waiting after its class's deadline is dropped instead of sent late.
+# `rate = 0` disables the limiter: every request goes straight through.
+class RequestScheduler:
+    def __init__(self, rate: float = 0.0, burst: int = 5, deadlines: dict = None):
+        self.rate = rate
+        self.burst = burst
+        # class -> seconds a request may wait before being dropped (None = forever)
+        self.deadlines = deadlines or {EXIT: None, MODIFY: None, ENTRY: 2.0}
+        self._tokens = float(burst)
+        self._refilledAt = time.monotonic()
+        # (class, seq) of waiting requests; the head gets the next token
+        self._waiting = []
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        self._stats = {priority: ClassStats() for priority in CLASS_NAMES}
+
+    # REQUEST_RATE (per second, 0 = unlimited), REQUEST_BURST and the
+    # *_DEADLINE_MS per class (0 = never dropped)
+    def configure(self):
+        self.rate = float(os.getenv("REQUEST_RATE", "0"))
+        self.burst = int(os.getenv("REQUEST_BURST", "5"))
+        self._tokens = float(self.burst)
+        for priority, name, default in [
+            (EXIT, "EXIT_DEADLINE_MS", "0"),
+            (MODIFY, "MODIFY_DEADLINE_MS", "0"),
+            (ENTRY, "ENTRY_DEADLINE_MS", "2000"),
+        ]:
+            milliseconds = float(os.getenv(name, default))
+            self.deadlines[priority] = milliseconds / 1000 if milliseconds else None
+
+    # Blocks until the request may be sent; False if its deadline passed first
+    def acquire(self, request: dict) -> bool:
+        priority = classOf(request)
+        stats = self._stats[priority]
+        if not self.rate:
+            # bulk sends acquire from several threads at once
+            with self._condition:
+                stats.sent += 1
+            return True
+        start = time.monotonic()
+        deadline = self.deadlines.get(priority)
+        expiresAt = start + deadline if deadline is not None else None
+        key = (priority, next(self._seq))
+        with self._condition:
+            heapq.heappush(self._waiting, key)
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._waiting[0] == key and self._tokens >= 1:
+                    heapq.heappop(self._waiting)
+                    self._tokens -= 1
+                    stats.sent += 1
+                    # the next in line may be able to go too
+                    self._condition.notify_all()
+                    break
+                if expiresAt is not None and now >= expiresAt:
+                    self._waiting.remove(key)
+                    heapq.heapify(self._waiting)
+                    stats.expired += 1
+                    self._condition.notify_all()
+                    return False
+                # wake up when a token is due or the deadline passes, whichever first
+                timeouts = []
+                if self._tokens < 1:
+                    timeouts.append((1 - self._tokens) / self.rate)
+                if expiresAt is not None:
+                    timeouts.append(expiresAt - now)
+                self._condition.wait(min(timeouts) if timeouts else None)
+        waited = time.monotonic() - start
+        stats.wait.record(waited)
+        metrics.record(f"outbound:{CLASS_NAMES[priority]}", waited)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            CLASS_NAMES[priority]: stats.summary()
+            for priority, stats in self._stats.items()
+        }
+
+    def _refill(self, now: float):
+        elapsed = now - self._refilledAt
+        self._refilledAt = now
+        self._tokens = min(float(self.burst), self._tokens + elapsed * self.rate)
+
+
+scheduler = RequestScheduler()
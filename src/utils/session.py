@@ -0,0 +1,102 @@
+import os
+import threading
+from utils.broker import mt5
+
+
+# Long-lived MT5 connection: initializes and logs in once, then a background
+# thread checks the terminal and reconnects with exponential backoff if it drops.
+# `connected` is a plain attribute so the alert handler can check it in O(1).
+class MT5Session:
+    def __init__(
+        self,
+        healthInterval: float = 5.0,
+        minBackoff: float = 1.0,
+        maxBackoff: float = 60.0,
+    ):
+        self.healthInterval = healthInterval
+        self.minBackoff = minBackoff
+        self.maxBackoff = maxBackoff
+        self.connected = False
+        self._lock = threading.Lock()
+        self._stopEvent = threading.Event()
+        self._thread = None
+
+    # Initializes the terminal and logs in if the terminal isn't already on our account
+    def connect(self) -> bool:
+        login = os.getenv("MT5_LOGIN")
+        password = os.getenv("MT5_PASSWORD")
+        server = os.getenv("MT5_SERVER")
+        # a specific terminal, e.g. one per account when fanning out
+        path = os.getenv("MT5_PATH")
+        with self._lock:
+            if not (mt5.initialize(path) if path else mt5.initialize()):
+                print(
+                    f"> Initializing MT5 connection failed. Error: {mt5.last_error()}"
+                )
+                self.connected = False
+                return False
+            print(f"> Connection to MT5 on server '{server}' was successful.")
+            accInfo = mt5.account_info()
+            if login is None or (
+                accInfo is not None and str(accInfo.login) == str(login)
+            ):
+                print(f"> Already logged-in to account '{login or accInfo.login}'.")
+            elif not mt5.login(int(login), password, server):
+                print(f"> Login to account '{login}' failed. Error: {mt5.last_error()}")
+                mt5.shutdown()
+                self.connected = False
+                return False
+            self.connected = True
+            return True
+
+    # Terminal is alive and connected to the trade server
+    def isHealthy(self) -> bool:
+        terminalInfo = mt5.terminal_info()
+        return terminalInfo is not None and terminalInfo.connected
+
+    # Connects (once) and starts the health-check thread; safe to call repeatedly.
+    # Intervals can be overridden via env since `.env` is loaded after import.
+    def start(self) -> bool:
+        if self._thread is not None and self._thread.is_alive():
+            return self.connected
+        self.healthInterval = float(
+            os.getenv("MT5_HEALTH_INTERVAL", self.healthInterval)
+        )
+        self.maxBackoff = float(os.getenv("MT5_MAX_BACKOFF", self.maxBackoff))
+        self.connect()
+        self._stopEvent.clear()
+        self._thread = threading.Thread(target=self._healthLoop, daemon=True)
+        self._thread.start()
+        return self.connected
+
+    def stop(self):
+        self._stopEvent.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.healthInterval)
+        with self._lock:
+            self.connected = False
+            mt5.shutdown()
+
+    def _healthLoop(self):
+        backoff = self.minBackoff
+        while not self._stopEvent.wait(
+            self.healthInterval if self.connected else backoff
+        ):
+            if self.connected and self.isHealthy():
+                continue
+            if self.connected:
+                print("> MT5 terminal connection lost. Reconnecting...")
+                self.connected = False
+                with self._lock:
+                    mt5.shutdown()
+                backoff = self.minBackoff
+                continue
+            if self.connect():
+                print("> Reconnected to MT5.")
+                backoff = self.minBackoff
+            else:
+                backoff = min(backoff * 2, self.maxBackoff)
+                print(f"> MT5 reconnect failed. Retrying in {backoff}s.")
+
+
+session = MT5Session()
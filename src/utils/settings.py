@@ -0,0 +1,34 @@
+import os
+from utils.logger import log
+from utils.orderBook import orderBook
+from utils.idempotency import alertDedup
+from utils.tickCache import tickCache
+from utils.accountCache import accountCache
+from utils.exposure import exposure
+from utils.scheduler import scheduler
+from utils.tradeEvents import tradeEvents
+from utils.journal import journal
+
+
+# Applies the env settings of the shared singletons. Runs in the main process at
+# startup and again in each account worker, after that account's env overrides.
+def applySettings():
+    log.setLevel(os.getenv("EA_LOG_LEVEL", "INFO"))
+    log.setFile(os.getenv("EA_LOG_FILE"))
+    orderBook.verifyMode = os.getenv("ORDER_BOOK_VERIFY") == "1"
+    orderBook.resyncInterval = float(os.getenv("ORDER_BOOK_RESYNC_INTERVAL", "30"))
+    alertDedup.ttl = float(os.getenv("ALERT_DEDUP_TTL", "60"))
+    accountCache.refreshInterval = float(os.getenv("ACCOUNT_REFRESH_INTERVAL", "1"))
+    exposure.configure()
+    scheduler.configure()
+    tradeEvents.pollInterval = float(os.getenv("TRADE_EVENT_POLL_MS", "250")) / 1000
+    journal.syncInterval = float(os.getenv("EA_JOURNAL_SYNC_MS", "50")) / 1000
+    journal.maxBytes = int(float(os.getenv("EA_JOURNAL_MAX_MB", "64")) * (1 << 20))
+    journal.backups = int(os.getenv("EA_JOURNAL_BACKUPS", "5"))
+    tickCache.maxStaleness = float(os.getenv("TICK_MAX_STALENESS", "0.5"))
+    tickCache.pollInterval = float(os.getenv("TICK_POLL_INTERVAL", "0.1"))
+    tickCache.watch(
+        symbol.strip()
+        for symbol in os.getenv("TICK_SYMBOLS", "").split(",")
+        if symbol.strip()
+    )
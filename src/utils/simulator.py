@@ -0,0 +1,715 @@
+import time
+import threading
+from collections import namedtuple
+from typing import Callable, Optional
+
+# Same values as the MetaTrader5 module so requests built for MT5 work unchanged
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+ORDER_TYPE_BUY_LIMIT = 2
+ORDER_TYPE_SELL_LIMIT = 3
+ORDER_TYPE_BUY_STOP = 4
+ORDER_TYPE_SELL_STOP = 5
+ORDER_TYPE_BUY_STOP_LIMIT = 6
+ORDER_TYPE_SELL_STOP_LIMIT = 7
+POSITION_TYPE_BUY = 0
+POSITION_TYPE_SELL = 1
+TRADE_ACTION_DEAL = 1
+TRADE_ACTION_PENDING = 5
+TRADE_ACTION_SLTP = 6
+TRADE_ACTION_MODIFY = 7
+TRADE_ACTION_REMOVE = 8
+ORDER_TIME_GTC = 0
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+ORDER_FILLING_RETURN = 2
+SYMBOL_FILLING_FOK = 1
+SYMBOL_FILLING_IOC = 2
+ORDER_STATE_PLACED = 1
+ORDER_STATE_CANCELED = 2
+ORDER_STATE_FILLED = 4
+ORDER_STATE_EXPIRED = 6
+DEAL_TYPE_BUY = 0
+DEAL_TYPE_SELL = 1
+DEAL_ENTRY_IN = 0
+DEAL_ENTRY_OUT = 1
+DEAL_ENTRY_OUT_BY = 3
+DEAL_REASON_CLIENT = 0
+DEAL_REASON_EXPERT = 3
+DEAL_REASON_SL = 4
+DEAL_REASON_TP = 5
+TRADE_RETCODE_REQUOTE = 10004
+TRADE_RETCODE_REJECT = 10006
+TRADE_RETCODE_PLACED = 10008
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_DONE_PARTIAL = 10010
+TRADE_RETCODE_ERROR = 10011
+TRADE_RETCODE_TIMEOUT = 10012
+TRADE_RETCODE_INVALID = 10013
+TRADE_RETCODE_INVALID_VOLUME = 10014
+TRADE_RETCODE_INVALID_PRICE = 10015
+TRADE_RETCODE_INVALID_STOPS = 10016
+TRADE_RETCODE_PRICE_CHANGED = 10020
+TRADE_RETCODE_PRICE_OFF = 10021
+TRADE_RETCODE_INVALID_FILL = 10030
+TRADE_RETCODE_CONNECTION = 10031
+TRADE_RETCODE_POSITION_CLOSED = 10036
+
+SymbolInfo = namedtuple(
+    "SymbolInfo",
+    "name visible point digits trade_tick_size trade_tick_value volume_min "
+    "volume_max volume_step filling_mode trade_stops_level trade_freeze_level "
+    "currency_base currency_profit bid ask",
+)
+Tick = namedtuple("Tick", "time bid ask last volume time_msc flags volume_real")
+TradePosition = namedtuple(
+    "TradePosition",
+    "ticket time time_msc type magic identifier reason volume price_open sl tp "
+    "price_current swap profit symbol comment",
+)
+TradeOrder = namedtuple(
+    "TradeOrder",
+    "ticket time_setup time_setup_msc time_done time_done_msc type state magic "
+    "position_id volume_initial volume_current price_open sl tp price_current "
+    "symbol comment",
+)
+TradeDeal = namedtuple(
+    "TradeDeal",
+    "ticket order time time_msc type entry magic position_id reason volume price "
+    "profit symbol comment",
+)
+OrderSendResult = namedtuple(
+    "OrderSendResult",
+    "retcode deal order volume price bid ask comment request_id request",
+)
+AccountInfo = namedtuple(
+    "AccountInfo", "login balance equity margin margin_free profit currency leverage"
+)
+TerminalInfo = namedtuple("TerminalInfo", "connected trade_allowed name")
+
+
+# Deterministic in-memory stand-in for the MetaTrader5 module: symbols, ticks,
+# positions, pending orders, deals history and retcodes, with optional latency per
+# `order_send`. Prices only move when `setTick` is called. Limit orders and SL/TP are
+# triggered by `setTick`, like the trade server would.
+class MT5Simulator:
+    def __init__(
+        self,
+        balance: float = 100000.0,
+        latency: float = 0.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.latency = latency
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._symbols = {}
+        self._ticks = {}
+        self._positions = {}
+        self._orders = {}
+        self._historyOrders = {}
+        self._deals = []
+        self._nextTicket = 1000
+        self._injectedRetcodes = []
+        self._lastError = (1, "Success")
+        self._initialized = False
+        self._connected = True
+        self.accountLogin = 0
+        self.balance = balance
+
+    @classmethod
+    def withDefaultSymbols(cls, **kwargs):
+        simulator = cls(**kwargs)
+        simulator.addSymbol("EURUSD", 1.10000, 1.10002, point=0.00001, tickValue=1.0)
+        simulator.addSymbol("GBPJPY", 206.500, 206.520, point=0.001, tickValue=0.6543)
+        simulator.addSymbol("XAUUSD", 2624.00, 2624.20, point=0.01, tickValue=1.0)
+        simulator.addSymbol(
+            "BTCUSD", 60000.05, 60010.05, point=0.01, tickValue=0.01, volumeMin=0.01
+        )
+        simulator.addSymbol(
+            "NDX100", 20020.0, 20021.0, point=0.1, tickSize=0.1, tickValue=0.1
+        )
+        return simulator
+
+    # -- simulator controls --
+
+    def addSymbol(
+        self,
+        name: str,
+        bid: float,
+        ask: float,
+        point: float = 0.00001,
+        tickSize: Optional[float] = None,
+        tickValue: float = 1.0,
+        volumeMin: float = 0.01,
+        volumeMax: float = 100.0,
+        volumeStep: float = 0.01,
+        fillingMode: int = SYMBOL_FILLING_FOK | SYMBOL_FILLING_IOC,
+        stopsLevel: int = 0,
+        freezeLevel: int = 0,
+        currencyBase: Optional[str] = None,
+        currencyProfit: Optional[str] = None,
+        visible: bool = True,
+    ):
+        digits = len(f"{point:.10f}".rstrip("0").split(".")[1])
+        with self._lock:
+            self._symbols[name] = dict(
+                name=name,
+                visible=visible,
+                point=point,
+                digits=digits,
+                trade_tick_size=tickSize if tickSize is not None else point,
+                trade_tick_value=tickValue,
+                volume_min=volumeMin,
+                volume_max=volumeMax,
+                volume_step=volumeStep,
+                filling_mode=fillingMode,
+                trade_stops_level=stopsLevel,
+                trade_freeze_level=freezeLevel,
+                currency_base=currencyBase or name[:3],
+                currency_profit=currencyProfit or name[3:6] or "USD",
+            )
+            self._setTick(name, bid, ask)
+
+    # Moves the market; fills pending limit orders and closes positions on SL/TP
+    def setTick(self, symbol: str, bid: float, ask: float):
+        with self._lock:
+            self._setTick(symbol, bid, ask)
+            self._matchOrders(symbol)
+
+    def injectRetcode(self, retcode: int, times: int = 1):
+        with self._lock:
+            self._injectedRetcodes.extend([retcode] * times)
+
+    def disconnect(self):
+        self._connected = False
+
+    def reconnect(self):
+        self._connected = True
+
+    # -- MetaTrader5 module API --
+
+    def initialize(self, *args, **kwargs) -> bool:
+        if not self._connected:
+            self._lastError = (-10003, "IPC initialize failed")
+            return False
+        self._initialized = True
+        return True
+
+    def login(self, login: int, password: str = "", server: str = "", **kwargs) -> bool:
+        self.accountLogin = int(login)
+        return True
+
+    def shutdown(self):
+        self._initialized = False
+
+    def last_error(self) -> tuple:
+        return self._lastError
+
+    def terminal_info(self):
+        if not self._initialized:
+            return None
+        return TerminalInfo(self._connected, True, "MT5Simulator")
+
+    def account_info(self):
+        with self._lock:
+            profit = sum(p.profit for p in self._positions.values())
+            return AccountInfo(
+                self.accountLogin,
+                self.balance,
+                self.balance + profit,
+                0.0,
+                self.balance + profit,
+                profit,
+                "USD",
+                100,
+            )
+
+    def symbol_info(self, symbol: str):
+        spec = self._symbols.get(symbol)
+        if spec is None:
+            return None
+        tick = self._ticks[symbol]
+        return SymbolInfo(bid=tick.bid, ask=tick.ask, **spec)
+
+    def symbol_info_tick(self, symbol: str):
+        return self._ticks.get(symbol)
+
+    def symbol_select(self, symbol: str, enable: bool = True) -> bool:
+        spec = self._symbols.get(symbol)
+        if spec is None:
+            return False
+        spec["visible"] = enable
+        return True
+
+    def positions_get(
+        self, symbol: Optional[str] = None, ticket: Optional[int] = None, **kwargs
+    ):
+        with self._lock:
+            return self._filter(self._positions, symbol, ticket)
+
+    def positions_total(self) -> int:
+        return len(self._positions)
+
+    def orders_get(
+        self, symbol: Optional[str] = None, ticket: Optional[int] = None, **kwargs
+    ):
+        with self._lock:
+            return self._filter(self._orders, symbol, ticket)
+
+    def orders_total(self) -> int:
+        return len(self._orders)
+
+    def history_deals_get(
+        self, date_from=None, date_to=None, position=None, ticket=None, **kwargs
+    ):
+        with self._lock:
+            deals = self._deals
+            if ticket is not None:
+                return tuple(d for d in deals if d.ticket == ticket)
+            if position is not None:
+                return tuple(d for d in deals if d.position_id == position)
+            return tuple(d for d in deals if self._inRange(d.time, date_from, date_to))
+
+    def history_orders_get(
+        self, date_from=None, date_to=None, position=None, ticket=None, **kwargs
+    ):
+        with self._lock:
+            orders = self._historyOrders.values()
+            if ticket is not None:
+                return tuple(o for o in orders if o.ticket == ticket)
+            if position is not None:
+                return tuple(o for o in orders if o.position_id == position)
+            return tuple(
+                o for o in orders if self._inRange(o.time_done, date_from, date_to)
+            )
+
+    def order_send(self, request: dict):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self._injectedRetcodes:
+                return self._result(self._injectedRetcodes.pop(0), request)
+            action = request.get("action")
+            if (
+                request.get("symbol") not in self._symbols
+                and action != TRADE_ACTION_REMOVE
+            ):
+                return self._result(TRADE_RETCODE_INVALID, request, "Invalid symbol")
+            if action == TRADE_ACTION_DEAL:
+                if request.get("position"):
+                    return self._closePosition(request)
+                return self._openPosition(request)
+            if action == TRADE_ACTION_PENDING:
+                return self._placeOrder(request)
+            if action == TRADE_ACTION_SLTP:
+                return self._modifyPosition(request)
+            if action == TRADE_ACTION_MODIFY:
+                return self._modifyOrder(request)
+            if action == TRADE_ACTION_REMOVE:
+                return self._removeOrder(request)
+            return self._result(TRADE_RETCODE_INVALID, request, "Invalid action")
+
+    # -- internals --
+
+    def _setTick(self, symbol: str, bid: float, ask: float):
+        now = self.clock()
+        self._ticks[symbol] = Tick(int(now), bid, ask, bid, 0, int(now * 1000), 6, 0.0)
+        for ticket, position in self._positions.items():
+            if position.symbol == symbol:
+                self._positions[ticket] = self._mark(position)
+
+    def _mark(self, position):
+        tick = self._ticks[position.symbol]
+        isLong = position.type == POSITION_TYPE_BUY
+        price = tick.bid if isLong else tick.ask
+        return position._replace(
+            price_current=price,
+            profit=self._profit(
+                position.symbol, isLong, position.price_open, price, position.volume
+            ),
+        )
+
+    def _profit(
+        self,
+        symbol: str,
+        isLong: bool,
+        openPrice: float,
+        closePrice: float,
+        volume: float,
+    ) -> float:
+        spec = self._symbols[symbol]
+        move = (closePrice - openPrice) if isLong else (openPrice - closePrice)
+        return round(
+            move / spec["trade_tick_size"] * spec["trade_tick_value"] * volume, 2
+        )
+
+    def _matchOrders(self, symbol: str):
+        tick = self._ticks[symbol]
+        for order in [o for o in self._orders.values() if o.symbol == symbol]:
+            if (
+                order.type == ORDER_TYPE_BUY_LIMIT and tick.ask <= order.price_open
+            ) or (order.type == ORDER_TYPE_SELL_LIMIT and tick.bid >= order.price_open):
+                del self._orders[order.ticket]
+                self._archiveOrder(order, ORDER_STATE_FILLED)
+                isLong = order.type == ORDER_TYPE_BUY_LIMIT
+                self._addPosition(
+                    order.ticket,
+                    symbol,
+                    isLong,
+                    order.volume_current,
+                    order.price_open,
+                    order.sl,
+                    order.tp,
+                    order.magic,
+                    order.comment,
+                )
+        for position in [p for p in self._positions.values() if p.symbol == symbol]:
+            isLong = position.type == POSITION_TYPE_BUY
+            price = tick.bid if isLong else tick.ask
+            hitSL = position.sl and (
+                price <= position.sl if isLong else price >= position.sl
+            )
+            hitTP = position.tp and (
+                price >= position.tp if isLong else price <= position.tp
+            )
+            if hitSL or hitTP:
+                self._exit(
+                    position,
+                    position.volume,
+                    position.sl if hitSL else position.tp,
+                    DEAL_REASON_SL if hitSL else DEAL_REASON_TP,
+                    self._newTicket(),
+                )
+
+    def _openPosition(self, request: dict):
+        spec = self._symbols[request["symbol"]]
+        retcode = self._checkVolume(spec, request.get("volume")) or self._checkFilling(
+            spec, request
+        )
+        if retcode:
+            return self._result(retcode, request)
+        isLong = request.get("type") == ORDER_TYPE_BUY
+        tick = self._ticks[request["symbol"]]
+        price = tick.ask if isLong else tick.bid
+        retcode = self._checkStops(isLong, price, request.get("sl"), request.get("tp"))
+        if retcode:
+            return self._result(retcode, request)
+        ticket = self._newTicket()
+        self._archiveOrder(
+            self._newOrder(ticket, request, price, ORDER_STATE_FILLED),
+            ORDER_STATE_FILLED,
+        )
+        deal = self._addPosition(
+            ticket,
+            request["symbol"],
+            isLong,
+            request["volume"],
+            price,
+            request.get("sl", 0.0),
+            request.get("tp", 0.0),
+            request.get("magic", 0),
+            request.get("comment", ""),
+        )
+        return self._result(
+            TRADE_RETCODE_DONE,
+            request,
+            deal=deal,
+            order=ticket,
+            volume=request["volume"],
+            price=price,
+        )
+
+    def _closePosition(self, request: dict):
+        position = self._positions.get(request["position"])
+        if position is None:
+            return self._result(TRADE_RETCODE_POSITION_CLOSED, request)
+        spec = self._symbols[position.symbol]
+        volume = request.get("volume", position.volume)
+        retcode = self._checkFilling(spec, request)
+        if retcode:
+            return self._result(retcode, request)
+        if volume > position.volume + 1e-9 or volume <= 0:
+            return self._result(TRADE_RETCODE_INVALID_VOLUME, request)
+        tick = self._ticks[position.symbol]
+        price = tick.bid if position.type == POSITION_TYPE_BUY else tick.ask
+        ticket = self._newTicket()
+        self._archiveOrder(
+            self._newOrder(ticket, request, price, ORDER_STATE_FILLED, position.ticket),
+            ORDER_STATE_FILLED,
+        )
+        deal = self._exit(position, volume, price, DEAL_REASON_EXPERT, ticket)
+        return self._result(
+            TRADE_RETCODE_DONE,
+            request,
+            deal=deal,
+            order=ticket,
+            volume=volume,
+            price=price,
+        )
+
+    def _placeOrder(self, request: dict):
+        spec = self._symbols[request["symbol"]]
+        retcode = self._checkVolume(spec, request.get("volume"))
+        if retcode:
+            return self._result(retcode, request)
+        price = request.get("price")
+        tick = self._ticks[request["symbol"]]
+        isLong = request.get("type") == ORDER_TYPE_BUY_LIMIT
+        if (
+            request.get("type") not in [ORDER_TYPE_BUY_LIMIT, ORDER_TYPE_SELL_LIMIT]
+            or not price
+        ):
+            return self._result(TRADE_RETCODE_INVALID, request)
+        if (isLong and price >= tick.ask) or (not isLong and price <= tick.bid):
+            return self._result(TRADE_RETCODE_INVALID_PRICE, request)
+        retcode = self._checkStops(isLong, price, request.get("sl"), request.get("tp"))
+        if retcode:
+            return self._result(retcode, request)
+        ticket = self._newTicket()
+        self._orders[ticket] = self._newOrder(
+            ticket, request, price, ORDER_STATE_PLACED
+        )
+        return self._result(
+            TRADE_RETCODE_PLACED,
+            request,
+            order=ticket,
+            volume=request["volume"],
+            price=price,
+        )
+
+    def _modifyPosition(self, request: dict):
+        position = self._positions.get(request.get("position"))
+        if position is None:
+            return self._result(TRADE_RETCODE_POSITION_CLOSED, request)
+        sl, tp = request.get("sl", position.sl), request.get("tp", position.tp)
+        retcode = self._checkStops(
+            position.type == POSITION_TYPE_BUY, position.price_current, sl, tp
+        )
+        if retcode:
+            return self._result(retcode, request)
+        self._positions[position.ticket] = position._replace(sl=sl, tp=tp)
+        return self._result(TRADE_RETCODE_DONE, request)
+
+    def _modifyOrder(self, request: dict):
+        order = self._orders.get(request.get("order"))
+        if order is None:
+            return self._result(TRADE_RETCODE_INVALID, request, "Invalid order")
+        price = request.get("price", order.price_open)
+        sl, tp = request.get("sl", order.sl), request.get("tp", order.tp)
+        retcode = self._checkStops(order.type == ORDER_TYPE_BUY_LIMIT, price, sl, tp)
+        if retcode:
+            return self._result(retcode, request)
+        self._orders[order.ticket] = order._replace(price_open=price, sl=sl, tp=tp)
+        return self._result(TRADE_RETCODE_DONE, request, order=order.ticket)
+
+    def _removeOrder(self, request: dict):
+        order = self._orders.pop(request.get("order"), None)
+        if order is None:
+            return self._result(TRADE_RETCODE_INVALID, request, "Invalid order")
+        self._archiveOrder(order, ORDER_STATE_CANCELED)
+        return self._result(TRADE_RETCODE_DONE, request, order=order.ticket)
+
+    def _addPosition(
+        self, ticket, symbol, isLong, volume, price, sl, tp, magic, comment
+    ):
+        now = self.clock()
+        position = TradePosition(
+            ticket,
+            int(now),
+            int(now * 1000),
+            POSITION_TYPE_BUY if isLong else POSITION_TYPE_SELL,
+            magic,
+            ticket,
+            DEAL_REASON_EXPERT,
+            volume,
+            price,
+            sl or 0.0,
+            tp or 0.0,
+            price,
+            0.0,
+            0.0,
+            symbol,
+            comment,
+        )
+        self._positions[ticket] = self._mark(position)
+        return self._addDeal(
+            ticket,
+            position,
+            DEAL_ENTRY_IN,
+            isLong,
+            volume,
+            price,
+            0.0,
+            DEAL_REASON_EXPERT,
+        )
+
+    # Closes `volume` of a position at `price`; returns the deal ticket
+    def _exit(
+        self, position, volume: float, price: float, reason: int, orderTicket: int
+    ) -> int:
+        isLong = position.type == POSITION_TYPE_BUY
+        profit = self._profit(
+            position.symbol, isLong, position.price_open, price, volume
+        )
+        self.balance += profit
+        remaining = round(position.volume - volume, 8)
+        if remaining > 0:
+            self._positions[position.ticket] = self._mark(
+                position._replace(volume=remaining)
+            )
+        else:
+            del self._positions[position.ticket]
+        return self._addDeal(
+            orderTicket,
+            position,
+            DEAL_ENTRY_OUT,
+            not isLong,
+            volume,
+            price,
+            profit,
+            reason,
+        )
+
+    def _addDeal(
+        self, orderTicket, position, entry, isBuy, volume, price, profit, reason
+    ) -> int:
+        now = self.clock()
+        ticket = self._newTicket()
+        self._deals.append(
+            TradeDeal(
+                ticket,
+                orderTicket,
+                int(now),
+                int(now * 1000),
+                DEAL_TYPE_BUY if isBuy else DEAL_TYPE_SELL,
+                entry,
+                position.magic,
+                position.ticket,
+                reason,
+                volume,
+                price,
+                profit,
+                position.symbol,
+                position.comment,
+            )
+        )
+        return ticket
+
+    def _newOrder(self, ticket, request, price, state, positionId=0):
+        now = self.clock()
+        return TradeOrder(
+            ticket,
+            int(now),
+            int(now * 1000),
+            0,
+            0,
+            request.get("type", 0),
+            state,
+            request.get("magic", 0),
+            positionId or (ticket if state == ORDER_STATE_FILLED else 0),
+            request.get("volume", 0.0),
+            request.get("volume", 0.0),
+            price,
+            request.get("sl", 0.0),
+            request.get("tp", 0.0),
+            price,
+            request.get("symbol", ""),
+            request.get("comment", ""),
+        )
+
+    def _archiveOrder(self, order, state: int):
+        now = self.clock()
+        self._historyOrders[order.ticket] = order._replace(
+            state=state, time_done=int(now), time_done_msc=int(now * 1000)
+        )
+
+    @staticmethod
+    def _checkVolume(spec: dict, volume) -> Optional[int]:
+        if (
+            volume is None
+            or volume < spec["volume_min"] - 1e-9
+            or volume > spec["volume_max"] + 1e-9
+        ):
+            return TRADE_RETCODE_INVALID_VOLUME
+        steps = volume / spec["volume_step"]
+        if abs(steps - round(steps)) > 1e-6:
+            return TRADE_RETCODE_INVALID_VOLUME
+        return None
+
+    @staticmethod
+    def _checkFilling(spec: dict, request: dict) -> Optional[int]:
+        filling = request.get("type_filling", ORDER_FILLING_FOK)
+        if filling == ORDER_FILLING_RETURN:
+            return (
+                TRADE_RETCODE_INVALID_FILL
+                if spec["filling_mode"] & (SYMBOL_FILLING_FOK | SYMBOL_FILLING_IOC)
+                else None
+            )
+        allowed = (
+            filling == ORDER_FILLING_FOK and spec["filling_mode"] & SYMBOL_FILLING_FOK
+        ) or (
+            filling == ORDER_FILLING_IOC and spec["filling_mode"] & SYMBOL_FILLING_IOC
+        )
+        return None if allowed else TRADE_RETCODE_INVALID_FILL
+
+    @staticmethod
+    def _checkStops(isLong: bool, price: float, sl, tp) -> Optional[int]:
+        if sl and (sl >= price if isLong else sl <= price):
+            return TRADE_RETCODE_INVALID_STOPS
+        if tp and (tp <= price if isLong else tp >= price):
+            return TRADE_RETCODE_INVALID_STOPS
+        return None
+
+    def _newTicket(self) -> int:
+        self._nextTicket += 1
+        return self._nextTicket
+
+    def _result(
+        self, retcode, request, comment="", deal=0, order=0, volume=0.0, price=0.0
+    ):
+        tick = self._ticks.get(request.get("symbol"))
+        self._lastError = (
+            (1, "Success")
+            if retcode in [TRADE_RETCODE_DONE, TRADE_RETCODE_PLACED]
+            else (retcode, comment or "Request rejected")
+        )
+        return OrderSendResult(
+            retcode,
+            deal,
+            order,
+            volume,
+            price,
+            tick.bid if tick else 0.0,
+            tick.ask if tick else 0.0,
+            comment,
+            0,
+            request,
+        )
+
+    @staticmethod
+    def _filter(items: dict, symbol: Optional[str], ticket: Optional[int]) -> tuple:
+        if ticket is not None:
+            item = items.get(ticket)
+            return (item,) if item is not None else ()
+        if symbol is not None:
+            return tuple(i for i in items.values() if i.symbol == symbol)
+        return tuple(items.values())
+
+    @staticmethod
+    def _inRange(timestamp: int, dateFrom, dateTo) -> bool:
+        start = MT5Simulator._toTimestamp(dateFrom, 0)
+        end = MT5Simulator._toTimestamp(dateTo, float("inf"))
+        return start <= timestamp <= end
+
+    @staticmethod
+    def _toTimestamp(value, default):
+        if value is None:
+            return default
+        return value.timestamp() if hasattr(value, "timestamp") else value
+
+
+# Expose the module-level constants on the class too, so an instance can be used
+# anywhere the MetaTrader5 module is (e.g. `mt5.ORDER_TYPE_BUY`)
+for _name, _value in list(globals().items()):
+    if _name.isupper() and isinstance(_value, int):
+        setattr(MT5Simulator, _name, _value)
@@ -0,0 +1,162 @@
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Optional
+from utils.broker import mt5
+from utils.logger import log
+
+
+# getDecimalCount(0.0001) => 4
+# getDecimalCount(1e-05) => 5
+def getDecimalCount(number):
+    numberStr = f"{number:.10f}"
+    decimalCount = len(numberStr.split(".")[1]) if "." in numberStr else 0
+    return decimalCount
+
+
+# Contract spec of a symbol, the subset of `symbol_info()` used for sizing and orders
+@dataclass(frozen=True, slots=True)
+class SymbolSpec:
+    symbol: str
+    tickSize: float
+    tickValue: float
+    volumeStep: float
+    volumeMin: float
+    volumeMax: float
+    point: float
+    roundPoint: int
+    fillingMode: int
+    # min distance (points) of SL/TP/limit prices from the market
+    stopsLevel: int
+    # distance (points) from SL/TP/open price within which a trade can't be changed
+    freezeLevel: int
+    # currencies the symbol's price moves expose us to, e.g. EUR and USD for EURUSD
+    currencyBase: str
+    currencyProfit: str
+
+    @classmethod
+    def fromSymbolInfo(cls, symInfo):
+        return cls(
+            symbol=symInfo.name,
+            tickSize=symInfo.trade_tick_size,
+            tickValue=symInfo.trade_tick_value,
+            volumeStep=symInfo.volume_step,
+            volumeMin=symInfo.volume_min,
+            volumeMax=symInfo.volume_max,
+            point=symInfo.point,
+            roundPoint=getDecimalCount(symInfo.point) + 1,
+            fillingMode=symInfo.filling_mode,
+            stopsLevel=symInfo.trade_stops_level,
+            freezeLevel=symInfo.trade_freeze_level,
+            currencyBase=symInfo.currency_base,
+            currencyProfit=symInfo.currency_profit,
+        )
+
+
+# Per-symbol spec cache with TTL and LRU eviction. `tick_value` moves with FX rates on
+# cross pairs so a background thread (`start()`) refreshes it every `tickValueTtl`
+# seconds. The terminal is never called while holding the cache lock: a miss loads
+# under a per-symbol lock, so concurrent misses on one symbol fetch it once and reads
+# of other symbols aren't held up.
+class SymbolSpecCache:
+    def __init__(
+        self, ttl: float = 3600.0, tickValueTtl: float = 60.0, maxSize: int = 256
+    ):
+        self.ttl = ttl
+        self.tickValueTtl = tickValueTtl
+        self.maxSize = maxSize
+        # symbol -> (spec, loadedAt)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # symbol -> lock held while loading it
+        self._loadLocks = {}
+        self._stopEvent = threading.Event()
+        self._thread = None
+
+    def get(self, symbol: str) -> Optional[SymbolSpec]:
+        spec = self._cached(symbol)
+        if spec is not None:
+            return spec
+        with self._lock:
+            loadLock = self._loadLocks.setdefault(symbol, threading.Lock())
+        with loadLock:
+            # loaded by another thread while we waited
+            spec = self._cached(symbol)
+            if spec is not None:
+                return spec
+            return self._load(symbol)
+
+    # The cached spec without ever reaching the terminal (None if not loaded yet), for
+    # callers holding locks of their own
+    def peek(self, symbol: str) -> Optional[SymbolSpec]:
+        entry = self._entries.get(symbol)
+        return entry[0] if entry is not None else None
+
+    # Drops one symbol (or everything) so the next read hits the terminal
+    def invalidate(self, symbol: Optional[str] = None):
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(symbol, None)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopEvent.clear()
+        self._thread = threading.Thread(target=self._refreshLoop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopEvent.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    # Fetches the current `tick_value` of every cached symbol
+    def refreshTickValues(self):
+        with self._lock:
+            symbols = list(self._entries)
+        for symbol in symbols:
+            symInfo = mt5.symbol_info(symbol)
+            if symInfo is None:
+                continue
+            with self._lock:
+                entry = self._entries.get(symbol)
+                if entry is not None and entry[0].tickValue != symInfo.trade_tick_value:
+                    spec = replace(entry[0], tickValue=symInfo.trade_tick_value)
+                    self._entries[symbol] = (spec, entry[1])
+
+    def _cached(self, symbol: str) -> Optional[SymbolSpec]:
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is None or time.monotonic() - entry[1] >= self.ttl:
+                return None
+            self._entries.move_to_end(symbol)
+            return entry[0]
+
+    def _load(self, symbol: str) -> Optional[SymbolSpec]:
+        symInfo = mt5.symbol_info(symbol)
+        if symInfo is None:
+            with self._lock:
+                self._entries.pop(symbol, None)
+            return None
+        if not symInfo.visible:
+            mt5.symbol_select(symbol, True)
+        spec = SymbolSpec.fromSymbolInfo(symInfo)
+        with self._lock:
+            self._entries[symbol] = (spec, time.monotonic())
+            self._entries.move_to_end(symbol)
+            while len(self._entries) > self.maxSize:
+                self._entries.popitem(last=False)
+        return spec
+
+    def _refreshLoop(self):
+        while not self._stopEvent.wait(self.tickValueTtl):
+            try:
+                self.refreshTickValues()
+            except Exception as e:
+                log.warning("Tick value refresh failed: {}", e)
+
+
+symbolSpecs = SymbolSpecCache()
@@ -0,0 +1,98 @@
+import time
+import threading
+from typing import Iterable, Optional
+from utils.broker import mt5
+from utils.logger import log
+
+
+# Latest bid/ask per symbol, kept fresh by a background poller so market entries and
+# closes don't wait on `symbol_info_tick()`. Symbols are polled if configured with
+# `watch()` or once a tick for them came back through `get()` (an unknown symbol is
+# never polled). A tick older than `maxStaleness` seconds is fetched synchronously
+# instead. The terminal is called outside of the lock.
+class TickCache:
+    def __init__(self, maxStaleness: float = 0.5, pollInterval: float = 0.1):
+        self.maxStaleness = maxStaleness
+        self.pollInterval = pollInterval
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        # symbol -> (tick, fetchedAt)
+        self._ticks = {}
+        self._symbols = {}
+        self._lock = threading.Lock()
+        self._stopEvent = threading.Event()
+        self._thread = None
+
+    def get(self, symbol: str, fresh: bool = False):
+        with self._lock:
+            entry = self._ticks.get(symbol)
+            if entry is None:
+                self.misses += 1
+            elif fresh or time.monotonic() - entry[1] > self.maxStaleness:
+                self.stale += 1
+            else:
+                self.hits += 1
+                return entry[0]
+        return self._fetch(symbol)
+
+    # Adds symbols to the poller's set
+    def watch(self, symbols: Iterable[str]):
+        with self._lock:
+            for symbol in symbols:
+                self._symbols[symbol] = None
+
+    # Seconds since the symbol's tick was fetched, None if it never was
+    def age(self, symbol: str) -> Optional[float]:
+        with self._lock:
+            entry = self._ticks.get(symbol)
+        return None if entry is None else time.monotonic() - entry[1]
+
+    def invalidate(self, symbol: Optional[str] = None):
+        with self._lock:
+            if symbol is None:
+                self._ticks.clear()
+            else:
+                self._ticks.pop(symbol, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "symbols": len(self._symbols),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+            }
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopEvent.clear()
+        self._thread = threading.Thread(target=self._pollLoop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopEvent.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.pollInterval * 10)
+
+    def _fetch(self, symbol: str):
+        tick = mt5.symbol_info_tick(symbol)
+        if tick is not None:
+            with self._lock:
+                self._ticks[symbol] = (tick, time.monotonic())
+                self._symbols[symbol] = None
+        return tick
+
+    def _pollLoop(self):
+        while not self._stopEvent.wait(self.pollInterval):
+            with self._lock:
+                symbols = list(self._symbols)
+            for symbol in symbols:
+                try:
+                    self._fetch(symbol)
+                except Exception as e:
+                    log.warning("Tick poll for '{}' failed: {}", symbol, e)
+
+
+tickCache = TickCache()
@@ -0,0 +1,244 @@
+import threading
+from typing import Callable, NamedTuple
+from utils import metrics
+from utils.broker import mt5
+from utils.logger import log
+from utils.orderBook import orderBook
+from utils.accountCache import accountCache
+
+# Event kinds
+FILLED = "filled"
+PARTIALLY_CLOSED = "partiallyClosed"
+CLOSED = "closed"
+SL_HIT = "slHit"
+TP_HIT = "tpHit"
+CANCELLED = "cancelled"
+
+# upper bound of every history query: "up to now", whatever the server's time zone
+HISTORY_END = 2**31 - 1
+
+
+# A deal or finished order seen in the terminal's history. `ticket` is the deal's
+# (the order's for CANCELLED), `remaining` the position's volume right after the deal.
+class TradeEvent(NamedTuple):
+    kind: str
+    ticket: int
+    order: int
+    position: int
+    symbol: str
+    comment: str
+    volume: float
+    price: float
+    profit: float
+    remaining: float
+    time: float
+
+
+# What a deal means for its position: entries are fills, exits are SL/TP hits by
+# their reason, else partial or full closes depending on the volume left after them
+def dealEvent(deal, remaining: float):
+    if deal.type not in [mt5.DEAL_TYPE_BUY, mt5.DEAL_TYPE_SELL]:
+        return None
+    if deal.entry == mt5.DEAL_ENTRY_IN:
+        kind = FILLED
+    elif deal.entry not in [mt5.DEAL_ENTRY_OUT, mt5.DEAL_ENTRY_OUT_BY]:
+        return None
+    elif deal.reason == mt5.DEAL_REASON_SL:
+        kind = SL_HIT
+    elif deal.reason == mt5.DEAL_REASON_TP:
+        kind = TP_HIT
+    else:
+        kind = PARTIALLY_CLOSED if remaining > 1e-9 else CLOSED
+    return TradeEvent(
+        kind,
+        deal.ticket,
+        deal.order,
+        deal.position_id,
+        deal.symbol,
+        deal.comment,
+        deal.volume,
+        deal.price,
+        deal.profit,
+        remaining,
+        deal.time_msc / 1000,
+    )
+
+
+# Pending orders that left the book without a fill
+def orderEvent(order):
+    if order.state not in [mt5.ORDER_STATE_CANCELED, mt5.ORDER_STATE_EXPIRED]:
+        return None
+    return TradeEvent(
+        CANCELLED,
+        order.ticket,
+        order.ticket,
+        order.position_id,
+        order.symbol,
+        order.comment,
+        order.volume_current,
+        order.price_open,
+        0.0,
+        0.0,
+        order.time_done_msc / 1000,
+    )
+
+
+# Keeps the order book (and through its listeners the exposure totals) and the
+# account snapshot in line with what happened at the broker, our requests or not
+def syncState(event: TradeEvent):
+    for ticket in {event.position, event.order}:
+        if ticket:
+            orderBook.refreshTicket(ticket)
+    if event.kind != CANCELLED:
+        accountCache.invalidate()
+
+
+# High-water mark over one history stream: the server time (seconds) of the newest
+# record seen, plus the tickets seen at or after it, since a query from that second
+# returns them again
+class HistoryMark:
+    __slots__ = ("since", "seen")
+
+    def __init__(self, since: int):
+        self.since = since
+        # ticket -> time
+        self.seen = {}
+
+    def isNew(self, ticket: int) -> bool:
+        return ticket not in self.seen
+
+    def advance(self, records: list):
+        for ticket, timestamp in records:
+            self.seen[ticket] = timestamp
+            self.since = max(self.since, timestamp)
+        self.seen = {
+            ticket: timestamp
+            for ticket, timestamp in self.seen.items()
+            if timestamp >= self.since
+        }
+
+
+# Polls the terminal's deal and order history from a high-water mark and publishes
+# what's new as `TradeEvent`s, so SL/TP hits, limit fills and closes made outside of
+# our requests are seen within `pollInterval` instead of at the next alert. Each poll
+# asks only for records from the mark on, so its cost follows the number of new
+# deals/orders, not the size of the book or of the history.
+class TradeEventPoller:
+    def __init__(self, pollInterval: float = 0.25):
+        self.pollInterval = pollInterval
+        self.polls = 0
+        self.counts = {}
+        self._subscribers = []
+        self._deals = None
+        self._orders = None
+        self._lock = threading.Lock()
+        self._stopEvent = threading.Event()
+        self._thread = None
+
+    # `fn(event)` is called from the poller's thread for every event, in order
+    def subscribe(self, fn: Callable[[TradeEvent], None]):
+        self._subscribers.append(fn)
+
+    # Starts the marks at the history's current end: what happened before is already
+    # in the book. The end is the newest record's own (server) time, so the local
+    # clock and the server's offset from it never matter; the whole history is read
+    # once for it.
+    def prime(self):
+        deals = mt5.history_deals_get(0, HISTORY_END) or ()
+        orders = mt5.history_orders_get(0, HISTORY_END) or ()
+        with self._lock:
+            self._deals = HistoryMark(0)
+            self._deals.advance([(deal.ticket, deal.time) for deal in deals])
+            self._orders = HistoryMark(0)
+            self._orders.advance([(order.ticket, order.time_done) for order in orders])
+
+    # Reads the history since the marks and publishes the new events; returns them
+    def poll(self) -> list:
+        if self._deals is None:
+            self.prime()
+        with self._lock:
+            deals = mt5.history_deals_get(self._deals.since, HISTORY_END) or ()
+            orders = mt5.history_orders_get(self._orders.since, HISTORY_END) or ()
+            newDeals = [deal for deal in deals if self._deals.isNew(deal.ticket)]
+            newOrders = [order for order in orders if self._orders.isNew(order.ticket)]
+            self._deals.advance([(deal.ticket, deal.time) for deal in newDeals])
+            self._orders.advance(
+                [(order.ticket, order.time_done) for order in newOrders]
+            )
+            self.polls += 1
+            remaining = self._remainingAfter(newDeals)
+            events = [
+                dealEvent(deal, remaining.get(deal.ticket, 0.0)) for deal in newDeals
+            ] + [orderEvent(order) for order in newOrders]
+            events = sorted(
+                (event for event in events if event is not None),
+                key=lambda event: (event.time, event.ticket),
+            )
+            for event in events:
+                self._publish(event)
+        return events
+
+    def stats(self) -> dict:
+        return {"polls": self.polls, **self.counts}
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.prime()
+        self._stopEvent.clear()
+        self._thread = threading.Thread(target=self._pollLoop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopEvent.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.pollInterval * 10)
+
+    # Deal ticket -> volume of its position left open right after it: walks the new
+    # deals back from each position's current volume (one ticket lookup per position
+    # the new deals touched, so the cost follows the new deals, not the book)
+    @staticmethod
+    def _remainingAfter(deals: list) -> dict:
+        volumes = {}
+        remaining = {}
+        for deal in sorted(deals, key=lambda deal: (deal.time_msc, deal.ticket))[::-1]:
+            if not deal.position_id:
+                continue
+            if deal.position_id not in volumes:
+                positions = mt5.positions_get(ticket=deal.position_id)
+                volumes[deal.position_id] = positions[0].volume if positions else 0.0
+            remaining[deal.ticket] = volumes[deal.position_id]
+            change = -deal.volume if deal.entry == mt5.DEAL_ENTRY_IN else deal.volume
+            volumes[deal.position_id] = round(volumes[deal.position_id] + change, 8)
+        return remaining
+
+    def _publish(self, event: TradeEvent):
+        self.counts[event.kind] = self.counts.get(event.kind, 0) + 1
+        metrics.count("tradeEvents", kind=event.kind)
+        if event.kind in [SL_HIT, TP_HIT]:
+            log.info(
+                "{} hit on {} '{}' at {}, profit {}",
+                "SL" if event.kind == SL_HIT else "TP",
+                event.symbol,
+                event.comment,
+                event.price,
+                event.profit,
+            )
+        else:
+            log.debug("Trade event: {}", event)
+        for fn in self._subscribers:
+            try:
+                fn(event)
+            except Exception as e:
+                log.warning("Trade event subscriber failed on {}: {}", event, e)
+
+    def _pollLoop(self):
+        while not self._stopEvent.wait(self.pollInterval):
+            try:
+                self.poll()
+            except Exception as e:
+                log.warning("Trade event poll failed: {}", e)
+
+
+tradeEvents = TradeEventPoller()
+tradeEvents.subscribe(syncState)
@@ -0,0 +1,78 @@
+import os
+import time
+from typing import Iterable
+from utils.logger import log
+from utils.session import session
+from utils.symbolCache import symbolSpecs
+from utils.tickCache import tickCache
+from utils.accountCache import accountCache
+from utils.orderBook import orderBook
+from utils.exposure import exposure
+from utils.operations import initializeMT5, orderTemplate
+
+
+# WARMUP_SYMBOLS, else TICK_SYMBOLS: comma-separated symbols to have warm at startup
+def configuredSymbols() -> list:
+    names = os.getenv("WARMUP_SYMBOLS") or os.getenv("TICK_SYMBOLS", "")
+    return [symbol.strip() for symbol in names.split(",") if symbol.strip()]
+
+
+# Pays every one-time cost of the first alert before alerts are accepted: connecting
+# and logging in, loading the book and the account, selecting the symbols (and those
+# of open trades) into Market Watch, loading their specs and ticks and building their
+# request templates. Waits up to `timeout` seconds for the terminal to connect.
+# Returns the seconds spent per step.
+def warmUp(symbols: Iterable[str] = (), timeout: float = 30.0) -> dict:
+    timings = {}
+    start = time.perf_counter()
+
+    initializeMT5()
+    deadline = time.monotonic() + timeout
+    while not session.connected and time.monotonic() < deadline:
+        time.sleep(0.1)
+    timings["connect"] = time.perf_counter() - start
+    if not session.connected:
+        log.warning(
+            "⚠️ MT5 didn't connect within {}s, skipping warm-up. The first alerts "
+            "will be slower.",
+            timeout,
+        )
+        return timings
+
+    stepStart = time.perf_counter()
+    orderBook.sync()
+    accountCache.get(forceRefresh=True)
+    timings["account"] = time.perf_counter() - stepStart
+
+    stepStart = time.perf_counter()
+    symbols = list(dict.fromkeys(symbols))
+    traded = {trade.symbol for trade in orderBook.positions() + orderBook.orders()}
+    symbols += sorted(traded - set(symbols))
+    for symbol in symbols:
+        # loading the spec selects the symbol into Market Watch if it isn't there
+        spec = symbolSpecs.get(symbol)
+        if spec is None:
+            log.warning("Warm-up: symbol {} not found.", symbol)
+            continue
+        tickCache.watch([symbol])
+        if tickCache.get(symbol, fresh=True) is None:
+            log.warning("Warm-up: no price for {} yet.", symbol)
+        for isLimit in [False, True]:
+            for isLong in [True, False]:
+                orderTemplate(spec, isLimit, isLong)
+    # open trades' risk needs their specs, loaded just now
+    exposure.resolve()
+    timings["symbols"] = time.perf_counter() - stepStart
+
+    timings["total"] = time.perf_counter() - start
+    log.info(
+        "Warm-up done in {:.0f}ms ({} symbols): {}",
+        timings["total"] * 1000,
+        len(symbols),
+        ", ".join(
+            f"{step} {seconds * 1000:.0f}ms"
+            for step, seconds in timings.items()
+            if step != "total"
+        ),
+    )
+    return timings
@@ -0,0 +1,171 @@
+import time
+import random
+import threading
+import websocket
+from typing import Callable, Optional
+from utils import metrics
+from utils.logger import log
+
+
+# Keeps the websocket to the alert server up for the life of the process. A ping
+# thread sends timestamped pings to measure RTT and drops connections whose pong
+# doesn't come back within `pingTimeout`; after any disconnect `run()` reconnects
+# with jittered exponential backoff. Alerts already queued on the dispatcher keep
+# being processed while the socket is down since the dispatcher outlives connections.
+# Alerts the server sends while the socket is down are only recovered if it supports
+# resuming: on every open, `resumeMessage()` (if given and not None) is sent so the
+# server can replay what came after the last alert we received.
+class WebSocketSupervisor:
+    def __init__(
+        self,
+        url: str,
+        onMessage: Callable,
+        pingInterval: float = 20.0,
+        pingTimeout: float = 10.0,
+        minBackoff: float = 1.0,
+        maxBackoff: float = 60.0,
+        resumeMessage: Optional[Callable[[], Optional[str]]] = None,
+    ):
+        self.url = url
+        self.onMessage = onMessage
+        self.pingInterval = pingInterval
+        self.pingTimeout = pingTimeout
+        self.minBackoff = minBackoff
+        self.maxBackoff = maxBackoff
+        self.resumeMessage = resumeMessage
+        self.connected = False
+        self.reconnects = 0
+        self.lastRtt = None
+        self._downtime = 0.0
+        self._downSince = time.monotonic()
+        self._everConnected = False
+        self._opened = False
+        self._app = None
+        self._pingSentAt = None
+        self._stopEvent = threading.Event()
+        self._pingThread = None
+
+    # Blocks until `stop()` (or Ctrl+C), reconnecting whenever the connection drops
+    def run(self):
+        self._stopEvent.clear()
+        if self._pingThread is None or not self._pingThread.is_alive():
+            self._pingThread = threading.Thread(target=self._pingLoop, daemon=True)
+            self._pingThread.start()
+        if not self._everConnected:
+            self._downSince = time.monotonic()
+        backoff = self.minBackoff
+        while not self._stopEvent.is_set():
+            self._app = websocket.WebSocketApp(
+                self.url,
+                on_open=self._onOpen,
+                on_message=self.onMessage,
+                on_error=self._onError,
+                on_close=self._onClose,
+                on_pong=self._onPong,
+            )
+            self._opened = False
+            # pings are ours; the 1s timeout only bounds how long the read loop
+            # takes to notice close()
+            self._app.run_forever(ping_timeout=1)
+            self._markDown()
+            if self._stopEvent.is_set():
+                break
+            # start over from a short delay after a connection that actually opened
+            if self._opened:
+                backoff = self.minBackoff
+            delay = backoff / 2 + random.uniform(0, backoff / 2)
+            log.warning("WebSocket disconnected. Reconnecting in {:.1f}s.", delay)
+            if self._stopEvent.wait(delay):
+                break
+            backoff = min(backoff * 2, self.maxBackoff)
+
+    def stop(self):
+        self._stopEvent.set()
+        if self._app is not None:
+            self._app.close()
+
+    # Total seconds spent disconnected, including the current outage
+    def downtime(self) -> float:
+        if self.connected:
+            return self._downtime
+        return self._downtime + time.monotonic() - self._downSince
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "reconnects": self.reconnects,
+            "downtime": self.downtime(),
+            "lastRtt": self.lastRtt,
+        }
+
+    def _onOpen(self, app):
+        outage = time.monotonic() - self._downSince
+        self._downtime += outage
+        self._pingSentAt = None
+        self.connected = True
+        self._opened = True
+        if self._everConnected:
+            self.reconnects += 1
+            metrics.record("wsDowntime", outage)
+            log.info("WebSocket reconnected after {:.1f}s.", outage)
+        else:
+            log.info("WebSocket connection established.")
+        self._everConnected = True
+        message = self.resumeMessage() if self.resumeMessage is not None else None
+        if message is not None:
+            try:
+                app.send(message)
+                log.info("Asked the server to resume: {}", message)
+            except Exception as e:
+                log.warning("WebSocket resume request failed: {}", e)
+
+    def _onError(self, app, error):
+        log.error("WebSocket error: {}", error)
+
+    def _onClose(self, app, statusCode, closeMessage):
+        log.info(
+            "WebSocket connection closed with code {}. Reason: {}",
+            statusCode,
+            closeMessage,
+        )
+        self._markDown()
+
+    def _markDown(self):
+        if self.connected:
+            self.connected = False
+            self._downSince = time.monotonic()
+
+    # Pongs echo the ping payload, the perf_counter time the ping was sent
+    def _onPong(self, app, data):
+        try:
+            sentAt = float(data)
+        except (TypeError, ValueError):
+            return
+        self._pingSentAt = None
+        self.lastRtt = time.perf_counter() - sentAt
+        metrics.record("wsPing", self.lastRtt)
+
+    # Checks once a second so pong timeouts are caught promptly
+    def _pingLoop(self):
+        lastPingAt = 0.0
+        while not self._stopEvent.wait(1.0):
+            app = self._app
+            if not self.connected or app is None:
+                continue
+            now = time.perf_counter()
+            if self._pingSentAt is not None:
+                if now - self._pingSentAt > self.pingTimeout:
+                    log.warning(
+                        "No pong in {:.0f}s, dropping the connection.",
+                        self.pingTimeout,
+                    )
+                    self._pingSentAt = None
+                    app.close()
+                continue
+            if now - lastPingAt < self.pingInterval:
+                continue
+            try:
+                app.sock.ping(repr(now))
+                self._pingSentAt = lastPingAt = now
+            except Exception as e:
+                log.warning("WebSocket ping failed: {}", e)
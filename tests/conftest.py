@@ -0,0 +1,62 @@
+import os
+import sys
+
+# The suite always runs against the in-memory simulator, no terminal needed
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+os.environ["BROKER_BACKEND"] = "sim"
+os.environ["LICENSE_ID"] = "test-license"
+for name in [name for name in os.environ if name.startswith("EXPOSURE_")]:
+    del os.environ[name]
+
+import pytest
+from utils.broker import mt5
+from utils.simulator import MT5Simulator
+from utils.symbolCache import symbolSpecs
+from utils.tickCache import tickCache
+from utils.accountCache import accountCache
+from utils.orderBook import orderBook
+from utils.idempotency import alertDedup
+from utils.exposure import exposure
+from utils.scheduler import scheduler
+from utils.operations import initializeMT5
+from utils.handler import handleAlert
+
+
+# A fresh simulator (and empty caches) for every test
+@pytest.fixture(autouse=True)
+def sim():
+    simulator = MT5Simulator.withDefaultSymbols()
+    mt5.use(simulator)
+    symbolSpecs.invalidate()
+    tickCache.invalidate()
+    accountCache.invalidate()
+    alertDedup._entries.clear()
+    exposure.configure()
+    scheduler.configure()
+    orderBook.sync()
+    initializeMT5()
+    return simulator
+
+
+# Runs an alert through the handler like the websocket would deliver it
+@pytest.fixture
+def alert():
+    def send(command: str, symbol: str = "EURUSD", **fields):
+        return handleAlert(
+            {
+                "licenseId": "test-license",
+                "command": command,
+                "symbol": symbol,
+                **fields,
+            }
+        )
+
+    return send
+
+
+def positionsWith(comment: str) -> list:
+    return [p for p in mt5.positions_get() or () if p.comment == comment]
+
+
+def ordersWith(comment: str) -> list:
+    return [o for o in mt5.orders_get() or () if o.comment == comment]
@@ -0,0 +1,74 @@
+import numpy as np
+from utils.alerts import decodeAlert
+from utils.backtest import Bars, Backtest
+from utils.symbolCache import symbolSpecs
+
+START = 1_700_000_000
+
+
+def flatBars(symbol: str, price: float, spread: float, count: int) -> Bars:
+    times = START + 60 * np.arange(count)
+    prices = np.full(count, price)
+    return Bars(symbol, times, prices, prices, prices, prices, spread)
+
+
+def replay(alerts: list, **barCounts) -> Backtest:
+    bars = {
+        "EURUSD": flatBars("EURUSD", 1.1, 0.00002, barCounts.get("EURUSD", 10)),
+        "XAUUSD": flatBars("XAUUSD", 2624.0, 0.2, barCounts.get("XAUUSD", 10)),
+    }
+    backtest = Backtest(bars, {symbol: symbolSpecs.get(symbol) for symbol in bars})
+    backtest.run(
+        [
+            (START + 60 * minute, decodeAlert({"licenseId": "-", **fields}))
+            for minute, fields in alerts
+        ]
+    )
+    return backtest
+
+
+def buy(symbol: str, sl: float, comment: str) -> dict:
+    return {
+        "command": "BUY",
+        "symbol": symbol,
+        "risk": 0.5,
+        "sl": sl,
+        "comment": comment,
+    }
+
+
+def test_plain_comments_only_touch_the_first_match():
+    backtest = replay(
+        [
+            (0, buy("EURUSD", 1.09, "dup")),
+            (1, buy("EURUSD", 1.09, "dup")),
+            (2, {"command": "CLOSELONG", "symbol": "EURUSD", "comment": "dup"}),
+        ]
+    )
+    assert [trade.reason for trade in backtest.closed] == ["close", "end"]
+    assert backtest.closed[0].ticket == 1
+
+
+def test_selectors_reach_symbols_whose_bars_ended():
+    backtest = replay(
+        [
+            (0, buy("EURUSD", 1.09, "g-E")),
+            (0, buy("XAUUSD", 2614.0, "g-X")),
+            (
+                6,
+                {
+                    "command": "NEWSLTPLONG",
+                    "symbol": "EURUSD",
+                    "comment": "glob:g-*",
+                    "tp": 3000,
+                },
+            ),
+            (7, {"command": "CLOSELONG", "symbol": "EURUSD", "comment": "glob:g-*"}),
+        ],
+        XAUUSD=5,
+    )
+    assert sorted((t.symbol, t.reason) for t in backtest.closed) == [
+        ("EURUSD", "close"),
+        ("XAUUSD", "close"),
+    ]
+    assert backtest.rejected == []
@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+from utils.broker import mt5
+from utils.bulk import runBulk
+from conftest import positionsWith
+
+
+def trade(ticket: int):
+    return SimpleNamespace(ticket=ticket, symbol="EURUSD", comment=f"t{ticket}")
+
+
+# A `send` answering each ticket's requests with the given retcodes in turn
+def scripted(retcodes: dict):
+    calls = []
+
+    def send(request):
+        calls.append(request["ticket"])
+        return SimpleNamespace(retcode=retcodes[request["ticket"]].pop(0))
+
+    return send, calls
+
+
+def test_partial_fills_are_not_retried():
+    send, calls = scripted({1: [mt5.TRADE_RETCODE_DONE_PARTIAL]})
+    report = runBulk([(trade(1), {"ticket": 1})], send, retries=2)
+    assert calls == [1]
+    assert report.results[0].ok
+
+
+def test_only_transient_failures_are_retried():
+    send, calls = scripted(
+        {
+            1: [mt5.TRADE_RETCODE_REQUOTE, mt5.TRADE_RETCODE_DONE],
+            2: [mt5.TRADE_RETCODE_INVALID_STOPS],
+            3: [mt5.TRADE_RETCODE_POSITION_CLOSED],
+        }
+    )
+    items = [(trade(ticket), {"ticket": ticket}) for ticket in [1, 2, 3]]
+    report = runBulk(items, send, retries=2)
+    assert sorted(calls) == [1, 1, 2, 3]
+    assert [r.ok for r in report.results] == [True, False, False]
+    assert report.results[0].attempts == 2
+
+
+def test_retries_use_the_rebuilt_request():
+    send, calls = scripted({1: [mt5.TRADE_RETCODE_PRICE_OFF, mt5.TRADE_RETCODE_DONE]})
+    rebuilt = []
+
+    def rebuild(item):
+        rebuilt.append(item.ticket)
+        return {"ticket": item.ticket}
+
+    report = runBulk([(trade(1), {"ticket": 1})], send, rebuild=rebuild)
+    assert rebuilt == [1] and report.results[0].ok
+
+
+def test_closeall_retries_a_requote(sim, alert):
+    alert("BUY", risk=0.5, sl=1.09, tp=1.12, comment="a")
+    alert("BUY", risk=0.5, sl=1.09, tp=1.12, comment="b")
+    sim.injectRetcode(mt5.TRADE_RETCODE_REQUOTE)
+    alert("CLOSEALL")
+    assert not positionsWith("a") and not positionsWith("b")
@@ -0,0 +1,73 @@
+import time
+import threading
+from utils.dispatcher import AlertDispatcher
+
+
+def test_alerts_for_one_symbol_keep_their_order():
+    handled = []
+
+    def handler(alert):
+        # later alerts would overtake earlier ones if they ran concurrently
+        time.sleep(0.001 * (alert["n"] % 3))
+        handled.append((alert["symbol"], alert["n"]))
+
+    dispatcher = AlertDispatcher(handler, workers=4)
+    dispatcher.start()
+    for n in range(60):
+        dispatcher.submit({"symbol": ["EURUSD", "XAUUSD", "GBPJPY"][n % 3], "n": n})
+    dispatcher.stop()
+    for symbol in ["EURUSD", "XAUUSD", "GBPJPY"]:
+        sequence = [n for handledSymbol, n in handled if handledSymbol == symbol]
+        assert sequence == sorted(sequence) and len(sequence) == 20
+
+
+def test_different_symbols_run_concurrently():
+    started = threading.Barrier(2, timeout=2)
+
+    def handler(alert):
+        # both symbols have to be in the handler at the same time to get past this
+        started.wait()
+
+    dispatcher = AlertDispatcher(handler, workers=2)
+    # hash() of a str is randomized per process: find keys landing on both workers
+    symbols = ["EURUSD"]
+    for candidate in ["XAUUSD", "GBPJPY", "BTCUSD", "NDX100", "USDJPY"]:
+        if hash(candidate) % 2 != hash("EURUSD") % 2:
+            symbols.append(candidate)
+            break
+    dispatcher.start()
+    for symbol in symbols:
+        dispatcher.submit({"symbol": symbol})
+    dispatcher.stop()
+    assert not started.broken
+
+
+def test_drop_policy_counts_dropped_alerts():
+    release = threading.Event()
+    dispatcher = AlertDispatcher(
+        lambda alert: release.wait(), workers=1, queueSize=1, backpressure="drop"
+    )
+    dispatcher.start()
+    results = [dispatcher.submit({"symbol": "EURUSD"}) for _ in range(4)]
+    release.set()
+    dispatcher.stop()
+    assert results[0] and not all(results)
+    assert dispatcher.dropped == results.count(False)
+
+
+def test_selectors_wait_for_earlier_alerts_and_hold_later_ones():
+    handled = []
+
+    def handler(alert):
+        time.sleep(0.01 if alert["n"] == 0 else 0)
+        handled.append(alert["n"])
+
+    dispatcher = AlertDispatcher(handler, workers=4)
+    dispatcher.start()
+    dispatcher.submit({"symbol": "EURUSD", "n": 0})
+    dispatcher.submit({"symbol": "XAUUSD", "comment": "glob:p2-*", "n": 1})
+    for n, symbol in enumerate(["GBPJPY", "BTCUSD", "NDX100"], start=2):
+        dispatcher.submit({"symbol": symbol, "n": n})
+    dispatcher.stop()
+    assert handled[:2] == [0, 1] and sorted(handled[2:]) == [2, 3, 4]
+    assert dispatcher.processed == 5
@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+from utils.broker import mt5
+from utils.exposure import exposure
+from utils.operations import createOrder
+from conftest import positionsWith
+
+
+def test_open_risk_follows_the_book(alert):
+    alert("BUY", risk=0.5, sl=1.09, tp=1.12, comment="p1-A")
+    [position] = positionsWith("p1-A")
+    # (1.10002 - 1.09) / 0.00001 ticks x 1.0 x volume
+    expected = round(1002 * position.volume, 2)
+    assert exposure.stats()["total"] == expected
+    assert exposure.stats()["byStrategy"] == {"p1": expected}
+    alert("CLOSELONG", comment="p1-A")
+    assert exposure.stats()["total"] == 0
+
+
+def test_entries_over_the_cap_are_rejected(monkeypatch, alert):
+    monkeypatch.setenv("EXPOSURE_MAX_TOTAL", "1")
+    exposure.configure()
+    alert("BUY", risk=0.6, sl=1.09, tp=1.12, comment="p1-A")
+    alert("BUY", risk=0.6, sl=1.09, tp=1.12, comment="p1-B")
+    assert positionsWith("p1-A") and not positionsWith("p1-B")
+
+
+def test_concurrent_entries_cannot_overshoot_the_cap(monkeypatch):
+    monkeypatch.setenv("EXPOSURE_MAX_SYMBOL", "2")
+    exposure.configure()
+    with ThreadPoolExecutor(10) as pool:
+        results = list(
+            pool.map(
+                lambda n: createOrder(
+                    "EURUSD", qty=1, isLong=True, sl=1.09, comment=f"c{n}"
+                ),
+                range(10),
+            )
+        )
+    # each one risks 1002 of the 2000 allowed
+    assert sum(result is not None for result in results) == 1
+
+
+def test_entries_without_sl_are_rejected_while_capped(monkeypatch, alert):
+    monkeypatch.setenv("EXPOSURE_MAX_TOTAL", "5")
+    exposure.configure()
+    createOrder("EURUSD", qty=0.1, isLong=True, comment="naked")
+    assert not positionsWith("naked")
+
+
+def test_entries_without_sl_are_charged_when_configured(monkeypatch):
+    monkeypatch.setenv("EXPOSURE_MAX_TOTAL", "2")
+    monkeypatch.setenv("EXPOSURE_NO_SL_RISK", "0.5")
+    exposure.configure()
+    for n in range(6):
+        createOrder("EURUSD", qty=0.1, isLong=True, comment=f"naked{n}")
+    # 0.5% of equity each, 2% allowed
+    assert len(mt5.positions_get()) == 4
+    assert exposure.stats()["unprotected"] == 4
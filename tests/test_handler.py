@@ -0,0 +1,152 @@
+from utils.broker import mt5
+from conftest import positionsWith, ordersWith
+
+
+def test_buy_opens_a_sized_position(alert):
+    alert("BUY", risk=1, sl=1.09, tp=1.12, comment="p1-A")
+    [position] = positionsWith("p1-A")
+    assert position.type == mt5.POSITION_TYPE_BUY
+    assert position.sl == 1.09 and position.tp == 1.12
+    # 1% of 100000 over 1002 ticks of 1.0 each, to the nearest volume step
+    assert position.volume == 1.0
+
+
+def test_sell_opens_a_short_position(alert):
+    alert("SELL", "XAUUSD", risk=0.5, sl=2634.0, tp=2604.0, comment="p1-X")
+    [position] = positionsWith("p1-X")
+    assert position.type == mt5.POSITION_TYPE_SELL
+    assert position.volume > 0
+
+
+def test_buylimit_places_a_pending_order(alert):
+    alert("BUYLIMIT", price=1.095, risk=1, sl=1.085, tp=1.11, comment="p1-L")
+    [order] = ordersWith("p1-L")
+    assert order.type == mt5.ORDER_TYPE_BUY_LIMIT
+    assert order.price_open == 1.095
+    assert not positionsWith("p1-L")
+
+
+def test_limit_order_fills_when_the_price_reaches_it(sim, alert):
+    alert("BUYLIMIT", price=1.095, risk=1, sl=1.085, tp=1.11, comment="p1-L")
+    sim.setTick("EURUSD", 1.0949, 1.0950)
+    assert not ordersWith("p1-L")
+    [position] = positionsWith("p1-L")
+    assert position.price_open == 1.095
+
+
+def test_newsltp_moves_sl_and_keeps_tp(alert):
+    alert("BUY", risk=1, sl=1.09, tp=1.12, comment="p1-A")
+    alert("NEWSLTPLONG", sl=1.095, comment="p1-A")
+    [position] = positionsWith("p1-A")
+    assert position.sl == 1.095 and position.tp == 1.12
+
+
+def test_newsltp_on_a_pending_order(alert):
+    alert("SELLLIMIT", price=1.105, risk=1, sl=1.115, tp=1.09, comment="p1-S")
+    alert("NEWSLTPSHORT", tp=1.085, comment="p1-S")
+    [order] = ordersWith("p1-S")
+    assert order.sl == 1.115 and order.tp == 1.085
+
+
+def test_newsltp_keeps_an_sl_changed_outside_the_ea(alert):
+    alert("BUY", risk=1, sl=1.09, tp=1.12, comment="p1-A")
+    [position] = positionsWith("p1-A")
+    mt5.order_send(
+        {
+            "action": mt5.TRADE_ACTION_SLTP,
+            "position": position.ticket,
+            "symbol": "EURUSD",
+            "sl": 1.098,
+            "tp": 1.12,
+        }
+    )
+    alert("NEWSLTPLONG", tp=1.13, comment="p1-A")
+    [position] = positionsWith("p1-A")
+    assert position.sl == 1.098 and position.tp == 1.13
+
+
+def test_partial_close(alert):
+    alert("BUY", risk=1, sl=1.09, tp=1.12, comment="p1-A")
+    alert("CLOSELONG", perc=50, comment="p1-A")
+    [position] = positionsWith("p1-A")
+    assert position.volume == 0.5
+
+
+def test_full_close(alert):
+    alert("SELL", risk=1, sl=1.11, tp=1.09, comment="p1-B")
+    alert("CLOSESHORT", comment="p1-B")
+    assert not positionsWith("p1-B")
+
+
+def test_cancel_pending_order(alert):
+    alert("BUYLIMIT", price=1.095, risk=1, sl=1.085, tp=1.11, comment="p1-L")
+    alert("CANCELLONG", comment="p1-L")
+    assert not ordersWith("p1-L")
+
+
+def test_glob_close_only_touches_matching_positions(alert):
+    for comment in ["p2-A", "p2-B", "p3-A"]:
+        alert("BUY", risk=0.5, sl=1.09, tp=1.12, comment=comment)
+    alert("CLOSELONG", comment="glob:p2-*")
+    assert not positionsWith("p2-A") and not positionsWith("p2-B")
+    assert positionsWith("p3-A")
+
+
+def test_glob_cancel_only_touches_matching_orders(alert):
+    for comment in ["p2-A", "p2-B", "p3-A"]:
+        alert("BUYLIMIT", price=1.095, risk=0.5, sl=1.085, tp=1.11, comment=comment)
+    alert("CANCELLONG", comment="glob:p2-*")
+    assert not ordersWith("p2-A") and not ordersWith("p2-B")
+    assert ordersWith("p3-A")
+
+
+def test_comments_without_the_prefix_are_matched_literally(alert):
+    for comment in ["p2-*", "p2-A"]:
+        alert("BUY", risk=0.5, sl=1.09, tp=1.12, comment=comment)
+    alert("CLOSELONG", comment="p2-*")
+    assert not positionsWith("p2-*") and positionsWith("p2-A")
+
+
+def test_closeall_and_cancelall_per_symbol(alert):
+    alert("BUY", risk=0.5, sl=1.09, tp=1.12, comment="e1")
+    alert("BUY", "XAUUSD", risk=0.5, sl=2614.0, tp=2640.0, comment="x1")
+    alert("BUYLIMIT", price=1.095, risk=0.5, sl=1.085, tp=1.11, comment="e2")
+    alert("CLOSEALL")
+    alert("CANCELALL")
+    assert not positionsWith("e1") and not ordersWith("e2")
+    assert positionsWith("x1")
+
+
+def test_wrong_license_is_not_executed():
+    from utils.handler import handleAlert
+
+    handleAlert(
+        {
+            "licenseId": "someone-else",
+            "command": "BUY",
+            "symbol": "EURUSD",
+            "risk": 1,
+            "sl": 1.09,
+            "comment": "p1-A",
+        }
+    )
+    assert not positionsWith("p1-A")
+
+
+def test_repeated_alert_is_dropped(alert):
+    assert alert("BUY", risk=0.5, sl=1.09, tp=1.12, comment="d1", id="alert-1")
+    assert not alert("BUY", risk=0.5, sl=1.09, tp=1.12, comment="d1", id="alert-1")
+    assert len(positionsWith("d1")) == 1
+
+
+def test_failed_alert_can_be_sent_again(sim, alert):
+    sim.injectRetcode(mt5.TRADE_RETCODE_REJECT)
+    assert not alert("BUY", risk=0.5, sl=1.09, tp=1.12, comment="d2", id="alert-2")
+    assert alert("BUY", risk=0.5, sl=1.09, tp=1.12, comment="d2", id="alert-2")
+    assert len(positionsWith("d2")) == 1
+
+
+def test_rejected_alert_can_be_sent_again(alert):
+    # SL on the wrong side of the price: rejected before sending
+    assert not alert("BUY", risk=0.5, sl=1.2, comment="d3", id="alert-3")
+    assert alert("BUY", risk=0.5, sl=1.09, comment="d3", id="alert-3")
@@ -0,0 +1,73 @@
+from utils.alerts import decodeAlert
+from utils.orderBook import orderBook
+from utils.journal import (
+    Journal,
+    journal,
+    readRecords,
+    reconcile,
+    journalFiles,
+    ALERT,
+    HANDLED,
+)
+
+
+def buy(comment: str):
+    return decodeAlert(
+        {
+            "licenseId": "test-license",
+            "command": "BUY",
+            "symbol": "EURUSD",
+            "risk": 0.5,
+            "sl": 1.09,
+            "comment": comment,
+        }
+    )
+
+
+def test_outcomes_are_journaled_with_their_retcodes(tmp_path, alert):
+    path = str(tmp_path / "journal.bin")
+    journal.open(path)
+    try:
+        alert("BUY", risk=0.5, sl=1.09, tp=1.12, comment="a")
+        alert("CLOSELONG", comment="missing")
+    finally:
+        journal.close()
+    handled = [r.data for r in readRecords(path) if r.kind == HANDLED]
+    assert handled == [
+        {"retcodes": [10009], "executed": True},
+        {"retcodes": [], "executed": False},
+    ]
+
+
+def test_equal_alerts_keep_their_own_seqs(tmp_path):
+    events = Journal(syncInterval=0)
+    events.open(str(tmp_path / "journal.bin"))
+    first, second = buy("a"), buy("a")
+    seqs = [events.received(first), events.received(second)]
+    assert [events.begin(buy("a")), events.begin(second)] == seqs
+    events.end(seqs[0])
+    events.end(seqs[1])
+    events.close()
+
+
+def test_rotated_files_keep_seqs_and_are_reconciled(tmp_path):
+    path = str(tmp_path / "journal.bin")
+    events = Journal(syncInterval=0, maxBytes=200, backups=2)
+    events.open(path)
+    for comment in "abcdef":
+        events.received(buy(comment))
+        events.flush()
+    events.flush()
+    # crashed: no clean shutdown marker
+    events._queue.put(("close", None))
+    events._thread.join()
+    files = journalFiles(path)
+    assert len(files) == 3
+    seqs = [r.seq for file in files for r in readRecords(file) if r.kind == ALERT]
+    assert seqs == sorted(seqs) and len(set(seqs)) == len(seqs)
+    unhandled = [seq for seq, _, _ in reconcile(path, orderBook)]
+    assert unhandled == seqs
+    reopened = Journal()
+    reopened.open(path)
+    assert reopened.received(buy("g")) == seqs[-1] + 1
+    reopened.close()
@@ -0,0 +1,16 @@
+import json
+from utils.logger import Logger
+
+
+def test_arguments_are_logged_as_they_were_at_the_call(tmp_path):
+    path = tmp_path / "log.jsonl"
+    log = Logger()
+    log.console = False
+    log.setFile(str(path))
+    request = {"sl": 1.09}
+    log.info("request: {} after {:.1f}s", request, 0.25, request=request)
+    request["sl"] = 1.08
+    log.flush()
+    [entry] = [json.loads(line) for line in path.read_text().splitlines()]
+    assert entry["msg"] == "request: {'sl': 1.09} after 0.2s"
+    assert entry["request"] == {"sl": 1.09}
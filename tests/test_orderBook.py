@@ -0,0 +1,108 @@
+from utils.broker import mt5
+from utils.orderBook import OrderBook
+
+
+def openPosition(comment: str, volume: float = 0.1, sl: float = 1.09):
+    tick = mt5.symbol_info_tick("EURUSD")
+    return mt5.order_send(
+        {
+            "action": mt5.TRADE_ACTION_DEAL,
+            "symbol": "EURUSD",
+            "volume": volume,
+            "type": mt5.ORDER_TYPE_BUY,
+            "price": tick.ask,
+            "sl": sl,
+            "comment": comment,
+        }
+    )
+
+
+def closeRequest(ticket: int, volume: float) -> dict:
+    return {
+        "action": mt5.TRADE_ACTION_DEAL,
+        "symbol": "EURUSD",
+        "volume": volume,
+        "type": mt5.ORDER_TYPE_SELL,
+        "price": mt5.symbol_info_tick("EURUSD").bid,
+        "position": ticket,
+    }
+
+
+def test_index_by_comment_and_symbol():
+    book = OrderBook()
+    openPosition("a")
+    openPosition("b")
+    book.sync()
+    assert book.findPosition("a").comment == "a"
+    assert [p.comment for p in book.positions("EURUSD")] == ["a", "b"]
+    assert book.positions("XAUUSD") == []
+
+
+def test_refresh_resyncs_when_counts_change():
+    book = OrderBook(resyncInterval=0)
+    book.sync()
+    openPosition("a")
+    book.refresh()
+    assert book.getPosition(mt5.positions_get()[0].ticket) is not None
+
+
+def test_refresh_resyncs_after_the_interval(monkeypatch):
+    book = OrderBook(resyncInterval=30)
+    result = openPosition("a")
+    book.sync()
+    mt5.order_send(
+        {
+            "action": mt5.TRADE_ACTION_SLTP,
+            "position": result.order,
+            "symbol": "EURUSD",
+            "sl": 1.095,
+            "tp": 0.0,
+        }
+    )
+    # same counts: nothing to notice yet
+    book.refresh()
+    assert book.getPosition(result.order).sl == 1.09
+    monkeypatch.setattr(book, "_syncedAt", book._syncedAt - 31)
+    book.refresh()
+    assert book.getPosition(result.order).sl == 1.095
+
+
+def test_current_refetches_the_trade():
+    book = OrderBook()
+    result = openPosition("a", volume=0.3)
+    book.sync()
+    cached = book.getPosition(result.order)
+    mt5.order_send(closeRequest(result.order, 0.1))
+    assert book.current(cached, True).volume == 0.2
+    mt5.order_send(closeRequest(result.order, 0.2))
+    assert book.current(cached, True) is None
+
+
+def test_listeners_see_adds_removes_and_resets():
+    events = []
+
+    class Listener:
+        def onAdd(self, trade, isPosition):
+            events.append(("add", trade.comment))
+
+        def onRemove(self, trade, isPosition):
+            events.append(("remove", trade.comment))
+
+        def onReset(self):
+            events.append(("reset",))
+
+    book = OrderBook()
+    book.subscribe(Listener())
+    result = openPosition("a")
+    book.sync()
+    mt5.order_send(closeRequest(result.order, 0.1))
+    book.refreshTicket(result.order)
+    assert events == [("reset",), ("add", "a"), ("remove", "a")]
+
+
+def test_match_positions_with_a_glob():
+    book = OrderBook()
+    for comment in ["p1-A", "p1-B", "p2-A"]:
+        openPosition(comment)
+    book.sync()
+    assert sorted(p.comment for p in book.matchPositions("p1-*")) == ["p1-A", "p1-B"]
@@ -0,0 +1,17 @@
+from types import SimpleNamespace
+from utils.broker import mt5
+from utils.operations import sltpRejection
+
+
+def pending(orderType: int, price: float):
+    return SimpleNamespace(symbol="EURUSD", type=orderType, price_open=price)
+
+
+def test_stop_orders_are_checked_on_their_own_side():
+    buyStop = pending(mt5.ORDER_TYPE_BUY_STOP, 1.105)
+    sellStop = pending(mt5.ORDER_TYPE_SELL_STOP, 1.095)
+    buyStopLimit = pending(mt5.ORDER_TYPE_BUY_STOP_LIMIT, 1.105)
+    assert sltpRejection(buyStop, False, {"sl": 1.1, "tp": 1.11}) is None
+    assert sltpRejection(buyStopLimit, False, {"sl": 1.1, "tp": 1.11}) is None
+    assert sltpRejection(sellStop, False, {"sl": 1.1, "tp": 1.09}) is None
+    assert "below" in sltpRejection(buyStop, False, {"sl": 1.11, "tp": None})
@@ -0,0 +1,76 @@
+import time
+import threading
+from utils.broker import mt5
+from utils.scheduler import RequestScheduler, EXIT, MODIFY, ENTRY, classOf
+
+entry = {"action": mt5.TRADE_ACTION_DEAL, "symbol": "EURUSD"}
+close = {"action": mt5.TRADE_ACTION_DEAL, "symbol": "EURUSD", "position": 7}
+modify = {"action": mt5.TRADE_ACTION_SLTP, "position": 7}
+
+
+def test_request_classes():
+    assert classOf(close) == EXIT
+    assert classOf({"action": mt5.TRADE_ACTION_REMOVE, "order": 7}) == EXIT
+    assert classOf(modify) == MODIFY
+    assert classOf(entry) == ENTRY
+
+
+def test_unlimited_lets_everything_through():
+    scheduler = RequestScheduler(rate=0)
+    assert all(scheduler.acquire(entry) for _ in range(100))
+
+
+def test_unlimited_counts_every_concurrent_send():
+    scheduler = RequestScheduler(rate=0)
+    threads = [
+        threading.Thread(target=lambda: [scheduler.acquire(entry) for _ in range(2000)])
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert scheduler.stats()["entry"]["sent"] == 16000
+
+
+def test_exits_overtake_waiting_entries():
+    scheduler = RequestScheduler(rate=20, burst=1, deadlines={ENTRY: None})
+    assert scheduler.acquire(entry)
+    order = []
+
+    def send(name, request):
+        scheduler.acquire(request)
+        order.append(name)
+
+    threads = [threading.Thread(target=send, args=("entry", entry))]
+    threads[0].start()
+    time.sleep(0.01)
+    for name, request in [("modify", modify), ("exit", close)]:
+        threads.append(threading.Thread(target=send, args=(name, request)))
+        threads[-1].start()
+        time.sleep(0.005)
+    for thread in threads:
+        thread.join()
+    # the entry was first in line but the exit and the modification went before it
+    assert order == ["exit", "modify", "entry"]
+
+
+def test_entries_expire_past_their_deadline():
+    scheduler = RequestScheduler(rate=1, burst=1, deadlines={ENTRY: 0.05})
+    assert scheduler.acquire(entry)
+    started = time.monotonic()
+    assert not scheduler.acquire(entry)
+    assert time.monotonic() - started < 0.5
+    assert scheduler.stats()["entry"]["expired"] == 1
+
+
+def test_expired_requests_are_not_sent(sim, monkeypatch, alert):
+    monkeypatch.setenv("REQUEST_RATE", "1")
+    monkeypatch.setenv("REQUEST_BURST", "1")
+    monkeypatch.setenv("ENTRY_DEADLINE_MS", "50")
+    from utils.scheduler import scheduler
+
+    scheduler.configure()
+    alert("BUY", risk=0.5, sl=1.09, tp=1.12, comment="a")
+    alert("BUY", risk=0.5, sl=1.09, tp=1.12, comment="b")
+    assert [p.comment for p in mt5.positions_get()] == ["a"]
@@ -0,0 +1,29 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.symbolCache import symbolSpecs
+
+
+def test_tick_values_are_refreshed_on_their_own_schedule(sim):
+    assert symbolSpecs.get("GBPJPY").tickValue == 0.6543
+    sim._symbols["GBPJPY"]["trade_tick_value"] = 0.65
+    # reads serve the cached spec, only the refresh reaches the terminal
+    assert symbolSpecs.get("GBPJPY").tickValue == 0.6543
+    symbolSpecs.refreshTickValues()
+    assert symbolSpecs.get("GBPJPY").tickValue == 0.65
+
+
+def test_concurrent_misses_load_a_symbol_once(sim, monkeypatch):
+    symbolSpecs.invalidate()
+    calls = []
+    symbolInfo = sim.symbol_info
+
+    def slowSymbolInfo(symbol):
+        calls.append(symbol)
+        time.sleep(0.01)
+        return symbolInfo(symbol)
+
+    monkeypatch.setattr(sim, "symbol_info", slowSymbolInfo)
+    with ThreadPoolExecutor(8) as pool:
+        specs = list(pool.map(symbolSpecs.get, ["XAUUSD"] * 8 + ["EURUSD"] * 8))
+    assert sorted(calls) == ["EURUSD", "XAUUSD"]
+    assert {spec.symbol for spec in specs} == {"EURUSD", "XAUUSD"}
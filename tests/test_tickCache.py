@@ -0,0 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
+from utils.tickCache import TickCache
+
+
+def test_only_symbols_with_a_tick_are_polled():
+    ticks = TickCache()
+    assert ticks.get("NOPE") is None
+    assert ticks.stats()["symbols"] == 0
+    assert ticks.get("EURUSD").bid == 1.1
+    assert ticks.stats()["symbols"] == 1
+
+
+def test_counters_add_up_under_concurrent_reads():
+    ticks = TickCache(maxStaleness=60)
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda n: ticks.get(["EURUSD", "XAUUSD"][n % 2]), range(4000)))
+    stats = ticks.stats()
+    assert stats["hits"] + stats["misses"] + stats["stale"] == 4000
@@ -0,0 +1,99 @@
+import time
+from utils.broker import mt5
+from utils.orderBook import orderBook
+from utils.exposure import exposure
+from utils.tradeEvents import (
+    TradeEventPoller,
+    syncState,
+    FILLED,
+    PARTIALLY_CLOSED,
+    CLOSED,
+    SL_HIT,
+    TP_HIT,
+    CANCELLED,
+)
+
+
+def poller():
+    events = TradeEventPoller()
+    events.subscribe(syncState)
+    events.prime()
+    return events
+
+
+def kinds(events) -> list:
+    return [(event.kind, event.comment) for event in events.poll()]
+
+
+def test_history_before_priming_is_not_replayed(alert):
+    alert("BUY", risk=0.5, sl=1.09, tp=1.12, comment="old")
+    assert kinds(poller()) == []
+
+
+def test_fills_partial_and_full_closes(alert):
+    events = poller()
+    alert("BUY", risk=1, sl=1.09, tp=1.12, comment="a")
+    alert("CLOSELONG", perc=50, comment="a")
+    alert("CLOSELONG", comment="a")
+    assert kinds(events) == [
+        (FILLED, "a"),
+        (PARTIALLY_CLOSED, "a"),
+        (CLOSED, "a"),
+    ]
+    assert kinds(events) == []
+
+
+def test_sl_and_tp_hits_update_the_book(sim, alert):
+    alert("BUY", risk=0.5, sl=1.09, tp=1.12, comment="long")
+    alert("SELL", "XAUUSD", risk=0.5, sl=2634.0, tp=2604.0, comment="short")
+    events = poller()
+    sim.setTick("EURUSD", 1.0899, 1.0901)
+    sim.setTick("XAUUSD", 2603.8, 2604.0)
+    assert sorted(kinds(events)) == [(SL_HIT, "long"), (TP_HIT, "short")]
+    assert orderBook.positions() == []
+    assert exposure.stats()["total"] == 0
+
+
+def test_limit_fills_and_cancels(sim, alert):
+    alert("BUYLIMIT", price=1.095, risk=0.5, sl=1.085, tp=1.11, comment="fill")
+    alert("BUYLIMIT", price=1.09, risk=0.5, sl=1.08, tp=1.11, comment="cancel")
+    events = poller()
+    sim.setTick("EURUSD", 1.0949, 1.0950)
+    order = [o for o in mt5.orders_get() if o.comment == "cancel"][0]
+    # cancelled outside of the EA
+    mt5.order_send({"action": mt5.TRADE_ACTION_REMOVE, "order": order.ticket})
+    assert sorted(kinds(events)) == [(CANCELLED, "cancel"), (FILLED, "fill")]
+    assert orderBook.orders() == []
+    assert [p.comment for p in orderBook.positions()] == ["fill"]
+
+
+def test_server_clock_far_from_the_local_one(sim, alert):
+    sim.clock = lambda: time.time() - 3 * 86400
+    alert("BUY", risk=0.5, sl=1.09, tp=1.12, comment="old")
+    events = poller()
+    alert("BUY", risk=0.5, sl=1.09, tp=1.12, comment="new")
+    assert kinds(events) == [(FILLED, "new")]
+
+
+def test_one_ticket_lookup_per_affected_position(sim, monkeypatch, alert):
+    # no syncState: it refreshes every ticket on its own
+    events = TradeEventPoller()
+    events.prime()
+    alert("BUY", risk=0.5, sl=1.09, tp=1.12, comment="untouched")
+    events.poll()
+    for comment in "abc":
+        alert("BUY", risk=0.5, sl=1.09, tp=1.12, comment=comment)
+    alert("CLOSELONG", perc=50, comment="a")
+    affected = [p.ticket for p in mt5.positions_get() if p.comment in "abc"]
+    calls = []
+    positionsGet = sim.positions_get
+
+    def countedPositionsGet(*args, **kwargs):
+        calls.append(kwargs)
+        return positionsGet(*args, **kwargs)
+
+    monkeypatch.setattr(sim, "positions_get", countedPositionsGet)
+    # the proxy caches the bound methods it hands out
+    mt5.use(sim)
+    assert len(kinds(events)) == 4
+    assert sorted(call["ticket"] for call in calls) == sorted(affected)
@@ -0,0 +1,23 @@
+from utils.wsSupervisor import WebSocketSupervisor
+
+
+class FakeApp:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+
+def test_resume_request_is_sent_on_every_open():
+    lastId = [None]
+    supervisor = WebSocketSupervisor(
+        "ws://localhost", lambda ws, message: None, resumeMessage=lambda: lastId[0]
+    )
+    first, second = FakeApp(), FakeApp()
+    supervisor._onOpen(first)
+    lastId[0] = '{"resume": "a-7"}'
+    supervisor._markDown()
+    supervisor._onOpen(second)
+    assert first.sent == [] and second.sent == ['{"resume": "a-7"}']
+    assert supervisor.reconnects == 1